@@ -0,0 +1,59 @@
+"""pg_trgm extension and GIN trigram indexes for text search
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tên index, bảng, cột) — khớp với trigram_index(...) trong app/models.py
+TRIGRAM_INDEXES = [
+    ("ix_categories_name_cat_trgm", "categories", "name_cat"),
+    ("ix_categories_description_trgm", "categories", "description"),
+    ("ix_product_name_trgm", "product", "name"),
+    ("ix_product_descriptions_trgm", "product", "descriptions"),
+    ("ix_variant_beverage_option_trgm", "variant", "Beverage_Option"),
+    ("ix_customers_name_trgm", "customers", "name"),
+    ("ix_customers_username_trgm", "customers", "username"),
+    ("ix_customers_location_trgm", "customers", "location"),
+]
+
+
+def upgrade() -> None:
+    if not op.get_context().as_sql:
+        available = op.get_bind().execute(
+            sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        ).scalar()
+    else:
+        available = True  # Chế độ --sql: không kiểm tra được, sinh đầy đủ câu lệnh
+    if not available:
+        # Server không có pg_trgm: ứng dụng tự dùng ILIKE, bỏ qua index
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY để không khóa ghi trên bảng lớn; phải chạy ngoài transaction
+    with op.get_context().autocommit_block():
+        for name, table, column in TRIGRAM_INDEXES:
+            op.create_index(
+                name,
+                table,
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in TRIGRAM_INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
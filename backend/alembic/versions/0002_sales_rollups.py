@@ -0,0 +1,63 @@
+"""Daily sales rollup tables (sales_daily, sales_store_daily) with backfill
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sales_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("store_id", sa.Uuid(), nullable=False),
+        sa.Column("variant_id", sa.Uuid(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("lines", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "store_id", "variant_id"),
+    )
+    op.create_table(
+        "sales_store_daily",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("store_id", sa.Uuid(), nullable=False),
+        sa.Column("orders", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("day", "store_id"),
+    )
+    # Backfill từ dữ liệu hiện có (cùng công thức với rebuild_sales_rollups)
+    op.execute(
+        """
+        INSERT INTO sales_daily (day, store_id, variant_id, quantity, revenue, lines)
+        SELECT date(o.order_date), o.store_id, d.variant_id, SUM(d.quantity),
+               COALESCE(SUM(d.quantity * COALESCE(d.unit_price, v.price, 0.0)), 0.0), COUNT(*)
+        FROM order_detail d
+        JOIN orders o ON o.id = d.order_id
+        LEFT JOIN variant v ON v.id = d.variant_id
+        WHERE o.order_date IS NOT NULL
+        GROUP BY date(o.order_date), o.store_id, d.variant_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO sales_store_daily (day, store_id, orders)
+        SELECT date(order_date), store_id, COUNT(*)
+        FROM orders
+        WHERE order_date IS NOT NULL
+        GROUP BY date(order_date), store_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sales_store_daily")
+    op.drop_table("sales_daily")
@@ -0,0 +1,94 @@
+"""Store customers.embedding as packed float32 bytea instead of text
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+import json
+import logging
+import math
+import struct
+import uuid
+from typing import List, Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Số dòng chuyển đổi mỗi lô (đọc theo keyset trên id, ghi bằng executemany)
+BATCH_SIZE = 1000
+
+
+# Cùng quy tắc với app.core.vectors.parse_vector: mảng JSON hoặc các số cách nhau bởi
+# dấu phẩy/khoảng trắng; giá trị không đọc được -> None
+def _parse(text: Optional[str]) -> Optional[List[float]]:
+    if not text or not text.strip():
+        return None
+    text = text.strip()
+    try:
+        values = json.loads(text) if text.startswith("[") else text.replace(",", " ").split()
+        vector = [float(x) for x in values]
+    except (TypeError, ValueError):
+        return None
+    if not vector or not all(math.isfinite(x) for x in vector):
+        return None
+    return vector
+
+
+def _convert(source: str, target: str, convert) -> None:
+    bind = op.get_bind()
+    select = sa.text(
+        f"SELECT id, {source} FROM customers WHERE {source} IS NOT NULL AND id > :after ORDER BY id LIMIT :limit"
+    ).bindparams(sa.bindparam("after", type_=sa.Uuid())).columns(sa.column("id", sa.Uuid()), sa.column(source))
+    update = sa.text(f"UPDATE customers SET {target} = :value WHERE id = :id").bindparams(
+        sa.bindparam("id", type_=sa.Uuid())
+    )
+    after, converted, dropped = uuid.UUID(int=0), 0, 0
+    while True:
+        rows = bind.execute(select, {"after": after, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        params = []
+        for id, value in rows:
+            new_value = convert(value)
+            if new_value is None:
+                dropped += 1
+            else:
+                params.append({"id": id, "value": new_value})
+        if params:
+            bind.execute(update, params)
+        converted += len(params)
+        after = rows[-1][0]
+    logger.info("Converted %d customer embeddings (%d unreadable values set to NULL)", converted, dropped)
+
+
+def _pack(text: Optional[str]) -> Optional[bytes]:
+    vector = _parse(text)
+    return None if vector is None else struct.pack(f"<{len(vector)}f", *vector)
+
+
+def _unpack(data: Optional[bytes]) -> Optional[str]:
+    if not data:
+        return None
+    return json.dumps(list(struct.unpack(f"<{len(data) // 4}f", data)))
+
+
+def upgrade() -> None:
+    op.add_column("customers", sa.Column("embedding_vector", sa.LargeBinary(), nullable=True))
+    _convert("embedding", "embedding_vector", _pack)
+    op.drop_column("customers", "embedding")
+    op.alter_column("customers", "embedding_vector", new_column_name="embedding")
+
+
+def downgrade() -> None:
+    op.add_column("customers", sa.Column("embedding_text", sa.Text(), nullable=True))
+    _convert("embedding", "embedding_text", _unpack)
+    op.drop_column("customers", "embedding")
+    op.alter_column("customers", "embedding_text", new_column_name="embedding")
@@ -0,0 +1,38 @@
+"""Widen customers.password to hold bcrypt hashes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Hash bcrypt dài 60 ký tự; mật khẩu cũ còn lưu dạng thô được hash lại khi đăng nhập
+    op.alter_column(
+        "customers",
+        "password",
+        type_=sa.String(length=255),
+        existing_type=sa.String(length=40),
+        existing_nullable=True,
+    )
+
+
+def downgrade() -> None:
+    # Chỉ chạy được khi không còn giá trị dài hơn 40 ký tự (tức chưa có hash nào được lưu)
+    op.alter_column(
+        "customers",
+        "password",
+        type_=sa.String(length=40),
+        existing_type=sa.String(length=255),
+        existing_nullable=True,
+    )
@@ -0,0 +1,33 @@
+"""B-tree index on customers.username for login lookups
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Khớp với index=True của Customer.username trong app/models.py (đăng nhập tìm theo
+    # username =, index trigram chỉ phục vụ tìm kiếm ILIKE)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_customers_username",
+            "customers",
+            ["username"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_customers_username", table_name="customers", postgresql_concurrently=True, if_exists=True)
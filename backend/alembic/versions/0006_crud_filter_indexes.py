@@ -0,0 +1,41 @@
+"""B-tree indexes on the foreign keys and columns filtered by app/crud
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tên index, bảng, cột) — khớp với index=True / __table_args__ trong app/models.py
+# (scripts/check_indexes.py kiểm tra mọi index của model đều có migration tạo)
+INDEXES = [
+    ("ix_product_categories_id", "product", ["categories_id"]),
+    ("ix_variant_product_id", "variant", ["product_id"]),
+    ("ix_variant_price", "variant", ["price"]),
+    ("ix_orders_customer_id", "orders", ["customer_id"]),
+    ("ix_orders_store_id", "orders", ["store_id"]),
+    ("ix_orders_order_date_id", "orders", ["order_date", "id"]),
+    ("ix_order_detail_order_id", "order_detail", ["order_id"]),
+    ("ix_order_detail_variant_id", "order_detail", ["variant_id"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY không chạy được trong transaction và không khóa ghi bảng
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
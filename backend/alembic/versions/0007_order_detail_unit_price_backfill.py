@@ -0,0 +1,57 @@
+"""Backfill order_detail.unit_price from variant.price and rebuild sales rollups
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Doanh thu tổng hợp chỉ dùng đơn giá đã chụp (app/crud/rollup.py): điền đơn giá cho các
+    # dòng cũ bằng giá hiện tại của variant, một lần, thay vì đọc giá variant ở mỗi lần tính
+    op.execute(
+        """
+        UPDATE order_detail
+        SET unit_price = variant.price
+        FROM variant
+        WHERE variant.id = order_detail.variant_id AND order_detail.unit_price IS NULL
+        """
+    )
+    # Delta cộng/trừ trước đây dùng giá variant tại thời điểm ghi: tính lại toàn bộ bảng
+    # tổng hợp từ đơn giá vừa điền (cùng công thức với rebuild_sales_rollups)
+    op.execute("DELETE FROM sales_daily")
+    op.execute("DELETE FROM sales_store_daily")
+    op.execute(
+        """
+        INSERT INTO sales_daily (day, store_id, variant_id, quantity, revenue, lines)
+        SELECT date(o.order_date), o.store_id, d.variant_id, SUM(d.quantity),
+               COALESCE(SUM(d.quantity * COALESCE(d.unit_price, 0.0)), 0.0), COUNT(*)
+        FROM order_detail d
+        JOIN orders o ON o.id = d.order_id
+        WHERE o.order_date IS NOT NULL
+        GROUP BY date(o.order_date), o.store_id, d.variant_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO sales_store_daily (day, store_id, orders)
+        SELECT date(order_date), store_id, COUNT(*)
+        FROM orders
+        WHERE order_date IS NOT NULL
+        GROUP BY date(order_date), store_id
+        """
+    )
+
+
+def downgrade() -> None:
+    # Không phân biệt được đơn giá được điền với đơn giá gốc: giữ nguyên dữ liệu
+    pass
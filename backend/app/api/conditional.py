@@ -0,0 +1,69 @@
+# File: backend/app/api/conditional.py
+# GET có điều kiện (ETag / Last-Modified) dựa trên phiên bản của bảng trong cache catalog
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from app.core.cache import catalog_cache
+from app.core.config import settings
+
+
+# Phiên bản chỉ tin được khi mọi nguồn ghi cùng tăng một generation (xem CONDITIONAL_GET)
+def _enabled() -> bool:
+    if settings.CONDITIONAL_GET == "auto":
+        return catalog_cache.backend.shared
+    return settings.CONDITIONAL_GET == "on"
+
+
+# So khớp If-None-Match (danh sách ETag hoặc "*"), so sánh yếu theo RFC 9110
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return since.tzinfo is not None and last_modified <= since
+
+
+def conditional_get(table: str) -> Any:
+    """
+    Dependency cho route GET: đặt ETag/Last-Modified theo phiên bản của `table`
+    và trả 304 ngay (trước khi truy vấn hay serialize) nếu client đã có bản mới nhất.
+    Phiên bản tăng mỗi khi hàm ghi trong crud_* invalidate bảng đó; tắt (không header,
+    không 304) khi generation không dùng chung giữa các process.
+    """
+
+    async def dependency(request: Request, response: Response) -> None:
+        if not _enabled():
+            return
+        version = await catalog_cache.version(table)
+        if version is None:
+            return
+        token, last_modified = version
+        # ETag yếu: count ước lượng (count_mode=estimated) có thể đổi dù bảng không đổi
+        etag = f'W/"{table}-{token}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+        if_none_match: Optional[str] = request.headers.get("if-none-match")
+        if_modified_since: Optional[str] = request.headers.get("if-modified-since")
+        # If-None-Match được ưu tiên; chỉ xét If-Modified-Since khi không có nó
+        if if_none_match is not None:
+            not_modified = _etag_matches(if_none_match, etag)
+        else:
+            not_modified = if_modified_since is not None and _not_modified_since(if_modified_since, last_modified)
+        if not_modified:
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return Depends(dependency)
@@ -1,18 +1,18 @@
-from collections.abc import Generator
+import uuid
+from collections.abc import AsyncGenerator, Generator
 from typing import Annotated
 
-import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from pydantic import ValidationError
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
 from app.core.config import settings
-from app.core.database import engine
-from app.models import TokenPayload
-from app.models import Customer  # Sử dụng model Customer
+from app.core.database import async_session_maker, engine
+from app.crud.crud_customer import get_customer_principal as crud_get_customer_principal
+from app.models import CustomerPrincipal
 
 # OAuth2 scheme để lấy token từ request
 reusable_oauth2 = OAuth2PasswordBearer(
@@ -24,27 +24,35 @@ def get_db() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
 
+# Dependency để lấy async session database (dùng cho các router async)
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_maker() as session:
+        yield session
+
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
-# Lấy current customer từ JWT token
-def get_current_customer(session: SessionDep, token: TokenDep) -> Customer:
+# Lấy current customer từ JWT token: token đã giải mã và thông tin customer được cache
+# ngắn hạn (không giải mã JWT, không truy vấn DB ở mỗi request); chỉ trả thông tin xác thực
+# tối thiểu, router cần bản ghi đầy đủ thì tự lấy theo id
+async def get_current_customer(session: AsyncSessionDep, token: TokenDep) -> CustomerPrincipal:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
+        customer_id = uuid.UUID(security.decode_access_token(token))
+    except (InvalidTokenError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    customer = session.get(Customer, token_data.sub)
+    customer = await crud_get_customer_principal(session=session, id=customer_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    # Nếu có trường is_active, kiểm tra trạng thái tài khoản (tùy model thực tế)
-    if hasattr(customer, "is_active") and not customer.is_active:
-        raise HTTPException(status_code=400, detail="Inactive customer")
     return customer
 
-CurrentCustomer = Annotated[Customer, Depends(get_current_customer)]
\ No newline at end of file
+CurrentCustomer = Annotated[CustomerPrincipal, Depends(get_current_customer)]
+
+# Chỉ cho customer có id trong settings.ADMIN_CUSTOMER_IDS (route quản trị)
+async def get_current_admin(current_customer: CurrentCustomer) -> CustomerPrincipal:
+    if current_customer.id not in settings.ADMIN_CUSTOMER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough privileges")
+    return current_customer
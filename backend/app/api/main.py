@@ -1,6 +1,7 @@
 from fastapi import APIRouter
 
 from app.api.router import (
+    r_login,
     r_categories,
     r_products,
     r_variants,
@@ -8,10 +9,13 @@ from app.api.router import (
     r_stores,
     r_orders,
     r_order_details,
+    r_admin,
+    r_analytics,
 )
 
 
 api_router = APIRouter()
+api_router.include_router(r_login.router)
 api_router.include_router(r_categories.router)
 api_router.include_router(r_products.router)
 api_router.include_router(r_variants.router)
@@ -19,6 +23,8 @@ api_router.include_router(r_customers.router)
 api_router.include_router(r_stores.router)
 api_router.include_router(r_orders.router)
 api_router.include_router(r_order_details.router)
+api_router.include_router(r_admin.router)
+api_router.include_router(r_analytics.router)
 
 # Nếu bạn có các router đặc biệt cho môi trường local, có thể include thêm tại đây
 # if settings.ENVIRONMENT == "local":
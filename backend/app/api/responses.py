@@ -0,0 +1,286 @@
+# File: backend/app/api/responses.py
+# Đường serialize nhanh: đọc thuộc tính của bản ghi (ORM hoặc *Public) và encode JSON
+# một lần bằng orjson, không tạo model trung gian và không validate lại qua response_model
+import csv
+import enum
+import io
+import operator
+import typing
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, AsyncIterator, Iterable, Optional, Sequence, Tuple
+
+import orjson
+from fastapi import Depends, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import inspect as sa_inspect
+from sqlmodel import SQLModel
+
+from app.crud.expand import PUBLIC_SCHEMAS, ExpandTree, parse_expand
+from app.crud.projection import parse_fields
+
+
+def _default(value: Any) -> Any:
+    # Các kiểu orjson không tự encode được
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class ORJSONResponse(Response):
+    """Response JSON encode bằng orjson; datetime UTC ra hậu tố "Z" giống Pydantic"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z)
+
+
+# Model con trong annotation dạng Model, Optional[Model] hoặc List[Model]; None nếu không có
+def _nested_model(annotation: Any) -> Optional[type[BaseModel]]:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model = _nested_model(arg)
+        if model is not None:
+            return model
+    return None
+
+
+# Getter luôn trả về tuple (itemgetter/attrgetter một khóa trả về giá trị đơn)
+def _tuple_getter(factory: Any, names: tuple[str, ...]) -> Any:
+    if not names:
+        return lambda obj: ()
+    if len(names) == 1:
+        getter = factory(names[0])
+        return lambda obj: (getter(obj),)
+    return factory(*names)
+
+
+class RowSerializer:
+    """
+    Chuyển bản ghi thành dict theo đúng các trường (kể cả computed field) của `schema`.
+    Trường là model con được chuyển đệ quy; các kiểu còn lại (UUID, datetime...) để orjson xử lý.
+    Quan hệ trong `expand` (đã được nạp sẵn bằng expand_options) được thêm vào theo
+    schema *Public của model đích. Thuộc tính ORM chưa nạp không được lazy-load mà bị bỏ
+    khỏi kết quả.
+    """
+
+    def __init__(self, schema: type[BaseModel], fields: Optional[Sequence[str]] = None, expand: ExpandTree = ()) -> None:
+        self.schema = schema
+        self.fields = tuple(fields or (*schema.model_fields, *schema.model_computed_fields))
+        self._plain = tuple(name for name in self.fields if name not in schema.model_computed_fields)
+        self._computed = tuple(name for name in self.fields if name in schema.model_computed_fields)
+        # Cột đã nạp nằm sẵn trong __dict__ của cả bản ghi ORM lẫn model Pydantic: đọc thẳng
+        # từ đó nhanh hơn nhiều so với đi qua descriptor của SQLAlchemy
+        self._from_dict = _tuple_getter(operator.itemgetter, self._plain)
+        self._from_attrs = _tuple_getter(operator.attrgetter, self._plain)
+        self._nested: dict[str, RowSerializer] = {}
+        for name in self.fields:
+            info = schema.model_fields.get(name)
+            model = _nested_model(info.annotation) if info is not None else None
+            if model is not None:
+                self._nested[name] = serializer_for(model)
+        self._expanded = {
+            name: serializer_for(PUBLIC_SCHEMAS[target], None, children) for name, target, children in expand
+        }
+
+    @staticmethod
+    def _nested_value(serializer: "RowSerializer", value: Any) -> Any:
+        if value is None:
+            return None
+        if isinstance(value, (list, tuple)):
+            return serializer.dump(value)
+        return serializer.dump_one(value)
+
+    @staticmethod
+    def _unloaded(row: Any) -> frozenset:
+        # Thuộc tính ORM chưa nạp (cột hoãn bởi load_only, quan hệ chưa expand, đã hết hạn):
+        # getattr sẽ lazy-load, trên AsyncSession là lỗi MissingGreenlet
+        state = sa_inspect(row, raiseerr=False)
+        return state.unloaded if state is not None else frozenset()
+
+    def dump_one(self, row: Any) -> dict[str, Any]:
+        return self.dump((row,))[0]
+
+    def dump(self, rows: Iterable[Any]) -> list[dict[str, Any]]:
+        plain, from_dict, from_attrs = self._plain, self._from_dict, self._from_attrs
+        data = []
+        for row in rows:
+            try:
+                item = dict(zip(plain, from_dict(row.__dict__)))
+            except KeyError:
+                # Thiếu trong __dict__: bỏ qua thuộc tính chưa nạp (không lazy-load),
+                # property thì đọc qua getattr
+                unloaded = self._unloaded(row)
+                if unloaded:
+                    loaded = row.__dict__
+                    item = {
+                        name: loaded[name] if name in loaded else getattr(row, name)
+                        for name in plain
+                        if name not in unloaded
+                    }
+                else:
+                    item = dict(zip(plain, from_attrs(row)))
+            for name in self._computed:
+                item[name] = getattr(row, name)
+            for name, serializer in self._expanded.items():
+                if name in row.__dict__:
+                    item[name] = self._nested_value(serializer, row.__dict__[name])
+                elif name not in self._unloaded(row):
+                    item[name] = self._nested_value(serializer, getattr(row, name))
+            data.append(item)
+        for name, serializer in self._nested.items():
+            for item in data:
+                if name not in self._expanded and name in item:
+                    item[name] = self._nested_value(serializer, item[name])
+        return data
+
+
+@lru_cache(maxsize=None)
+def serializer_for(schema: type[BaseModel], fields: Optional[Tuple[str, ...]] = None, expand: ExpandTree = ()) -> RowSerializer:
+    return RowSerializer(schema, fields, expand)
+
+
+def page_response(
+    page_schema: type[BaseModel],
+    rows: Iterable[Any],
+    *,
+    fields: Optional[Tuple[str, ...]] = None,
+    expand: ExpandTree = (),
+    response: Optional[Response] = None,
+    **values: Any,
+) -> ORJSONResponse:
+    """
+    Response cho model danh sách dạng {data: [...], count, next_cursor...}: `data` được
+    serialize theo kiểu phần tử của `page_schema` (chỉ các trường `fields` nếu có,
+    thêm các quan hệ `expand`),
+    các trường khác lấy từ `values` (chỉ giữ trường có trong schema, giống lọc của
+    response_model). Truyền `response` để giữ header do dependency đặt (vd: ETag).
+    """
+    item_schema = _nested_model(page_schema.model_fields["data"].annotation)
+    content = {
+        name: values.get(name, info.default) for name, info in page_schema.model_fields.items() if name != "data"
+    }
+    content = {"data": serializer_for(item_schema, fields, expand).dump(rows), **content}
+    return _with_headers(ORJSONResponse(content), response)
+
+
+def item_response(
+    schema: type[BaseModel],
+    row: Any,
+    *,
+    fields: Optional[Tuple[str, ...]] = None,
+    expand: ExpandTree = (),
+    response: Optional[Response] = None,
+) -> ORJSONResponse:
+    """Response cho một bản ghi theo `schema` (chỉ các trường `fields` nếu có, thêm quan hệ `expand`)"""
+    return _with_headers(ORJSONResponse(serializer_for(schema, fields, expand).dump_one(row)), response)
+
+
+def list_response(
+    schema: type[BaseModel],
+    rows: Iterable[Any],
+    *,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> ORJSONResponse:
+    """Response cho danh sách bản ghi (mảng JSON) theo `schema` (chỉ các trường `fields` nếu có)"""
+    return ORJSONResponse(serializer_for(schema, fields).dump(rows))
+
+
+# Giữ header do dependency đặt trên response tạm của FastAPI (vd: ETag)
+def _with_headers(fast: ORJSONResponse, response: Optional[Response]) -> ORJSONResponse:
+    if response is not None:
+        fast.headers.raw.extend(response.headers.raw)
+    return fast
+
+
+def sparse_fields(schema: type[BaseModel]) -> Any:
+    """
+    Dependency cho tham số `fields=a,b,c` (sparse fieldset): trả tuple tên trường
+    thuộc `schema` hoặc None nếu lấy mọi trường; trường lạ -> InvalidFieldsError (400)
+    """
+
+    def dependency(
+        fields: Optional[str] = Query(None, description="Các trường cần trả, phân cách bởi dấu phẩy (vd: id,name)"),
+    ) -> Optional[Tuple[str, ...]]:
+        return parse_fields(fields, schema)
+
+    return Depends(dependency)
+
+
+def expand_relations(model: type[SQLModel]) -> Any:
+    """
+    Dependency cho tham số `expand=a.b,c`: cây quan hệ của `model` cần nạp kèm
+    (rỗng nếu không expand); quan hệ lạ -> InvalidExpandError (400)
+    """
+
+    def dependency(
+        expand: Optional[str] = Query(
+            None, description="Quan hệ cần trả kèm, phân cách bởi dấu phẩy, lồng nhau bằng dấu chấm (vd: order_details.variant.product,store)"
+        ),
+    ) -> ExpandTree:
+        return parse_expand(expand, model)
+
+    return Depends(dependency)
+
+
+class ExportFormat(str, enum.Enum):
+    """Định dạng của các endpoint export dạng stream"""
+
+    ndjson = "ndjson"  # Mỗi dòng một object JSON
+    csv = "csv"
+
+
+# Giá trị một ô CSV: None -> rỗng, datetime theo ISO 8601 (UTC ghi "Z" như JSON)
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat().replace("+00:00", "Z")
+    if isinstance(value, (date, uuid.UUID, Decimal)):
+        return str(value)
+    return value
+
+
+async def _ndjson_chunks(batches: AsyncIterator[Sequence[Any]], serializer: RowSerializer) -> AsyncIterator[bytes]:
+    option = orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE
+    async for batch in batches:
+        yield b"".join(orjson.dumps(item, default=_default, option=option) for item in serializer.dump(batch))
+
+
+async def _csv_chunks(batches: AsyncIterator[Sequence[Any]], serializer: RowSerializer) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(serializer.fields)
+    async for batch in batches:
+        writer.writerows([_csv_value(item[name]) for name in serializer.fields] for item in serializer.dump(batch))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def stream_response(
+    schema: type[BaseModel],
+    batches: AsyncIterator[Sequence[Any]],
+    *,
+    format: ExportFormat,
+    filename: str,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> StreamingResponse:
+    """
+    StreamingResponse NDJSON/CSV: mỗi lô bản ghi từ `batches` được encode và gửi ngay,
+    nên bộ nhớ chỉ phụ thuộc kích thước lô chứ không phụ thuộc kích thước bảng
+    """
+    serializer = serializer_for(schema, fields)
+    if format == ExportFormat.csv:
+        body, media_type = _csv_chunks(batches, serializer), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _ndjson_chunks(batches, serializer), "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{format.value}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
@@ -0,0 +1,49 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends, Query, Request
+
+from app.api.dependency import AsyncSessionDep, get_current_admin
+from app.core.cache import catalog_cache
+from app.core.config import settings
+from app.core.database import get_pool_stats
+from app.crud.importer import ImportFormat, ImportTable, import_records as crud_import_records
+from app.models import ImportReport
+
+# Mọi route quản trị (thống kê, import ghi đè dữ liệu) cần token của customer admin
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_current_admin)])
+
+@router.get("/pool")
+async def read_pool_stats() -> Any:
+    """
+    Thống kê connection pool: số kết nối đang mượn, overflow, thời gian chờ
+    và histogram độ trễ checkout, dùng để định cỡ pool khi chạy tải
+    """
+    return get_pool_stats()
+
+@router.get("/cache")
+async def read_cache_stats() -> Any:
+    """
+    Thống kê cache catalog: số entry, hit/miss, số lần evict và invalidate theo bảng
+    """
+    return catalog_cache.stats()
+
+@router.post("/import/{table}", response_model=ImportReport)
+async def import_table(
+    session: AsyncSessionDep,
+    request: Request,
+    table: ImportTable,
+    format: ImportFormat = Query(ImportFormat.csv, description="Định dạng body: csv hoặc ndjson"),
+) -> Any:
+    """
+    Nhập dữ liệu lớn vào bảng: body là nội dung file thô (text/csv hoặc
+    application/x-ndjson), được đọc dạng stream theo lô, không nạp cả file vào bộ nhớ.
+    Dòng có `id` đã tồn tại sẽ được cập nhật; dòng lỗi được liệt kê trong báo cáo.
+    """
+    return await crud_import_records(
+        session=session,
+        table=table,
+        chunks=request.stream(),
+        format=format,
+        batch_size=settings.IMPORT_BATCH_SIZE,
+        max_errors=settings.IMPORT_MAX_ERRORS,
+    )
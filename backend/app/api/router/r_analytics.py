@@ -0,0 +1,100 @@
+import uuid
+from datetime import date
+from typing import Any, Optional
+
+from fastapi import APIRouter, Query
+
+from app.models import (
+    CustomerOrderCountsPublic,
+    ProductNutritionStatsPublic,
+    SalesSummary,
+    StoreDayRevenuesPublic,
+    TopVariantsPublic,
+)
+from app.api.dependency import AsyncSessionDep
+from app.crud.crud_analytics import (
+    get_sales_summary as crud_get_sales_summary,
+    get_revenue_by_store_day as crud_get_revenue_by_store_day,
+    get_top_variants as crud_get_top_variants,
+    get_product_nutrition_stats as crud_get_product_nutrition_stats,
+    get_customer_order_counts as crud_get_customer_order_counts,
+)
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/summary", response_model=SalesSummary)
+async def read_sales_summary(session: AsyncSessionDep) -> Any:
+    """
+    Số sản phẩm, danh mục, khách hàng, cửa hàng, đơn hàng, tổng doanh thu
+    và giá trị đơn trung bình
+    """
+    return await crud_get_sales_summary(session=session)
+
+@router.get("/revenue", response_model=StoreDayRevenuesPublic)
+async def read_revenue_by_store_day(
+    session: AsyncSessionDep,
+    date_from: Optional[date] = Query(None, description="Từ ngày (bao gồm)"),
+    date_to: Optional[date] = Query(None, description="Đến ngày (không bao gồm)"),
+    store_id: Optional[uuid.UUID] = Query(None, description="Lọc theo cửa hàng"),
+    limit: int = Query(1000, ge=1, le=10000, description="Số dòng (cửa hàng x ngày) tối đa"),
+) -> Any:
+    """
+    Doanh thu theo cửa hàng và ngày: số đơn, số lượng và doanh thu các dòng chi tiết
+    """
+    data = await crud_get_revenue_by_store_day(
+        session=session, date_from=date_from, date_to=date_to, store_id=store_id, limit=limit
+    )
+    return StoreDayRevenuesPublic(data=data)
+
+@router.get("/top-variants", response_model=TopVariantsPublic)
+async def read_top_variants(
+    session: AsyncSessionDep,
+    date_from: Optional[date] = Query(None, description="Từ ngày (bao gồm)"),
+    date_to: Optional[date] = Query(None, description="Đến ngày (không bao gồm)"),
+    store_id: Optional[uuid.UUID] = Query(None, description="Lọc theo cửa hàng"),
+    limit: int = Query(10, ge=1, le=100, description="Số variant trả về"),
+) -> Any:
+    """
+    Variant bán chạy nhất theo tổng số lượng đã đặt
+    """
+    data = await crud_get_top_variants(
+        session=session, date_from=date_from, date_to=date_to, store_id=store_id, limit=limit
+    )
+    return TopVariantsPublic(data=data)
+
+@router.get("/product-nutrition", response_model=ProductNutritionStatsPublic)
+async def read_product_nutrition_stats(
+    session: AsyncSessionDep,
+    product_id: Optional[uuid.UUID] = Query(None, description="Chỉ lấy một sản phẩm"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+) -> Any:
+    """
+    Giá và dinh dưỡng (trung bình, lớn nhất) của các variant theo từng sản phẩm
+    """
+    data = await crud_get_product_nutrition_stats(session=session, product_id=product_id, skip=skip, limit=limit)
+    return ProductNutritionStatsPublic(data=data)
+
+@router.get("/customer-orders", response_model=CustomerOrderCountsPublic)
+async def read_customer_order_counts(
+    session: AsyncSessionDep,
+    date_from: Optional[date] = Query(None, description="Từ ngày (bao gồm)"),
+    date_to: Optional[date] = Query(None, description="Đến ngày (không bao gồm)"),
+    store_id: Optional[uuid.UUID] = Query(None, description="Lọc theo cửa hàng"),
+    min_orders: int = Query(1, ge=1, description="Chỉ lấy khách có ít nhất N đơn"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+) -> Any:
+    """
+    Số đơn, tổng chi tiêu và ngày mua gần nhất của từng khách hàng, nhiều đơn nhất trước
+    """
+    data = await crud_get_customer_order_counts(
+        session=session,
+        date_from=date_from,
+        date_to=date_to,
+        store_id=store_id,
+        min_orders=min_orders,
+        skip=skip,
+        limit=limit,
+    )
+    return CustomerOrderCountsPublic(data=data)
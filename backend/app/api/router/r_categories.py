@@ -1,7 +1,7 @@
 import uuid
-from typing import Any
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
 from sqlmodel import select, func
 
 from app.models import (
@@ -10,78 +10,112 @@ from app.models import (
     CategoryUpdate,
     CategoryPublic,
     CategoriesPublic,
+    BatchRequest,
 )
-from app.api.dependency import SessionDep
+from app.api.conditional import conditional_get
+from app.api.dependency import AsyncSessionDep
+from app.api.responses import item_response, list_response, page_response, sparse_fields
+from app.core.config import settings
+from app.crud.counting import CountMode
 from app.crud.crud_categories import (
     create_category as crud_create_category,
     update_category as crud_update_category,
     get_category as crud_get_category,
+    get_category_public as crud_get_category_public,
     get_categories as crud_get_categories,
+    get_categories_by_ids as crud_get_categories_by_ids,
     delete_category as crud_delete_category,
     search_categories as crud_search_categories,
 )
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
-@router.get("/", response_model=CategoriesPublic)
-def read_categories(
-    session: SessionDep, skip: int = 0, limit: int = 100
+@router.get("/", response_model=CategoriesPublic, dependencies=[conditional_get(Category.__tablename__)])
+async def read_categories(
+    session: AsyncSessionDep,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Token next_cursor của trang trước (phân trang keyset)"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(CategoryPublic),
 ) -> Any:
-    categories, count = crud_get_categories(session=session, skip=skip, limit=limit)
-    data = [CategoryPublic.model_validate(cat) for cat in categories]
-    return CategoriesPublic(data=data, count=count)
+    categories, count, next_cursor = await crud_get_categories(session=session, skip=skip, limit=limit, cursor=cursor, count_mode=count_mode)
+    # Trang lấy từ cache catalog (đủ cột, dùng chung cho mọi `fields`): chỉ lọc trường khi serialize
+    return page_response(CategoriesPublic, categories, fields=fields, response=response, count=count, next_cursor=next_cursor)
 
-@router.get("/{id}", response_model=CategoryPublic)
-def read_category(
-    id: uuid.UUID, session: SessionDep
+@router.post("/batch", response_model=List[CategoryPublic])
+async def read_categories_by_ids(
+    session: AsyncSessionDep,
+    request: BatchRequest,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(CategoryPublic),
 ) -> Any:
-    category = crud_get_category(session=session, id=id)
+    """
+    Lấy nhiều category theo danh sách id (đọc qua cache catalog, chỉ id chưa có trong cache mới truy vấn database); id trùng được bỏ,
+    kết quả giữ thứ tự id gửi lên, id không tồn tại bị bỏ qua
+    """
+    if len(request.ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_IDS} ids per request")
+    categories = await crud_get_categories_by_ids(session=session, ids=request.ids)
+    return list_response(CategoryPublic, categories, fields=fields)
+
+# Đặt trước /{id} để "search" không bị hiểu là id
+@router.get("/search", response_model=CategoriesPublic, dependencies=[conditional_get(Category.__tablename__)])
+async def search_categories(
+    session: AsyncSessionDep,
+    response: Response,
+    q: str = Query(..., description="Từ khóa tìm kiếm"),
+    skip: int = Query(0, ge=0, description="Số bản ghi bỏ qua"),
+    limit: int = Query(100, ge=1, le=1000, description="Số bản ghi tối đa"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(CategoryPublic),
+) -> Any:
+    """
+    Tìm kiếm danh mục theo tên và mô tả
+    """
+    categories, count = await crud_search_categories(
+        session=session, 
+        query=q, 
+        skip=skip, 
+        limit=limit,
+        count_mode=count_mode,
+        fields=fields
+    )
+    return page_response(CategoriesPublic, categories, fields=fields, response=response, count=count)
+
+@router.get("/{id}", response_model=CategoryPublic, dependencies=[conditional_get(Category.__tablename__)])
+async def read_category(
+    id: uuid.UUID, session: AsyncSessionDep, response: Response,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(CategoryPublic),
+) -> Any:
+    category = await crud_get_category_public(session=session, id=id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    return CategoryPublic.model_validate(category)
+    return item_response(CategoryPublic, category, fields=fields, response=response)
 
 @router.post("/", response_model=CategoryPublic)
-def create_category(
-    category_in: CategoryCreate, session: SessionDep
+async def create_category(
+    category_in: CategoryCreate, session: AsyncSessionDep
 ) -> Any:
-    category = crud_create_category(session=session, category_create=category_in)
+    category = await crud_create_category(session=session, category_create=category_in)
     return CategoryPublic.model_validate(category)
 
 @router.put("/{id}", response_model=CategoryPublic)
-def update_category(
-    id: uuid.UUID, category_in: CategoryUpdate, session: SessionDep
+async def update_category(
+    id: uuid.UUID, category_in: CategoryUpdate, session: AsyncSessionDep
 ) -> Any:
-    category = crud_get_category(session=session, id=id)
+    category = await crud_get_category(session=session, id=id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    category = crud_update_category(session=session, db_category=category, category_in=category_in)
+    category = await crud_update_category(session=session, db_category=category, category_in=category_in)
     return CategoryPublic.model_validate(category)
 
 @router.delete("/{id}")
-def delete_category(
-    id: uuid.UUID, session: SessionDep
+async def delete_category(
+    id: uuid.UUID, session: AsyncSessionDep
 ):
-    category = crud_get_category(session=session, id=id)
+    category = await crud_get_category(session=session, id=id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    crud_delete_category(session=session, category=category)
+    await crud_delete_category(session=session, category=category)
     return {"message": "Category deleted successfully"}
-
-@router.get("/search", response_model=CategoriesPublic)
-def search_categories(
-    session: SessionDep,
-    q: str = Query(..., description="Từ khóa tìm kiếm"),
-    skip: int = Query(0, ge=0, description="Số bản ghi bỏ qua"),
-    limit: int = Query(100, ge=1, le=1000, description="Số bản ghi tối đa")
-) -> Any:
-    """
-    Tìm kiếm danh mục theo tên và mô tả
-    """
-    categories, count = crud_search_categories(
-        session=session, 
-        query=q, 
-        skip=skip, 
-        limit=limit
-    )
-    data = [CategoryPublic.model_validate(cat) for cat in categories]
-    return CategoriesPublic(data=data, count=count)
\ No newline at end of file
@@ -1,7 +1,9 @@
 import uuid
-from typing import Any, Optional
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import select, func
 
 from app.models import (
@@ -10,58 +12,176 @@ from app.models import (
     CustomerUpdate,
     CustomerPublic,
     CustomersPublic,
+    BatchRequest,
+    SimilarCustomer,
+    SimilarCustomersBatchPublic,
+    SimilarCustomersBatchRequest,
+    SimilarCustomersPublic,
+    SimilarCustomersQuery,
+    SimilarCustomersRequest,
 )
-from app.api.dependency import SessionDep
+from app.api.dependency import AsyncSessionDep
+from app.api.responses import ExportFormat, item_response, list_response, page_response, sparse_fields, stream_response
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.crud.counting import CountMode
 from app.crud.crud_customer import (
     create_customer as crud_create_customer,
     update_customer as crud_update_customer,
     get_customer as crud_get_customer,
     get_customers as crud_get_customers,
+    get_customers_by_ids as crud_get_customers_by_ids,
     delete_customer as crud_delete_customer,
+    stream_customers as crud_stream_customers,
+    search_similar_customers as crud_search_similar_customers,
 )
 
 router = APIRouter(prefix="/customers", tags=["customers"])
 
 @router.get("/", response_model=CustomersPublic)
-def read_customers(
-    session: SessionDep, skip: int = 0, limit: int = 100
+async def read_customers(
+    session: AsyncSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Token next_cursor của trang trước (phân trang keyset)"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(CustomerPublic),
 ) -> Any:
-    customers, count = crud_get_customers(session=session, skip=skip, limit=limit)
-    data = [CustomerPublic.model_validate(cus) for cus in customers]
-    return CustomersPublic(data=data, count=count)
+    customers, count, next_cursor = await crud_get_customers(session=session, skip=skip, limit=limit, cursor=cursor, count_mode=count_mode, fields=fields)
+    return page_response(CustomersPublic, customers, fields=fields, count=count, next_cursor=next_cursor)
+
+@router.post("/batch", response_model=List[CustomerPublic])
+async def read_customers_by_ids(
+    session: AsyncSessionDep,
+    request: BatchRequest,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(CustomerPublic),
+) -> Any:
+    """
+    Lấy nhiều khách hàng theo danh sách id (một truy vấn IN (...)); id trùng được bỏ,
+    kết quả giữ thứ tự id gửi lên, id không tồn tại bị bỏ qua
+    """
+    if len(request.ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_IDS} ids per request")
+    customers = await crud_get_customers_by_ids(session=session, ids=request.ids, fields=fields)
+    return list_response(CustomerPublic, customers, fields=fields)
+
+# Trả lời một lô truy vấn tương tự: embedding của các customer_id được đọc bằng một truy vấn
+# IN (...), mọi truy vấn được tính bằng một phép nhân ma trận
+async def _similar_customers(
+    session: AsyncSessionDep, queries: List[SimilarCustomersQuery], k: int
+) -> List[SimilarCustomersPublic]:
+    if k > settings.SIMILAR_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k must be at most {settings.SIMILAR_MAX_K}")
+    if any((query.embedding is None) == (query.customer_id is None) for query in queries):
+        raise HTTPException(status_code=400, detail="Provide exactly one of embedding or customer_id")
+    customer_ids = [query.customer_id for query in queries if query.customer_id is not None]
+    customers = {
+        c.id: c for c in await crud_get_customers_by_ids(session=session, ids=customer_ids, fields=("embedding",))
+    }
+    embeddings = []
+    for query in queries:
+        if query.customer_id is None:
+            embeddings.append(query.embedding)
+            continue
+        customer = customers.get(query.customer_id)
+        if not customer:
+            raise HTTPException(status_code=404, detail=f"Customer {query.customer_id} not found")
+        if customer.embedding is None:
+            raise HTTPException(status_code=400, detail=f"Customer {query.customer_id} has no embedding")
+        embeddings.append(customer.embedding)
+    try:
+        results = await crud_search_similar_customers(
+            session=session, embeddings=embeddings, k=k, exclude=[query.customer_id for query in queries]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [
+        SimilarCustomersPublic(
+            data=[
+                SimilarCustomer(id=c.id, name=c.name, username=c.username, picture=c.picture, score=score)
+                for c, score in matches
+            ]
+        )
+        for matches in results
+    ]
+
+@router.post("/similar", response_model=SimilarCustomersPublic)
+async def read_similar_customers(session: AsyncSessionDep, request: SimilarCustomersRequest) -> Any:
+    """
+    Tìm k khách hàng có embedding gần nhất (cosine) với `embedding` gửi lên, hoặc với
+    embedding của khách hàng `customer_id` (không tính chính khách hàng đó)
+    """
+    return (await _similar_customers(session, [request], request.k))[0]
+
+@router.post("/similar/batch", response_model=SimilarCustomersBatchPublic)
+async def read_similar_customers_batch(session: AsyncSessionDep, request: SimilarCustomersBatchRequest) -> Any:
+    """Nhiều truy vấn tìm khách hàng tương tự trong một request; kết quả theo thứ tự truy vấn"""
+    if len(request.queries) > settings.SIMILAR_MAX_QUERIES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.SIMILAR_MAX_QUERIES} queries per request")
+    return SimilarCustomersBatchPublic(data=await _similar_customers(session, request.queries, request.k))
+
+# Đặt trước /{id} để "export" không bị hiểu là id
+@router.get("/export", response_class=StreamingResponse)
+async def export_customers(
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Định dạng: ndjson hoặc csv"),
+    date_from: Optional[datetime] = Query(None, description="Từ ngày đặt hàng (bao gồm)"),
+    date_to: Optional[datetime] = Query(None, description="Đến ngày đặt hàng (không bao gồm)"),
+    store_id: Optional[uuid.UUID] = Query(None, description="Lọc theo cửa hàng"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(CustomerPublic),
+) -> StreamingResponse:
+    """
+    Export toàn bộ khách hàng dạng stream (NDJSON/CSV) qua server-side cursor,
+    bộ nhớ không tăng theo kích thước bảng.
+    Khi có bộ lọc ngày/cửa hàng chỉ xuất khách có đơn hàng thỏa bộ lọc.
+    """
+    # Session riêng sống cùng stream (session của dependency có thể đóng trước khi stream xong)
+    async def batches():
+        async with async_session_maker() as session:
+            async for batch in crud_stream_customers(
+                session=session,
+                date_from=date_from,
+                date_to=date_to,
+                store_id=store_id,
+                fields=fields,
+                batch_size=settings.EXPORT_BATCH_SIZE,
+            ):
+                yield batch
+
+    return stream_response(CustomerPublic, batches(), format=format, filename="customers", fields=fields)
 
 @router.get("/{id}", response_model=CustomerPublic)
-def read_customer(
-    id: uuid.UUID, session: SessionDep
+async def read_customer(
+    id: uuid.UUID, session: AsyncSessionDep,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(CustomerPublic),
 ) -> Any:
-    customer = crud_get_customer(session=session, id=id)
+    customer = await crud_get_customer(session=session, id=id, fields=fields)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    return CustomerPublic.model_validate(customer)
+    return item_response(CustomerPublic, customer, fields=fields)
 
 @router.post("/", response_model=CustomerPublic)
-def create_customer(
-    customer_in: CustomerCreate, session: SessionDep
+async def create_customer(
+    customer_in: CustomerCreate, session: AsyncSessionDep
 ) -> Any:
-    customer = crud_create_customer(session=session, customer_create=customer_in)
+    customer = await crud_create_customer(session=session, customer_create=customer_in)
     return CustomerPublic.model_validate(customer)
 
 @router.put("/{id}", response_model=CustomerPublic)
-def update_customer(
-    id: uuid.UUID, customer_in: CustomerUpdate, session: SessionDep
+async def update_customer(
+    id: uuid.UUID, customer_in: CustomerUpdate, session: AsyncSessionDep
 ) -> Any:
-    customer = crud_get_customer(session=session, id=id)
+    customer = await crud_get_customer(session=session, id=id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    customer = crud_update_customer(session=session, db_customer=customer, customer_in=customer_in)
+    customer = await crud_update_customer(session=session, db_customer=customer, customer_in=customer_in)
     return CustomerPublic.model_validate(customer)
 
 @router.delete("/{id}")
-def delete_customer(
-    id: uuid.UUID, session: SessionDep
+async def delete_customer(
+    id: uuid.UUID, session: AsyncSessionDep
 ):
-    customer = crud_get_customer(session=session, id=id)
+    customer = await crud_get_customer(session=session, id=id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    crud_delete_customer(session=session, customer=customer)
+    await crud_delete_customer(session=session, customer=customer)
     return {"message": "Customer deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,36 @@
+from datetime import timedelta
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+
+from app.api.dependency import AsyncSessionDep, CurrentCustomer
+from app.core import security
+from app.core.config import settings
+from app.crud.crud_customer import authenticate_customer as crud_authenticate_customer
+from app.models import CustomerPrincipal, Token
+
+router = APIRouter(prefix="/login", tags=["login"])
+
+@router.post("/access-token", response_model=Token)
+async def login_access_token(
+    session: AsyncSessionDep,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+) -> Any:
+    """
+    Đăng nhập OAuth2 (form username/password), trả access token cho các request sau
+    """
+    customer = await crud_authenticate_customer(
+        session=session, username=form_data.username, password=form_data.password
+    )
+    if not customer:
+        raise HTTPException(status_code=400, detail="Incorrect username or password")
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return Token(access_token=security.create_access_token(customer.id, expires_delta=access_token_expires))
+
+@router.post("/test-token", response_model=CustomerPrincipal)
+async def test_token(current_customer: CurrentCustomer) -> Any:
+    """
+    Kiểm tra access token, trả thông tin customer đang đăng nhập
+    """
+    return current_customer
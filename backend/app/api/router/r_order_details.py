@@ -1,7 +1,9 @@
 import uuid
-from typing import Any
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Body, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import select, func
 
 from app.models import (
@@ -11,50 +13,110 @@ from app.models import (
     OrderDetailPublic,
     OrderDetailsPublic,
     OrderDetailWithVariantPublic,
+    OrderDetailsBulkResult,
 )
-from app.api.dependency import SessionDep
+from app.api.dependency import AsyncSessionDep
+from app.api.responses import ExportFormat, expand_relations, item_response, page_response, sparse_fields, stream_response
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.crud.counting import CountMode
+from app.crud.expand import ExpandTree
 from app.crud.crud_order_detail import (
     create_order_detail as crud_create_order_detail,
     update_order_detail as crud_update_order_detail,
     get_order_detail as crud_get_order_detail,
     get_order_details as crud_get_order_details,
     delete_order_detail as crud_delete_order_detail,
+    bulk_create_order_details as crud_bulk_create_order_details,
+    stream_order_details as crud_stream_order_details,
 )
 
 router = APIRouter(prefix="/order_details", tags=["order_details"])
 
 @router.get("/", response_model=OrderDetailsPublic)
-def read_order_details(
-    session: SessionDep, skip: int = 0, limit: int = 100, order_id: uuid.UUID = None
+async def read_order_details(
+    session: AsyncSessionDep,
+    skip: int = 0,
+    limit: int = 100,
+    order_id: uuid.UUID = None,
+    cursor: Optional[str] = Query(None, description="Token next_cursor của trang trước (phân trang keyset)"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(OrderDetailPublic),
+    expand: ExpandTree = expand_relations(OrderDetail),
 ) -> Any:
-    order_details, count = crud_get_order_details(session=session, skip=skip, limit=limit, order_id=order_id)
-    data = [OrderDetailWithVariantPublic.model_validate(od) for od in order_details]
-    return OrderDetailsPublic(data=data, count=count)
+    order_details, count, next_cursor = await crud_get_order_details(
+        session=session, skip=skip, limit=limit, order_id=order_id, cursor=cursor, count_mode=count_mode, fields=fields, expand=expand
+    )
+    return page_response(OrderDetailsPublic, order_details, fields=fields, expand=expand, count=count, next_cursor=next_cursor)
+
+@router.post("/bulk", response_model=OrderDetailsBulkResult)
+async def bulk_create_order_details(
+    session: AsyncSessionDep,
+    items: List[Any] = Body(..., description="Danh sách OrderDetailCreate"),
+) -> Any:
+    """
+    Tạo nhiều chi tiết đơn hàng trong một transaction; phần tử lỗi được báo theo vị trí
+    """
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} items per request")
+    order_details, errors = await crud_bulk_create_order_details(session=session, items=items)
+    data = [OrderDetailPublic.model_validate(od) for od in order_details]
+    return OrderDetailsBulkResult(data=data, errors=errors)
+
+# Đặt trước /{id} để "export" không bị hiểu là id
+@router.get("/export", response_class=StreamingResponse)
+async def export_order_details(
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Định dạng: ndjson hoặc csv"),
+    date_from: Optional[datetime] = Query(None, description="Từ ngày đặt hàng (bao gồm)"),
+    date_to: Optional[datetime] = Query(None, description="Đến ngày đặt hàng (không bao gồm)"),
+    store_id: Optional[uuid.UUID] = Query(None, description="Lọc theo cửa hàng"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(OrderDetailPublic),
+) -> StreamingResponse:
+    """
+    Export toàn bộ chi tiết đơn hàng dạng stream (NDJSON/CSV) qua server-side cursor,
+    bộ nhớ không tăng theo kích thước bảng.
+    """
+    # Session riêng sống cùng stream (session của dependency có thể đóng trước khi stream xong)
+    async def batches():
+        async with async_session_maker() as session:
+            async for batch in crud_stream_order_details(
+                session=session,
+                date_from=date_from,
+                date_to=date_to,
+                store_id=store_id,
+                fields=fields,
+                batch_size=settings.EXPORT_BATCH_SIZE,
+            ):
+                yield batch
+
+    return stream_response(OrderDetailPublic, batches(), format=format, filename="order_details", fields=fields)
 
 @router.get("/{id}", response_model=OrderDetailPublic)
-def read_order_detail(
-    id: uuid.UUID, session: SessionDep
+async def read_order_detail(
+    id: uuid.UUID, session: AsyncSessionDep,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(OrderDetailPublic),
+    expand: ExpandTree = expand_relations(OrderDetail),
 ) -> Any:
-    order_detail = crud_get_order_detail(session=session, id=id)
+    order_detail = await crud_get_order_detail(session=session, id=id, fields=fields, expand=expand)
     if not order_detail:
         raise HTTPException(status_code=404, detail="OrderDetail not found")
-    return OrderDetailWithVariantPublic.model_validate(order_detail)
+    return item_response(OrderDetailPublic, order_detail, fields=fields, expand=expand)
 
 @router.post("/", response_model=OrderDetailPublic)
-def create_order_detail(
-    order_detail_in: OrderDetailCreate, session: SessionDep
+async def create_order_detail(
+    order_detail_in: OrderDetailCreate, session: AsyncSessionDep
 ) -> Any:
-    order_detail = crud_create_order_detail(session=session, order_detail_create=order_detail_in)
+    order_detail = await crud_create_order_detail(session=session, order_detail_create=order_detail_in)
     return OrderDetailPublic.model_validate(order_detail)
 
 @router.put("/{id}", response_model=OrderDetailPublic)
-def update_order_detail(
-    id: uuid.UUID, order_detail_in: OrderDetailUpdate, session: SessionDep
+async def update_order_detail(
+    id: uuid.UUID, order_detail_in: OrderDetailUpdate, session: AsyncSessionDep
 ) -> Any:
-    order_detail = crud_get_order_detail(session=session, id=id)
+    order_detail = await crud_get_order_detail(session=session, id=id)
     if not order_detail:
         raise HTTPException(status_code=404, detail="OrderDetail not found")
-    order_detail = crud_update_order_detail(
+    order_detail = await crud_update_order_detail(
         session=session, 
         db_order_detail=order_detail, 
         order_detail_in=order_detail_in
@@ -62,11 +124,11 @@ def update_order_detail(
     return OrderDetailPublic.model_validate(order_detail)
 
 @router.delete("/{id}")
-def delete_order_detail(
-    id: uuid.UUID, session: SessionDep
+async def delete_order_detail(
+    id: uuid.UUID, session: AsyncSessionDep
 ):
-    order_detail = crud_get_order_detail(session=session, id=id)
+    order_detail = await crud_get_order_detail(session=session, id=id)
     if not order_detail:
         raise HTTPException(status_code=404, detail="OrderDetail not found")
-    crud_delete_order_detail(session=session, order_detail=order_detail)
+    await crud_delete_order_detail(session=session, order_detail=order_detail)
     return {"message": "OrderDetail deleted successfully"}
\ No newline at end of file
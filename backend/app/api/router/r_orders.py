@@ -1,7 +1,9 @@
 import uuid
-from typing import Any
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlmodel import select, func
 
 from app.models import (
@@ -10,59 +12,143 @@ from app.models import (
     OrderUpdate,
     OrderPublic,
     OrdersPublic,
+    OrderDetailPublic,
+    OrderWithDetailsCreate,
+    OrderWithDetailsPublic,
+    BatchRequest,
 )
-from app.api.dependency import SessionDep
+from app.api.dependency import AsyncSessionDep
+from app.api.responses import ExportFormat, expand_relations, item_response, list_response, page_response, sparse_fields, stream_response
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.crud.counting import CountMode
+from app.crud.expand import ExpandTree
 from app.crud.crud_order import (
     create_order as crud_create_order,
     update_order as crud_update_order,
     get_order as crud_get_order,
     get_orders as crud_get_orders,
+    get_orders_by_ids as crud_get_orders_by_ids,
     delete_order as crud_delete_order,
+    create_order_with_details as crud_create_order_with_details,
+    stream_orders as crud_stream_orders,
+    OrderReferenceError,
 )
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 @router.get("/", response_model=OrdersPublic)
-def read_orders(
-    session: SessionDep, page: int = 1, pageSize: int = 10
+async def read_orders(
+    session: AsyncSessionDep,
+    page: int = Query(1, ge=1, description="Số trang (bắt đầu từ 1), bỏ qua khi có cursor"),
+    pageSize: int = Query(10, ge=1, le=1000, description="Số đơn hàng mỗi trang"),
+    cursor: Optional[str] = Query(None, description="Token next_cursor của trang trước (phân trang keyset)"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(OrderPublic),
+    expand: ExpandTree = expand_relations(Order),
 ) -> Any:
+    # Khi có cursor thì bỏ qua page, đọc trang kế tiếp theo keyset
     skip = (page - 1) * pageSize
-    orders, count = crud_get_orders(session=session, skip=skip, limit=pageSize)
-    data = [OrderPublic.model_validate(order) for order in orders]
-    return OrdersPublic(data=data, count=count, page=page, pageSize=pageSize, totalPages= -(-count // pageSize))
+    orders, count, next_cursor = await crud_get_orders(session=session, skip=skip, limit=pageSize, cursor=cursor, count_mode=count_mode, fields=fields, expand=expand)
+    total_pages = -(-count // pageSize) if count is not None else None
+    if cursor:
+        page = None
+    return page_response(OrdersPublic, orders, fields=fields, expand=expand, count=count, next_cursor=next_cursor, page=page, pageSize=pageSize, totalPages=total_pages)
+
+@router.post("/batch", response_model=List[OrderPublic])
+async def read_orders_by_ids(
+    session: AsyncSessionDep,
+    request: BatchRequest,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(OrderPublic),
+) -> Any:
+    """
+    Lấy nhiều đơn hàng theo danh sách id (một truy vấn IN (...)); id trùng được bỏ,
+    kết quả giữ thứ tự id gửi lên, id không tồn tại bị bỏ qua
+    """
+    if len(request.ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_IDS} ids per request")
+    orders = await crud_get_orders_by_ids(session=session, ids=request.ids, fields=fields)
+    return list_response(OrderPublic, orders, fields=fields)
+
+# Đặt trước /{id} để "export" không bị hiểu là id
+@router.get("/export", response_class=StreamingResponse)
+async def export_orders(
+    format: ExportFormat = Query(ExportFormat.ndjson, description="Định dạng: ndjson hoặc csv"),
+    date_from: Optional[datetime] = Query(None, description="Từ ngày đặt hàng (bao gồm)"),
+    date_to: Optional[datetime] = Query(None, description="Đến ngày đặt hàng (không bao gồm)"),
+    store_id: Optional[uuid.UUID] = Query(None, description="Lọc theo cửa hàng"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(OrderPublic),
+) -> StreamingResponse:
+    """
+    Export toàn bộ đơn hàng dạng stream (NDJSON/CSV) qua server-side cursor,
+    bộ nhớ không tăng theo kích thước bảng.
+    """
+    # Session riêng sống cùng stream (session của dependency có thể đóng trước khi stream xong)
+    async def batches():
+        async with async_session_maker() as session:
+            async for batch in crud_stream_orders(
+                session=session,
+                date_from=date_from,
+                date_to=date_to,
+                store_id=store_id,
+                fields=fields,
+                batch_size=settings.EXPORT_BATCH_SIZE,
+            ):
+                yield batch
+
+    return stream_response(OrderPublic, batches(), format=format, filename="orders", fields=fields)
 
 @router.get("/{id}", response_model=OrderPublic)
-def read_order(
-    id: uuid.UUID, session: SessionDep
+async def read_order(
+    id: uuid.UUID, session: AsyncSessionDep,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(OrderPublic),
+    expand: ExpandTree = expand_relations(Order),
 ) -> Any:
-    order = crud_get_order(session=session, id=id)
+    order = await crud_get_order(session=session, id=id, fields=fields, expand=expand)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    return OrderPublic.model_validate(order)
+    return item_response(OrderPublic, order, fields=fields, expand=expand)
 
 @router.post("/", response_model=OrderPublic)
-def create_order(
-    order_in: OrderCreate, session: SessionDep
+async def create_order(
+    order_in: OrderCreate, session: AsyncSessionDep
 ) -> Any:
-    order = crud_create_order(session=session, order_create=order_in)
+    order = await crud_create_order(session=session, order_create=order_in)
     return OrderPublic.model_validate(order)
 
+@router.post("/checkout", response_model=OrderWithDetailsPublic)
+async def checkout_order(
+    order_in: OrderWithDetailsCreate, session: AsyncSessionDep
+) -> Any:
+    """
+    Tạo đơn hàng cùng toàn bộ chi tiết trong một request/transaction.
+    Giá từng dòng lấy từ variant, tổng tiền được tính phía server.
+    """
+    try:
+        order, order_details = await crud_create_order_with_details(session=session, order_in=order_in)
+    except OrderReferenceError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return OrderWithDetailsPublic(
+        **OrderPublic.model_validate(order).model_dump(),
+        order_details=[OrderDetailPublic.model_validate(od) for od in order_details],
+    )
+
 @router.put("/{id}", response_model=OrderPublic)
-def update_order(
-    id: uuid.UUID, order_in: OrderUpdate, session: SessionDep
+async def update_order(
+    id: uuid.UUID, order_in: OrderUpdate, session: AsyncSessionDep
 ) -> Any:
-    order = crud_get_order(session=session, id=id)
+    order = await crud_get_order(session=session, id=id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    order = crud_update_order(session=session, db_order=order, order_in=order_in)
+    order = await crud_update_order(session=session, db_order=order, order_in=order_in)
     return OrderPublic.model_validate(order)
 
 @router.delete("/{id}")
-def delete_order(
-    id: uuid.UUID, session: SessionDep
+async def delete_order(
+    id: uuid.UUID, session: AsyncSessionDep
 ):
-    order = crud_get_order(session=session, id=id)
+    order = await crud_get_order(session=session, id=id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    crud_delete_order(session=session, order=order)
+    await crud_delete_order(session=session, order=order)
     return {"message": "Order deleted successfully"}
\ No newline at end of file
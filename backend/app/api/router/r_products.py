@@ -1,7 +1,7 @@
 import uuid
-from typing import Any, Optional
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Body, HTTPException, Query, Response
 from sqlmodel import select, func
 
 from app.models import (
@@ -10,80 +10,130 @@ from app.models import (
     ProductUpdate,
     ProductPublic,
     ProductsPublic,
+    ProductsBulkResult,
+    BatchRequest,
 )
-from app.api.dependency import SessionDep
+from app.api.conditional import conditional_get
+from app.api.dependency import AsyncSessionDep
+from app.api.responses import item_response, list_response, page_response, sparse_fields
+from app.core.config import settings
+from app.crud.counting import CountMode
 from app.crud.crud_product import (
     create_product as crud_create_product,
     update_product as crud_update_product,
     get_product as crud_get_product,
+    get_product_public as crud_get_product_public,
     get_products as crud_get_products,
+    get_products_by_ids as crud_get_products_by_ids,
     delete_product as crud_delete_product,
     search_products as crud_search_products,
+    bulk_update_products as crud_bulk_update_products,
 )
 
 router = APIRouter(prefix="/products", tags=["products"])
 
-@router.get("/", response_model=ProductsPublic)
-def read_products(
-    session: SessionDep, skip: int = 0, limit: int = 100
+@router.get("/", response_model=ProductsPublic, dependencies=[conditional_get(Product.__tablename__)])
+async def read_products(
+    session: AsyncSessionDep,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Token next_cursor của trang trước (phân trang keyset)"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(ProductPublic),
 ) -> Any:
-    products, count = crud_get_products(session=session, skip=skip, limit=limit)
+    products, count, next_cursor = await crud_get_products(session=session, skip=skip, limit=limit, cursor=cursor, count_mode=count_mode)
+    # Trang lấy từ cache catalog (đủ cột, dùng chung cho mọi `fields`): chỉ lọc trường khi serialize
+    return page_response(ProductsPublic, products, fields=fields, response=response, count=count, next_cursor=next_cursor)
+
+@router.patch("/bulk", response_model=ProductsBulkResult)
+async def bulk_update_products(
+    session: AsyncSessionDep,
+    items: List[Any] = Body(..., description="Danh sách ProductBulkUpdateItem (id + các trường cần sửa)"),
+) -> Any:
+    """
+    Cập nhật nhiều sản phẩm trong một transaction; phần tử lỗi được báo theo vị trí
+    """
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} items per request")
+    products, errors = await crud_bulk_update_products(session=session, items=items)
     data = [ProductPublic.model_validate(prod) for prod in products]
-    return ProductsPublic(data=data, count=count)
+    return ProductsBulkResult(data=data, errors=errors)
+
+@router.post("/batch", response_model=List[ProductPublic])
+async def read_products_by_ids(
+    session: AsyncSessionDep,
+    request: BatchRequest,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(ProductPublic),
+) -> Any:
+    """
+    Lấy nhiều sản phẩm theo danh sách id (đọc qua cache catalog, chỉ id chưa có trong cache mới truy vấn database); id trùng được bỏ,
+    kết quả giữ thứ tự id gửi lên, id không tồn tại bị bỏ qua
+    """
+    if len(request.ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_IDS} ids per request")
+    products = await crud_get_products_by_ids(session=session, ids=request.ids)
+    return list_response(ProductPublic, products, fields=fields)
+
+# Đặt trước /{id} để "search" không bị hiểu là id
+@router.get("/search", response_model=ProductsPublic, dependencies=[conditional_get(Product.__tablename__)])
+async def search_products(
+    session: AsyncSessionDep,
+    response: Response,
+    q: str = Query(..., description="Từ khóa tìm kiếm"),
+    skip: int = Query(0, ge=0, description="Số bản ghi bỏ qua"),
+    limit: int = Query(100, ge=1, le=1000, description="Số bản ghi tối đa"),
+    category_id: Optional[uuid.UUID] = Query(None, description="Lọc theo danh mục"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(ProductPublic),
+) -> Any:
+    """
+    Tìm kiếm sản phẩm theo tên và mô tả
+    """
+    products, count = await crud_search_products(
+        session=session, 
+        query=q, 
+        skip=skip, 
+        limit=limit,
+        category_id=category_id,
+        count_mode=count_mode,
+        fields=fields
+    )
+    return page_response(ProductsPublic, products, fields=fields, response=response, count=count)
 
-@router.get("/{id}", response_model=ProductPublic)
-def read_product(
-    id: uuid.UUID, session: SessionDep
+@router.get("/{id}", response_model=ProductPublic, dependencies=[conditional_get(Product.__tablename__)])
+async def read_product(
+    id: uuid.UUID, session: AsyncSessionDep, response: Response,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(ProductPublic),
 ) -> Any:
-    product = crud_get_product(session=session, id=id)
+    product = await crud_get_product_public(session=session, id=id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return ProductPublic.model_validate(product)
+    return item_response(ProductPublic, product, fields=fields, response=response)
 
 @router.post("/", response_model=ProductPublic)
-def create_product(
-    product_in: ProductCreate, session: SessionDep
+async def create_product(
+    product_in: ProductCreate, session: AsyncSessionDep
 ) -> Any:
-    product = crud_create_product(session=session, product_create=product_in)
+    product = await crud_create_product(session=session, product_create=product_in)
     return ProductPublic.model_validate(product)
 
 @router.put("/{id}", response_model=ProductPublic)
-def update_product(
-    id: uuid.UUID, product_in: ProductUpdate, session: SessionDep
+async def update_product(
+    id: uuid.UUID, product_in: ProductUpdate, session: AsyncSessionDep
 ) -> Any:
-    product = crud_get_product(session=session, id=id)
+    product = await crud_get_product(session=session, id=id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    product = crud_update_product(session=session, db_product=product, product_in=product_in)
+    product = await crud_update_product(session=session, db_product=product, product_in=product_in)
     return ProductPublic.model_validate(product)
 
 @router.delete("/{id}")
-def delete_product(
-    id: uuid.UUID, session: SessionDep
+async def delete_product(
+    id: uuid.UUID, session: AsyncSessionDep
 ):
-    product = crud_get_product(session=session, id=id)
+    product = await crud_get_product(session=session, id=id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    crud_delete_product(session=session, product=product)
+    await crud_delete_product(session=session, product=product)
     return {"message": "Product deleted successfully"}
-
-@router.get("/search", response_model=ProductsPublic)
-def search_products(
-    session: SessionDep,
-    q: str = Query(..., description="Từ khóa tìm kiếm"),
-    skip: int = Query(0, ge=0, description="Số bản ghi bỏ qua"),
-    limit: int = Query(100, ge=1, le=1000, description="Số bản ghi tối đa"),
-    category_id: Optional[uuid.UUID] = Query(None, description="Lọc theo danh mục")
-) -> Any:
-    """
-    Tìm kiếm sản phẩm theo tên và mô tả
-    """
-    products, count = crud_search_products(
-        session=session, 
-        query=q, 
-        skip=skip, 
-        limit=limit,
-        category_id=category_id
-    )
-    data = [ProductPublic.model_validate(prod) for prod in products]
-    return ProductsPublic(data=data, count=count)
\ No newline at end of file
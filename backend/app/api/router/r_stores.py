@@ -1,7 +1,7 @@
 import uuid
-from typing import Any
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Response
 from sqlmodel import select, func
 
 from app.models import (
@@ -10,50 +10,77 @@ from app.models import (
     StoreUpdate,
     StorePublic,
     StoresPublic,
+    BatchRequest,
 )
-from app.api.dependency import SessionDep
+from app.api.conditional import conditional_get
+from app.api.dependency import AsyncSessionDep
+from app.api.responses import item_response, list_response, page_response, sparse_fields
+from app.core.config import settings
+from app.crud.counting import CountMode
 from app.crud.crud_store import (
     create_store as crud_create_store,
     update_store as crud_update_store,
     get_store as crud_get_store,
     get_stores as crud_get_stores,
+    get_stores_by_ids as crud_get_stores_by_ids,
     delete_store as crud_delete_store,
 )
 
 router = APIRouter(prefix="/stores", tags=["stores"])
 
-@router.get("/", response_model=StoresPublic)
-def read_stores(
-    session: SessionDep, skip: int = 0, limit: int = 100
+@router.get("/", response_model=StoresPublic, dependencies=[conditional_get(Store.__tablename__)])
+async def read_stores(
+    session: AsyncSessionDep,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None, description="Token next_cursor của trang trước (phân trang keyset)"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(StorePublic),
 ) -> Any:
-    stores, count = crud_get_stores(session=session, skip=skip, limit=limit)
-    data = [StorePublic.model_validate(store) for store in stores]
-    return StoresPublic(data=data, count=count)
+    stores, count, next_cursor = await crud_get_stores(session=session, skip=skip, limit=limit, cursor=cursor, count_mode=count_mode, fields=fields)
+    return page_response(StoresPublic, stores, fields=fields, response=response, count=count, next_cursor=next_cursor)
 
-@router.get("/{id}", response_model=StorePublic)
-def read_store(
-    id: uuid.UUID, session: SessionDep
+@router.post("/batch", response_model=List[StorePublic])
+async def read_stores_by_ids(
+    session: AsyncSessionDep,
+    request: BatchRequest,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(StorePublic),
 ) -> Any:
-    store = crud_get_store(session=session, id=id)
+    """
+    Lấy nhiều cửa hàng theo danh sách id (đọc qua cache catalog, chỉ id chưa có trong cache mới truy vấn database); id trùng được bỏ,
+    kết quả giữ thứ tự id gửi lên, id không tồn tại bị bỏ qua
+    """
+    if len(request.ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_IDS} ids per request")
+    stores = await crud_get_stores_by_ids(session=session, ids=request.ids)
+    return list_response(StorePublic, stores, fields=fields)
+
+@router.get("/{id}", response_model=StorePublic, dependencies=[conditional_get(Store.__tablename__)])
+async def read_store(
+    id: uuid.UUID, session: AsyncSessionDep, response: Response,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(StorePublic),
+) -> Any:
+    store = await crud_get_store(session=session, id=id, fields=fields)
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
-    return StorePublic.model_validate(store)
+    return item_response(StorePublic, store, fields=fields, response=response)
 
 @router.post("/", response_model=StorePublic)
-def create_store(
-    store_in: StoreCreate, session: SessionDep
+async def create_store(
+    store_in: StoreCreate, session: AsyncSessionDep
 ) -> Any:
-    store = crud_create_store(session=session, store_create=store_in)
+    store = await crud_create_store(session=session, store_create=store_in)
     return StorePublic.model_validate(store)
 
 @router.put("/{id}", response_model=StorePublic)
-def update_store(
-    id: uuid.UUID, store_in: StoreUpdate, session: SessionDep
+async def update_store(
+    id: uuid.UUID, store_in: StoreUpdate, session: AsyncSessionDep
 ) -> Any:
-    store = crud_get_store(session=session, id=id)
+    store = await crud_get_store(session=session, id=id)
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
-    store = crud_update_store(
+    store = await crud_update_store(
         session=session,
         db_store=store,
         store_in=store_in
@@ -61,11 +88,11 @@ def update_store(
     return StorePublic.model_validate(store)
 
 @router.delete("/{id}")
-def delete_store(
-    id: uuid.UUID, session: SessionDep
+async def delete_store(
+    id: uuid.UUID, session: AsyncSessionDep
 ):
-    store = crud_get_store(session=session, id=id)
+    store = await crud_get_store(session=session, id=id)
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
-    crud_delete_store(session=session, store=store)
+    await crud_delete_store(session=session, store=store)
     return {"message": "Store deleted successfully"}
\ No newline at end of file
@@ -1,9 +1,9 @@
+import logging
 import uuid
-from typing import Any, Optional, List
+from typing import Any, List, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Body, HTTPException, Query, Response
 from sqlmodel import select, func
-from pydantic import BaseModel
 
 from app.models import (
     Variant,
@@ -11,110 +11,154 @@ from app.models import (
     VariantUpdate,
     VariantPublic,
     VariantsPublic,
+    VariantsBulkResult,
+    BulkDeleteRequest,
+    BulkDeleteResult,
+    BatchRequest,
 )
-from app.api.dependency import SessionDep
+from app.api.conditional import conditional_get
+from app.api.dependency import AsyncSessionDep
+from app.api.responses import item_response, list_response, page_response, sparse_fields
+from app.core.config import settings
+from app.crud.counting import CountMode
 from app.crud.crud_variant import (
     create_variant as crud_create_variant,
     update_variant as crud_update_variant,
     get_variant as crud_get_variant,
+    get_variant_public as crud_get_variant_public,
     get_variants as crud_get_variants,
     delete_variant as crud_delete_variant,
     search_variants as crud_search_variants,
     get_variants_by_ids as crud_get_variants_by_ids,
+    bulk_create_variants as crud_bulk_create_variants,
+    bulk_delete_variants as crud_bulk_delete_variants,
 )
 
 router = APIRouter(prefix="/variants", tags=["variants"])
 
-@router.get("/", response_model=VariantsPublic)
-def read_variants(
-    session: SessionDep,
+logger = logging.getLogger(__name__)
+
+@router.get("/", response_model=VariantsPublic, dependencies=[conditional_get(Variant.__tablename__)])
+async def read_variants(
+    session: AsyncSessionDep,
+    response: Response,
     skip: int = 0,
     limit: int | None = Query(default=None, ge=1),
-    product_id: uuid.UUID | None = Query(default=None)
+    product_id: uuid.UUID | None = Query(default=None),
+    cursor: Optional[str] = Query(None, description="Token next_cursor của trang trước (phân trang keyset)"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(VariantPublic),
+) -> Any:
+    variants, count, next_cursor = await crud_get_variants(
+        session=session, skip=skip, limit=limit, product_id=product_id, cursor=cursor, count_mode=count_mode
+    )
+    # Trang lấy từ cache catalog (đủ cột, dùng chung cho mọi `fields`): chỉ lọc trường khi serialize
+    return page_response(VariantsPublic, variants, fields=fields, response=response, count=count, next_cursor=next_cursor)
+
+@router.post("/bulk", response_model=VariantsBulkResult)
+async def bulk_create_variants(
+    session: AsyncSessionDep,
+    items: List[Any] = Body(..., description="Danh sách VariantCreate"),
 ) -> Any:
-    variants, count = crud_get_variants(session=session, skip=skip, limit=limit, product_id=product_id)
+    """
+    Tạo nhiều variant trong một transaction; phần tử lỗi được báo theo vị trí
+    """
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} items per request")
+    variants, errors = await crud_bulk_create_variants(session=session, items=items)
     data = [VariantPublic.model_validate(var) for var in variants]
-    return VariantsPublic(data=data, count=count)
+    return VariantsBulkResult(data=data, errors=errors)
+
+@router.delete("/bulk", response_model=BulkDeleteResult)
+async def bulk_delete_variants(
+    session: AsyncSessionDep,
+    request: BulkDeleteRequest,
+) -> Any:
+    if len(request.ids) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} items per request")
+    deleted, errors = await crud_bulk_delete_variants(session=session, ids=request.ids)
+    return BulkDeleteResult(deleted=deleted, errors=errors)
+
+# Đặt trước /{id} để "search" không bị hiểu là id
+@router.get("/search", response_model=VariantsPublic, dependencies=[conditional_get(Variant.__tablename__)])
+async def search_variants(
+    session: AsyncSessionDep,
+    response: Response,
+    q: str = Query("", description="Từ khóa tìm kiếm (beverage_option)"),
+    skip: int = Query(0, ge=0, description="Số bản ghi bỏ qua"),
+    limit: int = Query(100, ge=1, le=1000, description="Số bản ghi tối đa"),
+    product_id: Optional[uuid.UUID] = Query(None, description="Lọc theo sản phẩm"),
+    min_price: Optional[float] = Query(None, ge=0, description="Giá tối thiểu"),
+    max_price: Optional[float] = Query(None, ge=0, description="Giá tối đa"),
+    count_mode: CountMode = Query(CountMode.exact, description="Cách tính count: exact, estimated hoặc none"),
+    fields: Optional[Tuple[str, ...]] = sparse_fields(VariantPublic),
+) -> Any:
+    """
+    Tìm kiếm variant theo beverage_option và các tiêu chí khác
+    """
+    variants, count = await crud_search_variants(
+        session=session, 
+        query=q, 
+        skip=skip, 
+        limit=limit,
+        product_id=product_id,
+        min_price=min_price,
+        max_price=max_price,
+        count_mode=count_mode,
+        fields=fields
+    )
+    return page_response(VariantsPublic, variants, fields=fields, response=response, count=count)
 
-@router.get("/{id}", response_model=VariantPublic)
-def read_variant(
-    id: uuid.UUID, session: SessionDep
+@router.get("/{id}", response_model=VariantPublic, dependencies=[conditional_get(Variant.__tablename__)])
+async def read_variant(
+    id: uuid.UUID, session: AsyncSessionDep, response: Response,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(VariantPublic),
 ) -> Any:
-    variant = crud_get_variant(session=session, id=id)
+    variant = await crud_get_variant_public(session=session, id=id)
     if not variant:
         raise HTTPException(status_code=404, detail="Variant not found")
-    return VariantPublic.model_validate(variant)
+    return item_response(VariantPublic, variant, fields=fields, response=response)
 
 @router.post("/", response_model=VariantPublic)
-def create_variant(
-    variant_in: VariantCreate, session: SessionDep
+async def create_variant(
+    variant_in: VariantCreate, session: AsyncSessionDep
 ) -> Any:
-    variant = crud_create_variant(session=session, variant_create=variant_in)
+    variant = await crud_create_variant(session=session, variant_create=variant_in)
     return VariantPublic.model_validate(variant)
 
 @router.put("/{id}", response_model=VariantPublic)
-def update_variant(
-    id: uuid.UUID, variant_in: VariantUpdate, session: SessionDep
+async def update_variant(
+    id: uuid.UUID, variant_in: VariantUpdate, session: AsyncSessionDep
 ) -> Any:
-    variant = crud_get_variant(session=session, id=id)
+    variant = await crud_get_variant(session=session, id=id)
     if not variant:
         raise HTTPException(status_code=404, detail="Variant not found")
-    variant = crud_update_variant(session=session, db_variant=variant, variant_in=variant_in)
+    variant = await crud_update_variant(session=session, db_variant=variant, variant_in=variant_in)
     return VariantPublic.model_validate(variant)
 
 @router.delete("/{id}")
-def delete_variant(
-    id: uuid.UUID, session: SessionDep
+async def delete_variant(
+    id: uuid.UUID, session: AsyncSessionDep
 ):
-    variant = crud_get_variant(session=session, id=id)
+    variant = await crud_get_variant(session=session, id=id)
     if not variant:
         raise HTTPException(status_code=404, detail="Variant not found")
-    crud_delete_variant(session=session, variant=variant)
+    await crud_delete_variant(session=session, variant=variant)
     return {"message": "Variant deleted successfully"}
 
-class VariantBatchRequest(BaseModel):
-    ids: List[uuid.UUID]
-
 @router.post("/batch", response_model=List[VariantPublic])
-def get_variants_by_ids(
-    session: SessionDep,
-    request: VariantBatchRequest
-) -> Any:
-    print(f"🔍 Batch request received with {len(request.ids)} IDs:")
-    for i, variant_id in enumerate(request.ids):
-        print(f"  {i+1}. {variant_id} (type: {type(variant_id)})")
-    
-    variants = crud_get_variants_by_ids(session=session, ids=request.ids)
-    print(f"📋 Found {len(variants)} variants in database")
-    
-    for i, variant in enumerate(variants):
-        print(f"  {i+1}. ID: {variant.id}, Name: {variant.beverage_option}")
-    
-    data = [VariantPublic.model_validate(var) for var in variants]
-    print(f"✅ Returning {len(data)} variants to frontend")
-    return data
-
-@router.get("/search", response_model=VariantsPublic)
-def search_variants(
-    session: SessionDep,
-    q: str = Query("", description="Từ khóa tìm kiếm (beverage_option)"),
-    skip: int = Query(0, ge=0, description="Số bản ghi bỏ qua"),
-    limit: int = Query(100, ge=1, le=1000, description="Số bản ghi tối đa"),
-    product_id: Optional[uuid.UUID] = Query(None, description="Lọc theo sản phẩm"),
-    min_price: Optional[float] = Query(None, ge=0, description="Giá tối thiểu"),
-    max_price: Optional[float] = Query(None, ge=0, description="Giá tối đa")
+async def get_variants_by_ids(
+    session: AsyncSessionDep,
+    request: BatchRequest,
+    fields: Optional[Tuple[str, ...]] = sparse_fields(VariantPublic),
 ) -> Any:
     """
-    Tìm kiếm variant theo beverage_option và các tiêu chí khác
+    Lấy nhiều variant theo danh sách id (đọc qua cache catalog, chỉ id chưa có trong cache
+    mới truy vấn database); id trùng được bỏ, kết quả giữ thứ tự id gửi lên
     """
-    variants, count = crud_search_variants(
-        session=session, 
-        query=q, 
-        skip=skip, 
-        limit=limit,
-        product_id=product_id,
-        min_price=min_price,
-        max_price=max_price
-    )
-    data = [VariantPublic.model_validate(var) for var in variants]
-    return VariantsPublic(data=data, count=count)
+    if len(request.ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_IDS} ids per request")
+    variants = await crud_get_variants_by_ids(session=session, ids=request.ids)
+    # Chi phí log không phụ thuộc kích thước lô: chỉ ghi số lượng
+    logger.debug("variant batch", extra={"requested": len(request.ids), "found": len(variants)})
+    return list_response(VariantPublic, variants, fields=fields)
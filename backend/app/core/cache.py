@@ -0,0 +1,117 @@
+# File: backend/app/core/cache.py
+# Cache read-through cho dữ liệu đọc nhiều, ít thay đổi như catalog
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, TypeVar
+
+from pydantic import TypeAdapter
+
+from app.core.cache_backends import MISSING, CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class CatalogCache:
+    """
+    Cache read-through cho các hàm đọc catalog (categories, products, variants).
+
+    Mỗi namespace có một "generation" do backend giữ; ghi dữ liệu sẽ tăng generation
+    nên mọi khóa cũ tự động không còn được đọc. Loader nào bắt đầu trước khi invalidate
+    sẽ lưu kết quả dưới generation cũ, nhờ vậy không thể ghi đè dữ liệu cũ lên cache mới.
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._invalidations: dict[str, int] = {}
+        self._versions: dict[str, Tuple[str, datetime]] = {}
+
+    async def get_or_load(
+        self,
+        namespace: str,
+        key: Hashable,
+        loader: Callable[[], Awaitable[T]],
+        adapter: TypeAdapter[T],
+    ) -> T:
+        generation = await self.backend.generation(namespace)
+        if generation is None:
+            return await loader()
+        value = await self.backend.get(namespace, generation, key, adapter)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = await loader()
+        await self.backend.set(namespace, generation, key, value, adapter)
+        return value
+
+    async def get_many_or_load(
+        self,
+        namespace: str,
+        keys: Sequence[Hashable],
+        loader: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Optional[T]]]],
+        adapter: TypeAdapter[Optional[T]],
+    ) -> List[Optional[T]]:
+        """
+        Như get_or_load cho nhiều khóa: đọc cache một lượt, `loader` chỉ nhận các khóa còn
+        thiếu và trả dict khóa -> giá trị; khóa loader không trả về được cache là None
+        """
+        generation = await self.backend.generation(namespace)
+        if generation is None:
+            loaded = await loader(list(keys))
+            return [loaded.get(key) for key in keys]
+        values = await self.backend.get_many(namespace, generation, keys, adapter)
+        missing = [key for key, value in zip(keys, values) if value is MISSING]
+        self.hits += len(keys) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return values
+        loaded = await loader(missing)
+        fresh = {key: loaded.get(key) for key in missing}
+        await self.backend.set_many(namespace, generation, fresh, adapter)
+        return [fresh[key] if value is MISSING else value for key, value in zip(keys, values)]
+
+    async def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            self._invalidations[namespace] = self._invalidations.get(namespace, 0) + 1
+            await self.backend.bump(namespace)
+
+    async def version(self, namespace: str) -> Optional[Tuple[str, datetime]]:
+        """
+        Phiên bản hiện tại của bảng (dùng cho ETag) và thời điểm worker này thấy
+        phiên bản đó lần đầu (dùng cho Last-Modified); None nếu backend không dùng được
+        """
+        generation = await self.backend.generation(namespace)
+        if generation is None:
+            return None
+        token = f"{self.backend.epoch}{generation}"
+        seen = self._versions.get(namespace)
+        if seen is None or seen[0] != token:
+            seen = (token, datetime.now(timezone.utc).replace(microsecond=0))
+            self._versions[namespace] = seen
+        return seen
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else None,
+            "invalidations": dict(self._invalidations),
+        } | self.backend.stats()
+
+
+# Chọn backend theo cấu hình: "memory" cho một worker, "redis" khi chạy nhiều worker/pod
+def build_cache_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(
+            settings.CACHE_REDIS_URL,
+            prefix=settings.CACHE_KEY_PREFIX,
+            ttl=settings.CATALOG_CACHE_TTL_SECONDS,
+        )
+    return MemoryCacheBackend(settings.CATALOG_CACHE_TTL_SECONDS, settings.CATALOG_CACHE_MAX_ENTRIES)
+
+
+catalog_cache = CatalogCache(build_cache_backend())
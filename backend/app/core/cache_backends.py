@@ -0,0 +1,352 @@
+# File: backend/app/core/cache_backends.py
+# Backend lưu trữ cho CatalogCache: trong process (một worker) hoặc Redis (nhiều worker/pod)
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from pydantic import TypeAdapter
+
+logger = logging.getLogger(__name__)
+
+# Giá trị đánh dấu "không có trong cache" (phân biệt với None được cache)
+MISSING = object()
+
+# Trường chứa epoch trong hash generation của Redis (tên bảng không bắt đầu bằng "@")
+EPOCH_FIELD = "@epoch"
+
+
+class TTLCache:
+    """
+    Cache LRU có thời hạn sống cho từng entry, kèm bộ đếm hit/miss.
+    Khóa là tuple, phần tử đầu tiên là namespace (vd: tên bảng).
+    """
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Tuple[Hashable, ...], Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Hashable, ...], default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Tuple[Hashable, ...], value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key: Tuple[Hashable, ...]) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_namespace(self, namespace: Hashable) -> None:
+        with self._lock:
+            for key in [k for k in self._data if k[0] == namespace]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else None,
+            }
+
+
+class CacheBackend:
+    """
+    Giao diện backend của cache catalog.
+
+    Mỗi namespace (tên bảng) có một số generation; khóa cache chứa generation nên
+    tăng generation (`bump`) là cách invalidate. Backend dùng chung giữa nhiều worker
+    phải phát thông điệp invalidate để các worker khác thấy generation mới.
+    """
+
+    name = "base"
+    # Generation dùng chung cho mọi process (ghi ở worker/script khác cũng thấy)
+    shared = False
+    # Tiền tố cho phiên bản (ETag): đổi khi generation có thể bị đếm lại từ 0
+    epoch = ""
+
+    async def generation(self, namespace: str) -> Optional[int]:
+        """Generation hiện tại; None nếu backend không dùng được (bỏ qua cache)"""
+        raise NotImplementedError
+
+    async def get(self, namespace: str, generation: int, key: Hashable, adapter: TypeAdapter) -> Any:
+        """Giá trị đã cache hoặc MISSING"""
+        raise NotImplementedError
+
+    async def set(self, namespace: str, generation: int, key: Hashable, value: Any, adapter: TypeAdapter) -> None:
+        raise NotImplementedError
+
+    async def get_many(self, namespace: str, generation: int, keys: Sequence[Hashable], adapter: TypeAdapter) -> List[Any]:
+        """Giá trị của nhiều khóa (MISSING cho khóa chưa cache), cùng thứ tự với `keys`"""
+        return [await self.get(namespace, generation, key, adapter) for key in keys]
+
+    async def set_many(self, namespace: str, generation: int, values: Dict[Hashable, Any], adapter: TypeAdapter) -> None:
+        for key, value in values.items():
+            await self.set(namespace, generation, key, value, adapter)
+
+    async def bump(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    async def start(self) -> None:
+        """Khởi động tác vụ nền (vd: lắng nghe thông điệp invalidate)"""
+
+    async def close(self) -> None:
+        """Dừng tác vụ nền, đóng kết nối"""
+
+    def stats(self) -> dict[str, Any]:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Lưu đối tượng Python trực tiếp trong TTLCache của process, không cần serialize"""
+
+    name = "memory"
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self._store = TTLCache(ttl, max_entries)
+        self._generations: dict[str, int] = {}
+        # Generation đếm lại từ 0 mỗi lần khởi động process
+        self.epoch = uuid.uuid4().hex[:8]
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def get(self, namespace: str, generation: int, key: Hashable, adapter: TypeAdapter) -> Any:
+        return self._store.get((namespace, generation, key), MISSING)
+
+    async def set(self, namespace: str, generation: int, key: Hashable, value: Any, adapter: TypeAdapter) -> None:
+        self._store.set((namespace, generation, key), value)
+
+    async def bump(self, namespace: str) -> None:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        self._store.discard_namespace(namespace)
+
+    def stats(self) -> dict[str, Any]:
+        store = self._store.stats()
+        return {key: store[key] for key in ("entries", "max_entries", "ttl_seconds", "evictions")}
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Lưu giá trị (JSON qua TypeAdapter) trong Redis, dùng chung cho mọi worker.
+
+    Generation của các namespace nằm trong hash `<prefix>:generations` (HINCRBY khi ghi)
+    và được phát qua kênh pub/sub `<prefix>:invalidate`. Mỗi worker giữ bản sao
+    generation cục bộ, cập nhật từ kênh này; khi chưa/không lắng nghe được thì đọc
+    generation trực tiếp từ Redis ở mỗi lần truy cập để không trả dữ liệu cũ.
+
+    Cùng hash có trường epoch (tạo bằng HSETNX khi chưa có). Redis khởi động lại không
+    persistence hoặc hash bị evict thì generation đếm lại từ 0 cùng một epoch mới: worker
+    thấy epoch đổi (khi đọc, tối đa `epoch_check` giây một lần lúc đang lắng nghe, hoặc
+    qua thông điệp invalidate) thì bỏ generation cục bộ; ETag chứa epoch nên ETag cũ
+    không khớp lại.
+
+    `client` nhận bất kỳ client tương thích redis.asyncio (vd: fakeredis khi test).
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        client: Any = None,
+        prefix: str = "catalog",
+        ttl: float = 60.0,
+        epoch_check: float = 1.0,
+    ) -> None:
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+            client = redis.from_url(url)
+        self._client = client
+        self._prefix = prefix
+        self._ttl_ms = max(1, int(ttl * 1000))
+        self._channel = f"{prefix}:invalidate"
+        self._generations_key = f"{prefix}:generations"
+        self._generations: dict[str, int] = {}
+        self._epoch_check = epoch_check
+        self._epoch_checked_at = 0.0
+        self._listening = False
+        self._listener: Optional[asyncio.Task] = None
+        self.errors = 0
+
+    def _value_key(self, namespace: str, generation: int, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return f"{self._prefix}:{namespace}:{generation}:{digest}"
+
+    def _remember(self, namespace: str, generation: int) -> None:
+        # Thông điệp có thể đến không theo thứ tự: chỉ nhận generation lớn hơn (trong cùng epoch)
+        if generation > self._generations.get(namespace, -1):
+            self._generations[namespace] = generation
+
+    def _set_epoch(self, epoch: Any) -> None:
+        epoch = epoch.decode() if isinstance(epoch, bytes) else str(epoch)
+        if epoch != self.epoch:
+            # Generation trong Redis đã đếm lại: bản sao cục bộ không còn so sánh được
+            if self.epoch:
+                logger.warning("Redis cache epoch changed, resetting local generations")
+            self.epoch = epoch
+            self._generations.clear()
+
+    async def _read_generation(self, namespace: str) -> int:
+        epoch, value = await self._client.hmget(self._generations_key, EPOCH_FIELD, namespace)
+        if epoch is None:
+            # Hash chưa có hoặc đã mất (Redis khởi động lại, bị evict): tạo epoch mới;
+            # HSETNX để các worker cùng tạo lại chỉ giữ một giá trị
+            await self._client.hsetnx(self._generations_key, EPOCH_FIELD, uuid.uuid4().hex[:8])
+            epoch, value = await self._client.hmget(self._generations_key, EPOCH_FIELD, namespace)
+        self._set_epoch(epoch)
+        self._epoch_checked_at = time.monotonic()
+        return int(value) if value is not None else 0
+
+    async def generation(self, namespace: str) -> Optional[int]:
+        if (
+            self._listening
+            and namespace in self._generations
+            and time.monotonic() - self._epoch_checked_at < self._epoch_check
+        ):
+            return self._generations[namespace]
+        try:
+            generation = await self._read_generation(namespace)
+        except Exception:
+            self.errors += 1
+            logger.warning("Redis cache unavailable, bypassing cache", exc_info=True)
+            return None
+        if self._listening:
+            self._remember(namespace, generation)
+            return self._generations[namespace]
+        return generation
+
+    async def get(self, namespace: str, generation: int, key: Hashable, adapter: TypeAdapter) -> Any:
+        try:
+            raw = await self._client.get(self._value_key(namespace, generation, key))
+        except Exception:
+            self.errors += 1
+            logger.warning("Redis cache read failed", exc_info=True)
+            return MISSING
+        return MISSING if raw is None else adapter.validate_json(raw)
+
+    async def set(self, namespace: str, generation: int, key: Hashable, value: Any, adapter: TypeAdapter) -> None:
+        try:
+            await self._client.set(self._value_key(namespace, generation, key), adapter.dump_json(value), px=self._ttl_ms)
+        except Exception:
+            self.errors += 1
+            logger.warning("Redis cache write failed", exc_info=True)
+
+    async def get_many(self, namespace: str, generation: int, keys: Sequence[Hashable], adapter: TypeAdapter) -> List[Any]:
+        # Một lệnh MGET thay vì một round trip cho mỗi khóa
+        if not keys:
+            return []
+        try:
+            raws = await self._client.mget([self._value_key(namespace, generation, key) for key in keys])
+        except Exception:
+            self.errors += 1
+            logger.warning("Redis cache read failed", exc_info=True)
+            return [MISSING] * len(keys)
+        return [MISSING if raw is None else adapter.validate_json(raw) for raw in raws]
+
+    async def set_many(self, namespace: str, generation: int, values: Dict[Hashable, Any], adapter: TypeAdapter) -> None:
+        if not values:
+            return
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for key, value in values.items():
+                pipe.set(self._value_key(namespace, generation, key), adapter.dump_json(value), px=self._ttl_ms)
+            await pipe.execute()
+        except Exception:
+            self.errors += 1
+            logger.warning("Redis cache write failed", exc_info=True)
+
+    async def bump(self, namespace: str) -> None:
+        # Dữ liệu đã commit nên không báo lỗi cho request; entry cũ hết hạn theo TTL
+        try:
+            pipe = self._client.pipeline(transaction=True)
+            pipe.hsetnx(self._generations_key, EPOCH_FIELD, uuid.uuid4().hex[:8])
+            pipe.hincrby(self._generations_key, namespace, 1)
+            pipe.hget(self._generations_key, EPOCH_FIELD)
+            _, generation, epoch = await pipe.execute()
+            self._set_epoch(epoch)
+            self._remember(namespace, generation)
+            await self._client.publish(self._channel, f"{self.epoch}:{namespace}:{generation}")
+        except Exception:
+            self.errors += 1
+            logger.error("Redis cache invalidation failed for %s", namespace, exc_info=True)
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = self._client.pubsub()
+            try:
+                await pubsub.subscribe(self._channel)
+                # Bỏ generation cục bộ: có thể đã lỡ thông điệp khi chưa subscribe
+                self._generations.clear()
+                self._listening = True
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    epoch, _, rest = (data.decode() if isinstance(data, bytes) else data).partition(":")
+                    namespace, _, generation = rest.rpartition(":")
+                    self._set_epoch(epoch)
+                    self._remember(namespace, int(generation))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.errors += 1
+                logger.warning("Redis invalidation listener disconnected, retrying", exc_info=True)
+            finally:
+                self._listening = False
+                await pubsub.aclose()
+            await asyncio.sleep(1.0)
+
+    async def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._client.aclose()
+
+    def stats(self) -> dict[str, Any]:
+        return {"listening": self._listening, "errors": self.errors, "epoch": self.epoch, "ttl_seconds": self._ttl_ms / 1000}
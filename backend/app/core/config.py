@@ -1,4 +1,5 @@
 import secrets
+import uuid
 from typing import Annotated, Any, Literal
 
 from pydantic import (
@@ -27,6 +28,13 @@ class Settings(BaseSettings):    # Sử dụng file .env cho biến môi trườ
     API_V1_STR: str = "/api/v1"  # Tiền tố cho các route API
     SECRET_KEY: str = secrets.token_urlsafe(32)  # Khóa bí mật cho JWT
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # Thời gian sống của access token (phút)
+    # Cache (LRU, TTL ngắn, trong từng worker) cho token đã giải mã và thông tin customer đăng
+    # nhập: request đã xác thực không phải giải mã JWT và truy vấn DB mỗi lần
+    AUTH_CACHE_TTL_SECONDS: float = 30.0
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
+    # Id các customer được dùng route /admin (pool, cache, import); danh sách rỗng = không ai
+    # (chấp nhận list JSON hoặc chuỗi phân cách bằng dấu phẩy)
+    ADMIN_CUSTOMER_IDS: Annotated[list[uuid.UUID] | str, BeforeValidator(parse_cors)] = []
     
     # CORS configuration
     all_cors_origins: Annotated[list[str] | str, BeforeValidator(parse_cors)] = [
@@ -41,6 +49,82 @@ class Settings(BaseSettings):    # Sử dụng file .env cho biến môi trườ
     POSTGRES_PASSWORD: str = Field(default="", alias="POSTGRES_DB_PASSWORD")
     POSTGRES_DB: str = Field(default="postgres", alias="POSTGRES_DB_NAME")
 
+    # Cấu hình connection pool và log SQL
+    DB_ECHO: bool = False  # Log mọi câu SQL (chỉ bật khi debug)
+    DB_POOL_SIZE: int = 5  # Số kết nối giữ thường trực trong pool
+    DB_MAX_OVERFLOW: int = 10  # Số kết nối tạm thời vượt quá pool size
+    DB_POOL_TIMEOUT: float = 30.0  # Thời gian chờ tối đa (giây) để lấy kết nối
+    DB_POOL_RECYCLE: int = 1800  # Tái tạo kết nối sau N giây (-1 để tắt)
+    # Chiến lược pre-ping: "always" ping mỗi lần checkout, "idle" chỉ ping kết nối
+    # đã rảnh quá DB_POOL_PRE_PING_IDLE_SECONDS, "never" không ping
+    DB_POOL_PRE_PING: Literal["always", "idle", "never"] = "idle"
+    DB_POOL_PRE_PING_IDLE_SECONDS: float = 300.0
+
+    # Cache kết quả COUNT(*) chính xác theo bộ lọc
+    COUNT_CACHE_TTL_SECONDS: float = 30.0
+    COUNT_CACHE_MAX_ENTRIES: int = 1024
+
+    # Cache đọc catalog (categories, products, variants)
+    # "memory": trong process, chỉ đúng khi chạy một worker; "redis": dùng chung
+    # giữa các worker/pod, invalidate qua pub/sub
+    CACHE_BACKEND: Literal["memory", "redis"] = "memory"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_KEY_PREFIX: str = "catalog"
+    CATALOG_CACHE_TTL_SECONDS: float = 60.0
+    CATALOG_CACHE_MAX_ENTRIES: int = 2048  # Chỉ áp dụng cho backend memory
+    # GET có điều kiện (ETag/304) theo generation của cache: "auto" chỉ bật khi generation
+    # dùng chung (backend redis). Với "memory", ghi ở worker khác hay từ script
+    # (import_data, ...) không đổi generation của worker này -> 304 cho dữ liệu đã đổi;
+    # chỉ đặt "on" khi chắc chắn chạy một worker và không có nguồn ghi nào khác
+    CONDITIONAL_GET: Literal["auto", "on", "off"] = "auto"
+
+    # Số phần tử tối đa trong một request bulk
+    BULK_MAX_ITEMS: int = 1000
+
+    # Số id tối đa trong một request đọc theo lô (POST /<resource>/batch)
+    BATCH_MAX_IDS: int = 1000
+
+    # Số dòng mỗi lô khi export dạng stream (server-side cursor, yield_per)
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Import CSV/NDJSON: số dòng mỗi lô (COPY + upsert, commit theo lô) và số lỗi
+    # tối đa giữ lại trong báo cáo (số dòng bị loại vẫn được đếm đủ)
+    IMPORT_BATCH_SIZE: int = 5000
+    IMPORT_MAX_ERRORS: int = 100
+
+    # Tìm khách hàng tương tự (POST /customers/similar[/batch]): k tối đa và số truy vấn
+    # tối đa mỗi lô
+    SIMILAR_MAX_K: int = 100
+    SIMILAR_MAX_QUERIES: int = 100
+
+    # Chỉ mục embedding: file mmap dùng chung giữa các worker trên cùng máy (cập nhật từng
+    # dòng khi ghi customer) và số giây trước khi dựng lại toàn bộ từ DB (sửa sai lệch do
+    # ghi từ máy khác hoặc sửa trực tiếp trong DB)
+    EMBEDDING_INDEX_PATH: str = "/tmp/customer_embeddings.idx"
+    EMBEDDING_INDEX_REBUILD_SECONDS: float = 3600.0
+
+    # Hash mật khẩu: số vòng bcrypt (mỗi +1 gấp đôi thời gian), số process chạy bcrypt
+    # (0 = chạy trong thread của worker) và số yêu cầu tối đa đang chờ trước khi trả 429
+    PASSWORD_BCRYPT_ROUNDS: int = Field(default=12, ge=4, le=31)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Logging có cấu trúc: mức log, định dạng ("json" cho production, "text" khi phát triển),
+    # tỉ lệ request được ghi log DEBUG/INFO (WARNING trở lên luôn được ghi) và header
+    # mang request id (nhận từ client/proxy nếu có, luôn trả lại trong response)
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
+    LOG_SAMPLE_RATE: float = Field(default=1.0, ge=0.0, le=1.0)
+    LOG_REQUEST_ID_HEADER: str = "X-Request-ID"
+
+    # Metrics dạng Prometheus tại /metrics: độ trễ theo route, request đang xử lý,
+    # kích thước response, số câu và thời gian SQL mỗi request
+    METRICS_ENABLED: bool = True
+
+    # Debug: đếm lazy load của ORM trong mỗi request, ghi log cảnh báo và trả header
+    # X-Lazy-Loads (chỉ bật khi phát triển để tìm truy vấn N+1)
+    DEBUG_LAZY_LOADS: bool = False
+
     # Sinh chuỗi kết nối SQLAlchemy
     @computed_field  # type: ignore[prop-decorator]
     @property
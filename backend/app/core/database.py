@@ -1,14 +1,73 @@
-from typing import Generator
+from typing import Any, AsyncGenerator, Generator
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core.config import settings
+from app.core.pool_metrics import (
+    PoolMetrics,
+    install_idle_pre_ping,
+    install_pool_listeners,
+    instrumented_pool_class,
+    pool_status,
+)
+from app.core.request_metrics import install_sql_listeners
+
+# Metrics cho từng pool (sync dùng cho script, async dùng cho router)
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+# Tham số pool dùng chung cho cả hai engine, đọc từ settings
+def _engine_options() -> dict[str, Any]:
+    return {
+        "echo": settings.DB_ECHO,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+    }
+
+# Gắn listener đo đạc (pool, thời gian SQL) và chiến lược pre-ping "idle" cho engine
+def _instrument(sync_engine: Engine, metrics: PoolMetrics) -> None:
+    install_pool_listeners(sync_engine, metrics)
+    if settings.METRICS_ENABLED:
+        install_sql_listeners(sync_engine)
+    if settings.DB_POOL_PRE_PING == "idle":
+        install_idle_pre_ping(sync_engine, settings.DB_POOL_PRE_PING_IDLE_SECONDS)
 
 # Khởi tạo SQLAlchemy engine từ chuỗi kết nối trong settings
 engine = create_engine(
     str(settings.SQLALCHEMY_DATABASE_URI),
-    echo=True,  # Set to False in production
-    pool_pre_ping=True,
+    poolclass=instrumented_pool_class(QueuePool, sync_pool_metrics),
+    **_engine_options(),
 )
+_instrument(engine, sync_pool_metrics)
+
+# Engine bất đồng bộ (psycopg async) dùng cho các router async
+async_engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, async_pool_metrics),
+    **_engine_options(),
+)
+_instrument(async_engine.sync_engine, async_pool_metrics)
+
+# Factory tạo AsyncSession; tắt expire_on_commit để đọc lại thuộc tính
+# sau commit mà không phát sinh lazy load (không hỗ trợ trong async)
+async_session_maker = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
+# Thống kê trạng thái các pool (dùng cho endpoint admin)
+def get_pool_stats() -> dict[str, Any]:
+    return {
+        "sync": pool_status(engine.pool, sync_pool_metrics),
+        "async": pool_status(async_engine.sync_engine.pool, async_pool_metrics),
+    }
 
 # Dependency để inject database session
 def get_session() -> Generator[Session, None, None]:
@@ -17,3 +76,8 @@ def get_session() -> Generator[Session, None, None]:
             yield session
         finally:
             session.close()
+
+# Dependency để inject async database session
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_maker() as session:
+        yield session
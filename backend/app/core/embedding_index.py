@@ -0,0 +1,264 @@
+# File: backend/app/core/embedding_index.py
+# Chỉ mục embedding dùng chung giữa các worker: một file float32 liên tục được mmap bởi
+# mọi process trên cùng máy (không copy, không nạp lại từ DB ở mỗi worker).
+# Ghi (create/update/delete customer) sửa trực tiếp từng dòng trong file dưới khóa flock;
+# truy vấn theo lô là một phép nhân ma trận NumPy trên vùng map.
+#
+# Bố cục file: header 64 byte | ids: capacity x 16 byte (UUID, toàn 0 = dòng trống)
+#              | ma trận: capacity x dim float32 (các dòng đã chuẩn hóa)
+# Khi đầy, file mới gấp đôi capacity được ghi rồi rename đè lên; file cũ được đánh dấu
+# `moved` để các worker khác map lại file mới ở truy vấn kế tiếp.
+import asyncio
+import fcntl
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.vectors import VECTOR_DTYPE, EmbeddingIndex, normalize, top_k
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"EMBIDX01"
+HEADER = np.dtype(
+    [
+        ("magic", "S8"),
+        ("dim", "<u4"),
+        ("moved", "<u4"),  # 1: file đã bị thay bằng file khác (cần map lại)
+        ("capacity", "<u8"),
+        ("rows", "<u8"),  # Số dòng đã dùng (kể cả dòng đã xóa), truy vấn chỉ quét [:rows]
+        ("built_at", "<f8"),  # Thời điểm dựng lại từ DB (time.time()); 0 = cần dựng lại
+    ]
+)
+HEADER_SIZE = 64
+ID_SIZE = 16
+MIN_CAPACITY = 1024
+
+# Kết quả tìm kiếm cho một truy vấn: [(id, điểm cosine)] giảm dần
+Matches = List[Tuple[uuid.UUID, float]]
+
+
+class EmbeddingFile:
+    """Một lần map file chỉ mục: header, vùng ids và ma trận đều là view NumPy trên file"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.header = np.memmap(path, dtype=HEADER, mode="r+", shape=(1,))
+        if self.header["magic"][0] != MAGIC:
+            raise ValueError(f"{path} is not an embedding index file")
+        capacity, dim = int(self.header["capacity"][0]), int(self.header["dim"][0])
+        self.capacity, self.dim = capacity, dim
+        self.ids = np.memmap(path, dtype="<u8", mode="r+", offset=HEADER_SIZE, shape=(capacity, 2))
+        self.matrix = np.memmap(
+            path, dtype=VECTOR_DTYPE, mode="r+", offset=HEADER_SIZE + capacity * ID_SIZE, shape=(capacity, max(dim, 1))
+        )
+
+    @staticmethod
+    def create(path: str, index: EmbeddingIndex, capacity: int = 0) -> None:
+        """Ghi file mới từ `index` (ghi ra file tạm rồi rename, process khác không thấy file dở dang)"""
+        rows, dim = len(index), index.dimensions
+        capacity = max(capacity, MIN_CAPACITY, 1 << max(rows - 1, 0).bit_length())
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.truncate(HEADER_SIZE + capacity * ID_SIZE + capacity * max(dim, 1) * VECTOR_DTYPE.itemsize)
+        header = np.memmap(tmp, dtype=HEADER, mode="r+", shape=(1,))
+        header[0] = (MAGIC, dim, 0, capacity, rows, time.time())
+        if rows:
+            ids = np.memmap(tmp, dtype="<u8", mode="r+", offset=HEADER_SIZE, shape=(rows, 2))
+            ids[:] = np.frombuffer(b"".join(id.bytes for id in index.ids), dtype="<u8").reshape(rows, 2)
+            matrix = np.memmap(tmp, dtype=VECTOR_DTYPE, mode="r+", offset=HEADER_SIZE + capacity * ID_SIZE, shape=(rows, dim))
+            matrix[:] = index.matrix
+            ids.flush()
+            matrix.flush()
+        header.flush()
+        os.replace(tmp, path)
+
+    @property
+    def rows(self) -> int:
+        return int(self.header["rows"][0])
+
+    @property
+    def moved(self) -> bool:
+        return bool(self.header["moved"][0])
+
+    @property
+    def built_at(self) -> float:
+        return float(self.header["built_at"][0])
+
+    def _live(self) -> np.ndarray:
+        return self.ids[: self.rows].any(axis=1)
+
+    def row_of(self, id: uuid.UUID) -> Optional[int]:
+        key = np.frombuffer(id.bytes, dtype="<u8")
+        found = np.flatnonzero((self.ids[: self.rows] == key).all(axis=1))
+        return int(found[0]) if len(found) else None
+
+    def vector(self, id: uuid.UUID) -> Optional[np.ndarray]:
+        row = self.row_of(id)
+        return None if row is None else np.array(self.matrix[row])
+
+    def snapshot(self) -> EmbeddingIndex:
+        """Các dòng còn sống dưới dạng EmbeddingIndex (dùng khi ghi lại file lớn hơn)"""
+        live = np.flatnonzero(self._live())
+        ids = [uuid.UUID(bytes=self.ids[row].tobytes()) for row in live]
+        return EmbeddingIndex(ids, np.asarray(self.matrix[live, : self.dim]))
+
+    def put(self, id: uuid.UUID, vector: np.ndarray) -> bool:
+        """Ghi/ghi đè vector của `id` (gọi khi đang giữ khóa ghi); False nếu file đã đầy"""
+        row = self.row_of(id)
+        if row is None:
+            free = np.flatnonzero(~self._live())
+            if len(free):
+                row = int(free[0])
+            elif self.rows < self.capacity:
+                row = self.rows
+            else:
+                return False
+        # Ghi vector trước rồi mới ghi id/rows để truy vấn đồng thời không thấy dòng dở dang mới
+        self.matrix[row, : self.dim] = vector
+        self.ids[row] = np.frombuffer(id.bytes, dtype="<u8")
+        if row >= self.rows:
+            self.header["rows"] = row + 1
+        return True
+
+    def remove(self, id: uuid.UUID) -> None:
+        row = self.row_of(id)
+        if row is not None:
+            self.ids[row] = 0
+
+    def search(self, queries: np.ndarray, k: int, exclude: Sequence[Optional[uuid.UUID]]) -> List[Matches]:
+        """Top-k cho cả lô truy vấn (q x dim, đã chuẩn hóa) bằng một phép nhân ma trận"""
+        rows = self.rows
+        ids = np.array(self.ids[:rows])
+        scores = np.asarray(self.matrix[:rows, : self.dim]) @ queries.T
+        scores = np.ascontiguousarray(scores.T)
+        scores[:, ~ids.any(axis=1)] = -np.inf
+        for query, id in enumerate(exclude):
+            if id is not None:
+                key = np.frombuffer(id.bytes, dtype="<u8")
+                scores[query, (ids == key).all(axis=1)] = -np.inf
+        results = []
+        for query, top in enumerate(top_k(scores, k)):
+            results.append(
+                [(uuid.UUID(bytes=ids[row].tobytes()), float(scores[query, row])) for row in top if scores[query, row] != -np.inf]
+            )
+        return results
+
+
+class SharedEmbeddingIndex:
+    """
+    Quản lý file chỉ mục của một worker: map file (map lại khi file bị thay), dựng lại từ DB
+    khi chưa có hoặc quá `rebuild_after` giây, cập nhật từng dòng khi ghi. Ghi được tuần tự
+    hóa bằng threading.Lock trong process và flock trên file `.lock` giữa các process.
+    """
+
+    def __init__(self, path: str, rebuild_after: float) -> None:
+        self.path = path
+        self.rebuild_after = rebuild_after
+        self._file: Optional[EmbeddingFile] = None
+        self._thread_lock = threading.Lock()
+        self._build_lock = asyncio.Lock()
+        self._lock_fd: Optional[int] = None
+
+    def _acquire(self) -> None:
+        self._thread_lock.acquire()
+        try:
+            if self._lock_fd is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._lock_fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def _release(self) -> None:
+        fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def _current(self) -> Optional[EmbeddingFile]:
+        """File đang map; map (lại) khi chưa map hoặc file đã bị thay. None nếu chưa có file"""
+        file = self._file
+        if file is None or file.moved:
+            try:
+                file = EmbeddingFile(self.path)
+            except (FileNotFoundError, ValueError):
+                file = None
+            self._file = file
+        return file
+
+    def _fresh(self, file: Optional[EmbeddingFile]) -> bool:
+        return file is not None and time.time() - file.built_at < self.rebuild_after
+
+    async def get(self, load: Callable[[], Awaitable[EmbeddingIndex]]) -> EmbeddingFile:
+        """File chỉ mục hiện hành; dựng lại từ `load()` (đọc DB) nếu chưa có hoặc đã cũ"""
+        file = self._current()
+        if self._fresh(file):
+            return file
+        async with self._build_lock:
+            await asyncio.to_thread(self._acquire)
+            try:
+                # Worker khác có thể vừa dựng xong trong lúc chờ khóa
+                file = self._current()
+                if not self._fresh(file):
+                    start = time.perf_counter()
+                    index = await load()
+                    await asyncio.to_thread(self._replace, index)
+                    file = self._current()
+                    logger.info(
+                        "Built embedding index",
+                        extra={
+                            "rows": len(index),
+                            "dimensions": index.dimensions,
+                            "duration_ms": round((time.perf_counter() - start) * 1000, 2),
+                        },
+                    )
+            finally:
+                self._release()
+        return file
+
+    def _replace(self, index: EmbeddingIndex, capacity: int = 0) -> None:
+        # Gọi khi đang giữ khóa ghi: ghi file mới rồi báo các worker đang map file cũ
+        old = self._current()
+        EmbeddingFile.create(self.path, index, capacity)
+        if old is not None:
+            old.header["moved"] = 1
+        self._file = None
+
+    def upsert(self, id: uuid.UUID, vector: Optional[Sequence[float]]) -> None:
+        """Ghi vector của `id` vào file (vector None = xóa); bỏ qua nếu file chưa được dựng"""
+        if vector is None:
+            self.remove(id)
+            return
+        self._acquire()
+        try:
+            file = self._current()
+            if file is None:
+                return
+            if file.dim == 0 or len(vector) != file.dim:
+                if file.dim == 0:
+                    # Chỉ mục rỗng chưa có số chiều: đánh dấu cần dựng lại từ DB
+                    file.header["built_at"] = 0
+                else:
+                    logger.warning("Embedding has unexpected dimensions", extra={"dimensions": len(vector)})
+                    file.remove(id)
+                return
+            row = normalize(np.asarray(vector, dtype=np.float32))
+            if not file.put(id, row):
+                # Đầy: ghi lại file với capacity gấp đôi rồi ghi vào file mới
+                self._replace(file.snapshot(), file.capacity * 2)
+                self._current().put(id, row)
+        finally:
+            self._release()
+
+    def remove(self, id: uuid.UUID) -> None:
+        self._acquire()
+        try:
+            file = self._current()
+            if file is not None:
+                file.remove(id)
+        finally:
+            self._release()
@@ -0,0 +1,46 @@
+# File: backend/app/core/lazyload.py
+# Phát hiện lazy load (chế độ debug): ghi lại mỗi lần ORM tự nạp một quan hệ chưa được
+# load sẵn trong lúc xử lý request, để tìm các chỗ N+1 cần thêm expand/selectinload.
+# Trong async, lazy load còn làm request lỗi (MissingGreenlet) nên càng cần tìm sớm.
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+logger = logging.getLogger(__name__)
+
+# Danh sách lazy load của request hiện tại (None khi không theo dõi)
+_lazy_loads: ContextVar[Optional[List[str]]] = ContextVar("lazy_loads", default=None)
+
+_installed = False
+
+
+def _on_orm_execute(state: ORMExecuteState) -> None:
+    loads = _lazy_loads.get()
+    if loads is None or not state.is_select or state.lazy_loaded_from is None:
+        return
+    path = state.loader_strategy_path
+    attribute = path.path[-1].key if path is not None and path.path else "?"
+    loads.append(f"{state.lazy_loaded_from.class_.__name__}.{attribute}")
+
+
+def install_lazy_load_detector() -> None:
+    """Gắn listener do_orm_execute cho mọi Session (gọi một lần khi khởi động)"""
+    global _installed
+    if not _installed:
+        event.listen(Session, "do_orm_execute", _on_orm_execute)
+        _installed = True
+
+
+@contextmanager
+def track_lazy_loads() -> Iterator[List[str]]:
+    """Thu thập các lazy load ("Model.quan_hệ") xảy ra trong khối `with`"""
+    loads: List[str] = []
+    token = _lazy_loads.set(loads)
+    try:
+        yield loads
+    finally:
+        _lazy_loads.reset(token)
@@ -0,0 +1,106 @@
+# File: backend/app/core/log.py
+# Logging có cấu trúc: mỗi dòng log là một object JSON (hoặc text khi phát triển) kèm
+# request id của request hiện tại; log DEBUG/INFO được lấy mẫu theo request để giảm chi phí,
+# WARNING trở lên luôn được ghi. Cấu hình qua Settings (LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE).
+import logging
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import orjson
+
+from app.core.config import settings
+
+# Request id và quyết định lấy mẫu của request hiện tại (None khi không ở trong request)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_sampled_var: ContextVar[Optional[bool]] = ContextVar("log_sampled", default=None)
+
+# Thuộc tính có sẵn của LogRecord; các thuộc tính khác (truyền qua `extra=`) là trường cấu trúc
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_configured = False
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def start_request(request_id: Optional[str] = None) -> str:
+    """Gán request id (lấy từ header nếu có) và quyết định lấy mẫu log cho request hiện tại"""
+    # Chỉ nhận id từ client khi ngắn và in được, tránh chèn dữ liệu tùy ý vào log
+    if not request_id or len(request_id) > 128 or not request_id.isprintable():
+        request_id = new_request_id()
+    request_id_var.set(request_id)
+    _sampled_var.set(random.random() < settings.LOG_SAMPLE_RATE)
+    return request_id
+
+
+def _fields(record: logging.LogRecord) -> dict[str, Any]:
+    return {key: value for key, value in vars(record).items() if key not in _RESERVED and not key.startswith("_")}
+
+
+class RequestContextFilter(logging.Filter):
+    """Gắn request id vào record và bỏ log dưới WARNING của request không được lấy mẫu"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        if record.levelno >= logging.WARNING:
+            return True
+        sampled = _sampled_var.get()
+        if sampled is None:
+            # Ngoài request (script, tác vụ nền): lấy mẫu theo từng dòng
+            return settings.LOG_SAMPLE_RATE >= 1.0 or random.random() < settings.LOG_SAMPLE_RATE
+        return sampled
+
+
+class JsonFormatter(logging.Formatter):
+    """Một object JSON mỗi dòng: ts, level, logger, message, request_id và các trường `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(_fields(record))
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Dạng đọc được khi phát triển: thời gian, level, logger, [request id], message k=v ..."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        time = datetime.fromtimestamp(record.created).strftime("%H:%M:%S.%f")[:-3]
+        request_id = getattr(record, "request_id", None)
+        line = f"{time} {record.levelname:<7} {record.name}"
+        if request_id:
+            line += f" [{request_id[:8]}]"
+        line += f" {record.getMessage()}"
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging() -> None:
+    """Gắn handler stderr (JSON hoặc text theo LOG_FORMAT) cho root logger; gọi một lần khi khởi động"""
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    handler.addFilter(RequestContextFilter())
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    _configured = True
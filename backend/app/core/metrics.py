@@ -0,0 +1,74 @@
+# File: backend/app/core/metrics.py
+# Các kiểu metric dùng chung (histogram) cho việc đo đạc hiệu năng, xuất theo định dạng Prometheus
+import threading
+from typing import Any, Sequence
+
+# Các mốc bucket mặc định (giây), đủ chi tiết cho độ trễ truy vấn/kết nối
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """Histogram tích lũy (kiểu Prometheus), an toàn khi dùng đa luồng"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets, self._counts):
+                running += count
+                cumulative.append((bound, running))
+            return {
+                "buckets": {str(bound): count for bound, count in cumulative} | {"+Inf": self._count},
+                "count": self._count,
+                "sum": self._sum,
+                "max": self._max,
+            }
+
+
+# Bucket cho kích thước response (byte) và số câu SQL mỗi request
+SIZE_BUCKETS: tuple[float, ...] = (
+    100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000,
+)
+COUNT_BUCKETS: tuple[float, ...] = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+def format_labels(labels: dict[str, str]) -> str:
+    """Nhãn theo cú pháp Prometheus: {a="x",b="y"} (thoát \\, " và xuống dòng)"""
+    if not labels:
+        return ""
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def histogram_lines(name: str, labels: dict[str, str], histogram: Histogram) -> list[str]:
+    """Các dòng _bucket/_sum/_count của một histogram theo định dạng text của Prometheus"""
+    snapshot = histogram.snapshot()
+    lines = [
+        f"{name}_bucket{format_labels(labels | {'le': bound})} {count}"
+        for bound, count in snapshot["buckets"].items()
+    ]
+    lines.append(f"{name}_sum{format_labels(labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+    return lines
@@ -0,0 +1,119 @@
+# File: backend/app/core/pool_metrics.py
+# Đo đạc connection pool: số kết nối đang mượn, overflow, thời gian chờ checkout
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+from app.core.metrics import Histogram
+
+
+class PoolMetrics:
+    """Bộ đếm tích lũy cho một connection pool"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.checkout_latency = Histogram()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class _InstrumentedPoolMixin:
+    """Mixin đo thời gian chờ lấy kết nối (bao gồm cả pre-ping và connect)"""
+
+    metrics: PoolMetrics
+
+    def connect(self):  # type: ignore[no-untyped-def]
+        start = time.perf_counter()
+        try:
+            return super().connect()  # type: ignore[misc]
+        except exc.TimeoutError:
+            self.metrics.incr("timeouts")
+            raise
+        finally:
+            self.metrics.checkout_latency.observe(time.perf_counter() - start)
+
+
+def instrumented_pool_class(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """Tạo lớp pool con gắn với đối tượng metrics (giữ nguyên khi pool được recreate)"""
+    return type(
+        f"Instrumented{base.__name__}",
+        (_InstrumentedPoolMixin, base),
+        {"metrics": metrics},
+    )
+
+
+def install_pool_listeners(engine: Engine, metrics: PoolMetrics) -> None:
+    """Gắn các event listener đếm checkout/checkin/connect/invalidate"""
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection: Any, connection_record: Any) -> None:
+        metrics.incr("connects")
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        metrics.incr("checkouts")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection: Any, connection_record: Any) -> None:
+        metrics.incr("checkins")
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection: Any, connection_record: Any, exception: Any) -> None:
+        metrics.incr("invalidations")
+
+
+def install_idle_pre_ping(engine: Engine, idle_seconds: float) -> None:
+    """Chỉ ping kết nối khi nó đã nằm rảnh trong pool quá `idle_seconds`.
+
+    Rẻ hơn `pool_pre_ping=True` (ping ở mọi lần checkout) nhưng vẫn phát hiện
+    được kết nối bị server/firewall cắt sau thời gian dài không dùng.
+    """
+
+    @event.listens_for(engine, "checkout")
+    def _ping_if_idle(dbapi_connection: Any, connection_record: Any, connection_proxy: Any) -> None:
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            alive = engine.dialect.do_ping(dbapi_connection)
+        except Exception:
+            alive = False
+        if not alive:
+            # Pool sẽ bỏ kết nối này và thử lấy kết nối mới
+            raise exc.DisconnectionError("Stale connection detected by idle pre-ping")
+
+
+def pool_status(pool: Pool, metrics: PoolMetrics) -> dict[str, Any]:
+    """Ảnh chụp trạng thái hiện tại của pool cùng các bộ đếm tích lũy"""
+    status: dict[str, Any] = {"pool_class": type(pool).__name__}
+    for attr in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, attr, None)
+        if callable(method):
+            status[attr] = method()
+    latency = metrics.checkout_latency.snapshot()
+    status.update(
+        {
+            "checkouts": metrics.checkouts,
+            "checkins": metrics.checkins,
+            "connects": metrics.connects,
+            "invalidations": metrics.invalidations,
+            "timeouts": metrics.timeouts,
+            "wait_time_total_seconds": latency["sum"],
+            "wait_time_max_seconds": latency["max"],
+            "checkout_latency_seconds": latency,
+        }
+    )
+    return status
@@ -0,0 +1,192 @@
+# File: backend/app/core/request_metrics.py
+# Đo đạc request HTTP: độ trễ theo route, số request đang xử lý, kích thước response,
+# số câu SQL và thời gian SQL của mỗi request (qua event before/after_cursor_execute).
+# Xuất toàn bộ theo định dạng text của Prometheus cho endpoint /metrics.
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.metrics import COUNT_BUCKETS, SIZE_BUCKETS, Histogram, format_labels, histogram_lines
+
+# Nhãn route cho request không khớp route nào (tránh mỗi URL lạ sinh một chuỗi metric)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _SqlStats:
+    """Số câu SQL và tổng thời gian SQL của một request"""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+
+
+# Thống kê SQL của request hiện tại (None khi truy vấn chạy ngoài request, vd: script)
+_sql_stats: ContextVar[Optional[_SqlStats]] = ContextVar("sql_stats", default=None)
+
+
+class RequestMetrics:
+    """Bộ đếm tích lũy theo (method, route): request theo status, độ trễ, kích thước response, SQL"""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.requests: dict[tuple[str, str, str], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.response_size: dict[tuple[str, str], Histogram] = {}
+        self.request_queries: dict[tuple[str, str], Histogram] = {}
+        self.request_sql_time: dict[tuple[str, str], Histogram] = {}
+        self.sql_queries = 0
+        self.sql_latency = Histogram()
+        self._lock = threading.Lock()
+
+    def _histogram(self, table: dict[tuple[str, str], Histogram], key: tuple[str, str], buckets: Any = None) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(key, Histogram(buckets) if buckets else Histogram())
+        return histogram
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, seconds: float, size: int, sql: _SqlStats) -> None:
+        key = (method, route)
+        with self._lock:
+            self.in_flight -= 1
+            status_key = (method, route, str(status))
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+        self._histogram(self.latency, key).observe(seconds)
+        self._histogram(self.response_size, key, SIZE_BUCKETS).observe(size)
+        self._histogram(self.request_queries, key, COUNT_BUCKETS).observe(sql.count)
+        self._histogram(self.request_sql_time, key).observe(sql.seconds)
+
+    def observe_query(self, seconds: float) -> None:
+        with self._lock:
+            self.sql_queries += 1
+        self.sql_latency.observe(seconds)
+
+    def render(self) -> str:
+        """Toàn bộ metric theo định dạng text của Prometheus (version 0.0.4)"""
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being processed",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Completed requests by method, route and status",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"http_requests_total{format_labels({'method': method, 'route': route, 'status': status})} {count}")
+        for name, help_text, table in (
+            ("http_request_duration_seconds", "Request latency by route", self.latency),
+            ("http_response_size_bytes", "Response body size by route", self.response_size),
+            ("http_request_sql_queries", "SQL statements executed per request", self.request_queries),
+            ("http_request_sql_duration_seconds", "Time spent in SQL per request", self.request_sql_time),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (method, route), histogram in sorted(table.items()):
+                lines += histogram_lines(name, {"method": method, "route": route}, histogram)
+        lines += [
+            "# HELP db_queries_total SQL statements executed",
+            "# TYPE db_queries_total counter",
+            f"db_queries_total {self.sql_queries}",
+            "# HELP db_query_duration_seconds SQL statement latency",
+            "# TYPE db_query_duration_seconds histogram",
+            *histogram_lines("db_query_duration_seconds", {}, self.sql_latency),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+def install_sql_listeners(engine: Engine, metrics: RequestMetrics = request_metrics) -> None:
+    """Đếm và đo thời gian từng câu SQL, cộng vào request hiện tại (nếu có)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool) -> None:
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        metrics.observe_query(elapsed)
+        stats = _sql_stats.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context: Any) -> None:
+        # Câu lệnh lỗi không tới after_cursor_execute: bỏ mốc thời gian đã đẩy vào
+        connection = context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+
+def _route_label(scope: dict) -> str:
+    """Mẫu đường dẫn của route đã khớp (vd: /api/v1/orders/{id}), UNMATCHED_ROUTE nếu không có"""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        return UNMATCHED_ROUTE
+    path = scope.get("path", "")
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is not None and not path_regex.match(path):
+        # Route của router được include giữ path tương đối: ghép lại phần tiền tố đã khớp
+        for index, char in enumerate(path):
+            if char == "/" and index and path_regex.match(path[index:]):
+                return path[:index] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: đếm request đang xử lý, đo độ trễ tới khi gửi xong body (kể cả
+    response dạng stream), kích thước body và SQL của request. Route được gắn nhãn theo
+    mẫu đường dẫn (vd: /api/v1/orders/{id}) chứ không theo URL thật.
+    """
+
+    def __init__(self, app: Any, metrics: RequestMetrics = request_metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        sql = _SqlStats()
+        token = _sql_stats.set(sql)
+        self.metrics.started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.finished(
+                scope["method"],
+                _route_label(scope),
+                status,
+                time.perf_counter() - start,
+                size,
+                sql,
+            )
+            _sql_stats.reset(token)
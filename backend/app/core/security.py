@@ -1,15 +1,28 @@
 # File: backend/app/core/security.py
-# Các hàm bảo mật: mã hóa mật khẩu, xác thực JWT
+# Các hàm bảo mật: mã hóa mật khẩu, xác thực JWT.
+# Bcrypt tốn ~100–300 ms CPU mỗi lần nên chạy trong process pool giới hạn (password_hasher)
+# thay vì trên event loop; pool đầy thì từ chối ngay (429) thay vì xếp hàng vô hạn.
+import asyncio
+import hmac
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Callable, Optional, Tuple, TypeVar
 
 import jwt
+from jwt.exceptions import InvalidTokenError
 from passlib.context import CryptContext
 
+from .cache_backends import TTLCache
 from .config import settings
 
-# Khởi tạo context mã hóa mật khẩu (bcrypt)
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# Khởi tạo context mã hóa mật khẩu (bcrypt, số vòng theo settings; hash cũ khác số vòng
+# được hash lại khi đăng nhập thành công)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS)
 
 # Thuật toán mã hóa JWT
 ALGORITHM = "HS256"
@@ -21,10 +34,99 @@ def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Token đã giải mã và kiểm tra chữ ký: token -> (sub, exp). Token hợp lệ trong TTL ngắn không
+# phải verify HMAC/parse JSON lại ở mỗi request; exp vẫn được kiểm tra ở mỗi lần dùng
+_token_cache = TTLCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+
+# Giải mã access token và trả subject (id customer); token sai/hết hạn -> InvalidTokenError
+def decode_access_token(token: str) -> str:
+    cached = _token_cache.get(("access_token", token))
+    if cached is not None:
+        subject, expires_at = cached
+        if expires_at > time.time():
+            return subject
+        _token_cache.discard(("access_token", token))
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]})
+    subject = payload["sub"]
+    if not isinstance(subject, str):
+        raise InvalidTokenError("Invalid subject")
+    _token_cache.set(("access_token", token), (subject, float(payload["exp"])))
+    return subject
+
 # Hàm kiểm tra mật khẩu sau khi mã hóa (dùng khi đăng nhập)
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 # Hàm mã hóa mật khẩu khi lưu vào database
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+# Kiểm tra mật khẩu và trả hash mới nếu cần hash lại (số vòng đã đổi, hoặc mật khẩu cũ còn
+# lưu dạng thô từ trước khi sửa lỗi lưu hash): (hợp lệ, hash mới hoặc None)
+def verify_and_update_password(plain_password: str, stored_password: str) -> Tuple[bool, Optional[str]]:
+    if pwd_context.identify(stored_password) is None:
+        valid = hmac.compare_digest(plain_password.encode(), stored_password.encode())
+        return valid, get_password_hash(plain_password) if valid else None
+    return pwd_context.verify_and_update(plain_password, stored_password)
+
+
+class PasswordHasherBusyError(Exception):
+    """Số yêu cầu hash/verify đang chờ đã đạt giới hạn (trả 429 cho client)"""
+
+
+class PasswordHasher:
+    """
+    API async cho bcrypt chạy trong ProcessPoolExecutor `workers` process (không giữ GIL của
+    worker web). Tối đa `max_pending` yêu cầu được nhận cùng lúc (đang chạy + đang chờ),
+    vượt quá -> PasswordHasherBusyError. workers=0: chạy trong thread pool của process hiện tại.
+    """
+
+    def __init__(self, workers: int, max_pending: int) -> None:
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers and self._executor is None:
+            # "spawn": không fork process web (đang có thread, kết nối DB, event loop)
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusyError("Too many password operations in progress, retry later")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+        except BrokenProcessPool:
+            # Process con bị kill (vd: OOM): bỏ pool hỏng, lần gọi sau tạo pool mới
+            self._executor = None
+            raise
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, stored_password: str) -> Tuple[bool, Optional[str]]:
+        """(mật khẩu đúng, hash mới cần lưu lại hoặc None) — xem verify_and_update_password"""
+        return await self._run(verify_and_update_password, password, stored_password)
+
+    def start(self) -> None:
+        """Tạo sẵn các process (gọi khi khởi động) để request đầu tiên không chờ spawn"""
+        pool = self._pool()
+        if pool is not None:
+            for _ in range(self.workers):
+                pool.submit(int)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
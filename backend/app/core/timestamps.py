@@ -0,0 +1,30 @@
+# File: backend/app/core/timestamps.py
+# Thời điểm lưu trong cột timestamp không múi giờ: luôn là giờ UTC (naive). Chuẩn hóa ở một
+# chỗ (kiểu cột) cho mọi lần ghi và so sánh, nên date(cột) trong SQL không phụ thuộc
+# TimeZone của session PostgreSQL và khớp với phép tính ngày phía Python.
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import DateTime
+from sqlalchemy.types import TypeDecorator
+
+
+# Giờ có múi giờ quy về UTC rồi bỏ tzinfo; giờ không múi giờ được coi là đã là UTC
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class UTCNaiveDateTime(TypeDecorator):
+    """Cột timestamp without time zone chứa giờ UTC; nhận cả datetime có múi giờ khi ghi/lọc"""
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Optional[datetime]:
+        return utc_naive(value)
@@ -0,0 +1,144 @@
+# File: backend/app/core/vectors.py
+# Vector embedding: lưu dạng float32 little-endian đóng gói trong cột bytea (4 byte mỗi
+# chiều, không parse chuỗi), và chỉ mục tìm láng giềng gần nhất theo cosine bằng NumPy
+# (brute force trên ma trận nằm sẵn trong bộ nhớ, đã chuẩn hóa từng dòng).
+import logging
+import math
+import uuid
+from collections import Counter
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+logger = logging.getLogger(__name__)
+
+# Kiểu lưu trữ: float32 little-endian (cố định thứ tự byte để dữ liệu đọc được trên mọi máy)
+VECTOR_DTYPE = np.dtype("<f4")
+
+# Số chiều tối đa chấp nhận từ client
+MAX_DIMENSIONS = 4096
+
+
+# Chuyển giá trị vector đầu vào thành list float: nhận list số, hoặc chuỗi dạng cũ
+# (mảng JSON "[0.1, 0.2]" hay các số cách nhau bởi dấu phẩy/khoảng trắng)
+def parse_vector(value: Any) -> Optional[List[float]]:
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return unpack_vector(bytes(value))
+    if isinstance(value, str):
+        text = value.strip()
+        if not text:
+            return None
+        if text.startswith("["):
+            value = orjson.loads(text)
+        else:
+            value = text.replace(",", " ").split()
+    vector = [float(x) for x in value]
+    if not vector:
+        return None
+    if len(vector) > MAX_DIMENSIONS:
+        raise ValueError(f"embedding has more than {MAX_DIMENSIONS} dimensions")
+    if not all(math.isfinite(x) for x in vector):
+        raise ValueError("embedding values must be finite numbers")
+    return vector
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    return np.asarray(vector, dtype=VECTOR_DTYPE).tobytes()
+
+
+def unpack_vector(data: bytes) -> List[float]:
+    return np.frombuffer(data, dtype=VECTOR_DTYPE).tolist()
+
+
+class Float32Vector(TypeDecorator):
+    """Cột bytea chứa vector float32 đóng gói; phía Python là list[float]"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Optional[bytes]:
+        if value is None:
+            return None
+        return pack_vector(value)
+
+    def process_result_value(self, value: Any, dialect: Any) -> Optional[List[float]]:
+        if value is None:
+            return None
+        return unpack_vector(value)
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    # Vector 0 giữ nguyên (điểm tương đồng luôn bằng 0) thay vì chia cho 0
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Chỉ số k cột điểm cao nhất của từng dòng trong ma trận điểm (q x n), giảm dần theo điểm"""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.intp)
+    # argpartition O(n) để lấy k phần tử lớn nhất, chỉ sắp xếp k phần tử đó
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1)
+
+
+class EmbeddingIndex:
+    """
+    Chỉ mục tìm kiếm chính xác (brute force) theo cosine: ma trận n x d float32 đã chuẩn hóa,
+    một truy vấn là một phép nhân ma trận-vector và argpartition lấy top-k
+    """
+
+    def __init__(self, ids: Sequence[uuid.UUID], matrix: np.ndarray) -> None:
+        self.ids = list(ids)
+        self.matrix = normalize(np.asarray(matrix, dtype=np.float32).reshape(len(self.ids), -1))
+        self.positions = {id: row for row, id in enumerate(self.ids)}
+
+    @classmethod
+    def from_packed(cls, rows: Sequence[Tuple[uuid.UUID, bytes]]) -> "EmbeddingIndex":
+        """
+        Tạo chỉ mục từ các cặp (id, vector đóng gói). Số chiều là số chiều phổ biến nhất;
+        vector khác số chiều bị bỏ qua (ghi log cảnh báo)
+        """
+        rows = [(id, data) for id, data in rows if data]
+        if not rows:
+            return cls([], np.zeros((0, 0), dtype=np.float32))
+        size, _ = Counter(len(data) for _, data in rows).most_common(1)[0]
+        kept = [(id, data) for id, data in rows if len(data) == size]
+        if len(kept) < len(rows):
+            logger.warning(
+                "Skipped embeddings with unexpected dimensions",
+                extra={"skipped": len(rows) - len(kept), "dimensions": size // VECTOR_DTYPE.itemsize},
+            )
+        matrix = np.frombuffer(b"".join(data for _, data in kept), dtype=VECTOR_DTYPE)
+        return cls([id for id, _ in kept], matrix.reshape(len(kept), -1))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dimensions(self) -> int:
+        return self.matrix.shape[1] if len(self.ids) else 0
+
+    def vector(self, id: uuid.UUID) -> Optional[np.ndarray]:
+        row = self.positions.get(id)
+        return None if row is None else self.matrix[row]
+
+    def search(self, query: Sequence[float], k: int, exclude: Optional[uuid.UUID] = None) -> List[Tuple[uuid.UUID, float]]:
+        """k bản ghi gần `query` nhất: [(id, điểm cosine)] giảm dần, bỏ `exclude` (vd: chính bản ghi truy vấn)"""
+        if not len(self.ids) or k <= 0:
+            return []
+        query = normalize(np.asarray(query, dtype=np.float32))
+        if query.shape != (self.dimensions,):
+            raise ValueError(f"embedding must have {self.dimensions} dimensions")
+        scores = self.matrix @ query
+        if exclude is not None and exclude in self.positions:
+            scores[self.positions[exclude]] = -np.inf
+        top = top_k(scores[np.newaxis, :], k)[0]
+        return [(self.ids[row], float(scores[row])) for row in top if scores[row] != -np.inf]
@@ -0,0 +1,70 @@
+import uuid
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from pydantic import ValidationError
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud.projection import load_only_fields
+from app.models import BulkItemError
+
+T = TypeVar("T", bound=SQLModel)
+
+
+# Kiểm tra từng phần tử với schema, gom lỗi theo vị trí thay vì fail cả request
+def validate_items(items: Sequence[Any], schema: type[T]) -> Tuple[List[Tuple[int, T]], List[BulkItemError]]:
+    valid: List[Tuple[int, T]] = []
+    errors: List[BulkItemError] = []
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as e:
+            messages = "; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc']) or 'item'}: {err['msg']}" for err in e.errors()
+            )
+            errors.append(BulkItemError(index=index, detail=messages))
+    return valid, errors
+
+
+# Lấy tập id đã tồn tại trong bảng bằng một truy vấn IN (...)
+async def existing_ids(session: AsyncSession, model: type[SQLModel], ids: Iterable[uuid.UUID]) -> set[uuid.UUID]:
+    wanted = {i for i in ids if i is not None}
+    if not wanted:
+        return set()
+    statement = select(model.id).where(model.id.in_(wanted))
+    return set((await session.exec(statement)).all())
+
+
+# Đọc nhiều bản ghi theo id bằng một truy vấn IN (...): bỏ id trùng, giữ thứ tự id gửi lên,
+# id không tồn tại bị bỏ qua
+async def get_by_ids(
+    session: AsyncSession,
+    model: type[T],
+    ids: Iterable[uuid.UUID],
+    fields: Optional[Sequence[str]] = None,
+) -> List[T]:
+    wanted = list(dict.fromkeys(ids))
+    if not wanted:
+        return []
+    statement = select(model).where(model.id.in_(wanted)).options(*load_only_fields(model, fields, keys=(model.id,)))
+    found = {row.id: row for row in (await session.exec(statement)).all()}
+    return [found[i] for i in wanted if i in found]
+
+
+# Loại các phần tử tham chiếu tới bản ghi không tồn tại (khóa ngoại), trả về lỗi cho từng phần tử
+async def check_references(
+    session: AsyncSession,
+    items: List[Tuple[int, T]],
+    field: str,
+    model: type[SQLModel],
+    errors: List[BulkItemError],
+) -> List[Tuple[int, T]]:
+    found = await existing_ids(session, model, (getattr(item, field) for _, item in items))
+    kept: List[Tuple[int, T]] = []
+    for index, item in items:
+        value = getattr(item, field)
+        if value is not None and value not in found:
+            errors.append(BulkItemError(index=index, detail=f"{field}: {model.__name__} {value} not found"))
+        else:
+            kept.append((index, item))
+    return kept
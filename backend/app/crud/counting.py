@@ -0,0 +1,79 @@
+import enum
+import json
+from typing import Any, Optional
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache_backends import TTLCache
+from app.core.config import settings
+
+
+class CountMode(str, enum.Enum):
+    """Cách tính trường `count` trong các response danh sách"""
+
+    exact = "exact"  # COUNT(*) chính xác (có cache TTL theo bộ lọc)
+    estimated = "estimated"  # Ước lượng từ thống kê của planner (pg_class/EXPLAIN)
+    none = "none"  # Không đếm, `count` trả về null
+
+
+# Cache TTL + LRU cho kết quả COUNT(*) theo (bảng, bộ lọc)
+_count_cache = TTLCache(settings.COUNT_CACHE_TTL_SECONDS, settings.COUNT_CACHE_MAX_ENTRIES)
+
+
+# Khóa cache: câu SQL đã biên dịch + tham số (mỗi bộ lọc một khóa riêng)
+def _filter_key(statement: Any) -> str:
+    compiled = statement.compile()
+    params = {k: str(v) for k, v in compiled.params.items()}
+    return f"{compiled}|{json.dumps(params, sort_keys=True)}"
+
+
+async def _estimate(session: AsyncSession, model: type[SQLModel], where: tuple[Any, ...]) -> Optional[int]:
+    """Ước lượng số dòng từ thống kê PostgreSQL; None nếu không ước lượng được"""
+    connection = await session.connection()
+    if connection.dialect.name != "postgresql":
+        return None
+    if not where:
+        result = await connection.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": model.__tablename__},
+        )
+        estimate = result.scalar()
+        # reltuples = -1 khi bảng chưa từng được ANALYZE
+        return int(estimate) if estimate is not None and estimate >= 0 else None
+    compiled = select(model).where(*where).compile(dialect=connection.dialect)
+    result = await connection.exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.construct_params()
+    )
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(
+    session: AsyncSession,
+    model: type[SQLModel],
+    *where: Any,
+    mode: CountMode = CountMode.exact,
+) -> Optional[int]:
+    """Đếm số bản ghi của `model` thỏa các điều kiện `where` theo `mode`"""
+    if mode == CountMode.none:
+        return None
+    if mode == CountMode.estimated:
+        estimate = await _estimate(session, model, where)
+        if estimate is not None:
+            return estimate
+    statement = select(func.count()).select_from(model).where(*where)
+    key = (model.__tablename__, _filter_key(statement))
+    count = _count_cache.get(key)
+    if count is None:
+        count = (await session.exec(statement)).one()
+        _count_cache.set(key, count)
+    return count
+
+
+def invalidate_counts(model: type[SQLModel]) -> None:
+    """Xóa các count đã cache của bảng (gọi sau khi ghi dữ liệu)"""
+    _count_cache.discard_namespace(model.__tablename__)
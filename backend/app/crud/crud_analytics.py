@@ -0,0 +1,198 @@
+import uuid
+from datetime import date, datetime, time
+from typing import Any, List, Optional
+
+from sqlalchemy import and_, desc
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud.crud_order import order_filters
+from app.models import (
+    Category,
+    Customer,
+    CustomerOrderCount,
+    Order,
+    Product,
+    ProductNutritionStats,
+    SalesDaily,
+    SalesStoreDaily,
+    SalesSummary,
+    Store,
+    StoreDayRevenue,
+    TopVariant,
+    Variant,
+)
+
+# Điều kiện lọc trên bảng tổng hợp: date_from bao gồm, date_to không bao gồm
+def rollup_filters(model: Any, date_from: Optional[date] = None, date_to: Optional[date] = None, store_id: Optional[uuid.UUID] = None) -> List[Any]:
+    conditions = []
+    if date_from is not None:
+        conditions.append(model.day >= date_from)
+    if date_to is not None:
+        conditions.append(model.day < date_to)
+    if store_id is not None:
+        conditions.append(model.store_id == store_id)
+    return conditions
+
+# Tổng quan cho dashboard: số bản ghi mỗi bảng, số đơn và doanh thu từ bảng tổng hợp (một truy vấn)
+async def get_sales_summary(*, session: AsyncSession) -> SalesSummary:
+    def count(model: Any) -> Any:
+        return select(func.count()).select_from(model).scalar_subquery()
+
+    orders = select(func.coalesce(func.sum(SalesStoreDaily.orders), 0)).scalar_subquery()
+    revenue = select(func.coalesce(func.sum(SalesDaily.revenue), 0.0)).scalar_subquery()
+    statement = select(
+        count(Product).label("products"),
+        count(Category).label("categories"),
+        count(Customer).label("customers"),
+        count(Store).label("stores"),
+        orders.label("orders"),
+        revenue.label("revenue"),
+    )
+    row = (await session.exec(statement)).one()._mapping
+    avg_order_value = row["revenue"] / row["orders"] if row["orders"] else 0.0
+    return SalesSummary(**row, avg_order_value=avg_order_value)
+
+# Doanh thu theo cửa hàng và ngày, đọc từ bảng tổng hợp, mới nhất trước
+async def get_revenue_by_store_day(
+    *,
+    session: AsyncSession,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    store_id: Optional[uuid.UUID] = None,
+    limit: int = 1000,
+) -> List[StoreDayRevenue]:
+    sales = (
+        select(
+            SalesDaily.day,
+            SalesDaily.store_id,
+            func.sum(SalesDaily.quantity).label("quantity"),
+            func.sum(SalesDaily.revenue).label("revenue"),
+        )
+        .where(*rollup_filters(SalesDaily, date_from, date_to, store_id))
+        .group_by(SalesDaily.day, SalesDaily.store_id)
+        .subquery()
+    )
+    statement = (
+        select(
+            SalesStoreDaily.store_id,
+            Store.name_store,
+            SalesStoreDaily.day,
+            SalesStoreDaily.orders,
+            func.coalesce(sales.c.quantity, 0).label("quantity"),
+            func.coalesce(sales.c.revenue, 0.0).label("revenue"),
+        )
+        .outerjoin(Store, Store.id == SalesStoreDaily.store_id)
+        .outerjoin(sales, and_(sales.c.day == SalesStoreDaily.day, sales.c.store_id == SalesStoreDaily.store_id))
+        .where(*rollup_filters(SalesStoreDaily, date_from, date_to, store_id))
+        .order_by(desc(SalesStoreDaily.day), SalesStoreDaily.store_id)
+        .limit(limit)
+    )
+    rows = (await session.exec(statement)).all()
+    return [StoreDayRevenue.model_validate(row._mapping) for row in rows]
+
+# Variant bán chạy nhất theo tổng số lượng, đọc từ bảng tổng hợp
+async def get_top_variants(
+    *,
+    session: AsyncSession,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    store_id: Optional[uuid.UUID] = None,
+    limit: int = 10,
+) -> List[TopVariant]:
+    sales = (
+        select(
+            SalesDaily.variant_id,
+            func.sum(SalesDaily.quantity).label("quantity"),
+            func.sum(SalesDaily.revenue).label("revenue"),
+        )
+        .where(*rollup_filters(SalesDaily, date_from, date_to, store_id))
+        .group_by(SalesDaily.variant_id)
+        .order_by(desc("quantity"), SalesDaily.variant_id)
+        .limit(limit)
+        .subquery()
+    )
+    statement = (
+        select(
+            sales.c.variant_id,
+            Variant.beverage_option,
+            Product.id.label("product_id"),
+            Product.name.label("product_name"),
+            sales.c.quantity,
+            sales.c.revenue,
+        )
+        .join(Variant, Variant.id == sales.c.variant_id)
+        .join(Product, Product.id == Variant.product_id)
+        .order_by(desc(sales.c.quantity), sales.c.variant_id)
+    )
+    rows = (await session.exec(statement)).all()
+    return [TopVariant.model_validate(row._mapping) for row in rows]
+
+# Thống kê dinh dưỡng/giá của các variant theo từng sản phẩm
+async def get_product_nutrition_stats(
+    *,
+    session: AsyncSession,
+    product_id: Optional[uuid.UUID] = None,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[ProductNutritionStats]:
+    statement = (
+        select(
+            Product.id.label("product_id"),
+            Product.name.label("product_name"),
+            func.count(Variant.id).label("variants"),
+            func.avg(Variant.price).label("avg_price"),
+            func.min(Variant.price).label("min_price"),
+            func.max(Variant.price).label("max_price"),
+            func.avg(Variant.calories).label("avg_calories"),
+            func.max(Variant.calories).label("max_calories"),
+            func.max(Variant.caffeine_mg).label("max_caffeine_mg"),
+            func.avg(Variant.protein_g).label("avg_protein_g"),
+            func.avg(Variant.dietary_fibre_g).label("avg_dietary_fibre_g"),
+            func.avg(Variant.sugars_g).label("avg_sugars_g"),
+        )
+        .outerjoin(Variant, Variant.product_id == Product.id)
+        .group_by(Product.id, Product.name)
+        .order_by(Product.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    if product_id is not None:
+        statement = statement.where(Product.id == product_id)
+    rows = (await session.exec(statement)).all()
+    return [ProductNutritionStats.model_validate(row._mapping) for row in rows]
+
+# Số đơn, tổng chi tiêu và lần mua gần nhất của từng khách hàng, nhiều đơn nhất trước
+async def get_customer_order_counts(
+    *,
+    session: AsyncSession,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    store_id: Optional[uuid.UUID] = None,
+    min_orders: int = 1,
+    skip: int = 0,
+    limit: int = 100,
+) -> List[CustomerOrderCount]:
+    # Bảng tổng hợp không có chiều khách hàng: đếm trực tiếp trên orders theo khoảng ngày
+    order_from = datetime.combine(date_from, time.min) if date_from is not None else None
+    order_to = datetime.combine(date_to, time.min) if date_to is not None else None
+    orders = func.count(Order.id).label("orders")
+    statement = (
+        select(
+            Customer.id.label("customer_id"),
+            Customer.name,
+            Customer.username,
+            orders,
+            func.coalesce(func.sum(Order.total_amount), 0.0).label("total_spent"),
+            func.max(Order.order_date).label("last_order_date"),
+        )
+        .join(Order, Order.customer_id == Customer.id)
+        .where(*order_filters(order_from, order_to, store_id))
+        .group_by(Customer.id, Customer.name, Customer.username)
+        .having(func.count(Order.id) >= min_orders)
+        .order_by(desc(orders), Customer.id)
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = (await session.exec(statement)).all()
+    return [CustomerOrderCount.model_validate(row._mapping) for row in rows]
@@ -1,59 +1,103 @@
 import uuid
-from typing import Any, List, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
 
-from sqlmodel import Session, select, func, or_
+from pydantic import TypeAdapter
+from sqlmodel import select, func, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models import Category, CategoryCreate, CategoryUpdate
+from app.core.cache import catalog_cache
+from app.crud.bulk import get_by_ids
+from app.crud.counting import CountMode, count_rows, invalidate_counts
+from app.crud.pagination import next_cursor, paginate
+from app.crud.projection import load_only_fields
+from app.crud.search import order_by_rank, text_search
+from app.models import Category, CategoryCreate, CategoryPublic, CategoryUpdate, Product
+
+# Kiểu giá trị lưu trong cache catalog (để serialize khi backend là Redis)
+_PAGE_ADAPTER = TypeAdapter(Tuple[List[CategoryPublic], Optional[int], Optional[str]])
+_ITEM_ADAPTER = TypeAdapter(Optional[CategoryPublic])
+
+# Khóa sắp xếp ổn định dùng cho phân trang
+PAGE_KEYS = (Category.id,)
+
+# Cột nguồn của computed field trong CategoryPublic (dùng khi chọn cột theo `fields`)
+FIELD_SOURCES = {"name": (Category.name_cat,)}
 
 # Hàm tạo mới category (danh mục sản phẩm)
-def create_category(*, session: Session, category_create: CategoryCreate) -> Category:
+async def create_category(*, session: AsyncSession, category_create: CategoryCreate) -> Category:
     db_obj = Category.model_validate(category_create)
     session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
+    await session.commit()
+    invalidate_counts(Category)
+    await catalog_cache.invalidate(Category.__tablename__)
+    await session.refresh(db_obj)
     return db_obj
 
 # Hàm cập nhật category
-def update_category(*, session: Session, db_category: Category, category_in: CategoryUpdate) -> Any:
+async def update_category(*, session: AsyncSession, db_category: Category, category_in: CategoryUpdate) -> Any:
     category_data = category_in.model_dump(exclude_unset=True)
     db_category.sqlmodel_update(category_data)
     session.add(db_category)
-    session.commit()
-    session.refresh(db_category)
+    await session.commit()
+    invalidate_counts(Category)
+    await catalog_cache.invalidate(Category.__tablename__)
+    await session.refresh(db_category)
     return db_category
 
-# Lấy category theo id
-def get_category(*, session: Session, id: uuid.UUID) -> Category | None:
-    return session.get(Category, id)
+# Lấy category theo id (bản ghi ORM, dùng cho sửa/xóa)
+async def get_category(*, session: AsyncSession, id: uuid.UUID) -> Category | None:
+    return await session.get(Category, id)
+
+# Lấy category theo id qua cache catalog (bản chụp CategoryPublic, chỉ để đọc)
+async def get_category_public(*, session: AsyncSession, id: uuid.UUID) -> CategoryPublic | None:
+    async def load() -> CategoryPublic | None:
+        category = await session.get(Category, id)
+        return CategoryPublic.model_validate(category) if category else None
+
+    return await catalog_cache.get_or_load(Category.__tablename__, ("id", id), load, _ITEM_ADAPTER)
 
-# Lấy danh sách category và tổng số, có phân trang (skip/limit)
-def get_categories(*, session: Session, skip: int = 0, limit: int = 100) -> Tuple[List[Category], int]:
-    count_statement = select(func.count()).select_from(Category)
-    count = session.exec(count_statement).one()
-    statement = select(Category).offset(skip).limit(limit)
-    categories = session.exec(statement).all()
-    return categories, count
+# Lấy nhiều category theo id qua cache catalog (dùng chung khóa với get_category_public):
+# chỉ các id chưa có trong cache mới được đọc bằng một truy vấn IN (...); bỏ id trùng,
+# giữ thứ tự id gửi lên, bỏ id không tồn tại
+async def get_categories_by_ids(*, session: AsyncSession, ids: Sequence[uuid.UUID]) -> List[CategoryPublic]:
+    async def load(keys: List[Any]) -> dict:
+        rows = await get_by_ids(session, Category, [id for _, id in keys])
+        return {("id", row.id): CategoryPublic.model_validate(row) for row in rows}
+
+    keys = [("id", id) for id in dict.fromkeys(ids)]
+    items = await catalog_cache.get_many_or_load(Category.__tablename__, keys, load, _ITEM_ADAPTER)
+    return [item for item in items if item is not None]
+
+# Lấy danh sách category và tổng số qua cache catalog, có phân trang (skip/limit hoặc cursor)
+async def get_categories(*, session: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, count_mode: CountMode = CountMode.exact) -> Tuple[List[CategoryPublic], Optional[int], Optional[str]]:
+    async def load() -> Tuple[List[CategoryPublic], Optional[int], Optional[str]]:
+        count = await count_rows(session, Category, mode=count_mode)
+        statement = paginate(select(Category), PAGE_KEYS, skip=skip, limit=limit, cursor=cursor)
+        categories = (await session.exec(statement)).all()
+        data = [CategoryPublic.model_validate(cat) for cat in categories]
+        return data, count, next_cursor(categories, PAGE_KEYS, limit)
+
+    return await catalog_cache.get_or_load(Category.__tablename__, ("list", skip, limit, cursor, count_mode), load, _PAGE_ADAPTER)
 
 # Xóa category
-def delete_category(*, session: Session, category: Category) -> None:
-    session.delete(category)
-    session.commit()
+async def delete_category(*, session: AsyncSession, category: Category) -> None:
+    await session.delete(category)
+    await session.commit()
+    invalidate_counts(Category)
+    # ORM đặt product.categories_id = NULL cho các sản phẩm con nên cache product cũng phải bỏ
+    await catalog_cache.invalidate(Category.__tablename__, Product.__tablename__)
 
 # Tìm kiếm category theo tên và mô tả
-def search_categories(*, session: Session, query: str, skip: int = 0, limit: int = 100) -> Tuple[List[Category], int]:
-    search_conditions = [
-        Category.name_cat.ilike(f"%{query}%"),
-        Category.description.ilike(f"%{query}%")
-    ]
-    
-    where_clause = or_(*search_conditions)
+async def search_categories(*, session: AsyncSession, query: str, skip: int = 0, limit: int = 100, count_mode: CountMode = CountMode.exact, fields: Optional[Sequence[str]] = None) -> Tuple[List[Category], Optional[int]]:
+    # Tìm theo tên và mô tả (pg_trgm nếu có, ngược lại ILIKE)
+    where_clause, rank = await text_search(session, [Category.name_cat, Category.description], query)
     
     # Đếm tổng số kết quả
-    count_statement = select(func.count()).select_from(Category).where(where_clause)
-    count = session.exec(count_statement).one()
+    count = await count_rows(session, Category, where_clause, mode=count_mode)
     
     # Lấy danh sách danh mục
-    statement = select(Category).where(where_clause).offset(skip).limit(limit)
-    categories = session.exec(statement).all()
+    statement = select(Category).where(where_clause).options(*load_only_fields(Category, fields, sources=FIELD_SOURCES))
+    statement = order_by_rank(statement, rank, *PAGE_KEYS).offset(skip).limit(limit)
+    categories = (await session.exec(statement)).all()
     
     return categories, count
\ No newline at end of file
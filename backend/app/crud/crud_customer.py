@@ -1,94 +1,215 @@
+import asyncio
+import logging
 import uuid
-from typing import Any, List, Tuple, Optional
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
 
-from sqlmodel import Session, select, func, or_, and_
+import numpy as np
+from sqlalchemy import LargeBinary, type_coerce
+from sqlalchemy.orm import load_only
+from sqlmodel import select, func, or_, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.core.security import get_password_hash, verify_password
-from app.models import Customer, CustomerCreate, CustomerUpdate
+from app.core.cache_backends import TTLCache
+from app.core.config import settings
+from app.core.embedding_index import SharedEmbeddingIndex
+from app.core.security import password_hasher
+from app.core.vectors import EmbeddingIndex, normalize
+from app.crud.bulk import get_by_ids
+from app.crud.counting import CountMode, count_rows, invalidate_counts
+from app.crud.crud_order import order_filters
+from app.crud.pagination import next_cursor, paginate
+from app.crud.projection import load_only_fields
+from app.crud.search import order_by_rank, text_search
+from app.crud.streaming import stream_batches
+from app.models import Customer, CustomerCreate, CustomerPrincipal, CustomerUpdate, Order
+
+# Khóa sắp xếp ổn định dùng cho phân trang
+PAGE_KEYS = (Customer.id,)
+
+logger = logging.getLogger(__name__)
+
+# Ma trận embedding của customers (file mmap dùng chung giữa các worker) cho tìm kiếm tương tự
+customer_embeddings = SharedEmbeddingIndex(settings.EMBEDDING_INDEX_PATH, settings.EMBEDDING_INDEX_REBUILD_SECONDS)
+
+# Cache thông tin xác thực customer đăng nhập (trong từng worker)
+_principal_cache = TTLCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+
+# Cập nhật dòng của customer trong chỉ mục embedding sau khi ghi DB (vector None = xóa);
+# lỗi chỉ ghi log, lần dựng lại định kỳ từ DB sẽ sửa chỉ mục
+async def _sync_embedding(id: uuid.UUID, embedding: Optional[Sequence[float]]) -> None:
+    try:
+        await asyncio.to_thread(customer_embeddings.upsert, id, embedding)
+    except OSError:
+        logger.exception("Failed to update embedding index", extra={"customer_id": str(id)})
 
 # Hàm tạo mới customer (tạo tài khoản khách hàng)
-def create_customer(*, session: Session, customer_create: CustomerCreate) -> Customer:
-    # Lưu mật khẩu dưới dạng hash
-    db_obj = Customer.model_validate(
-        customer_create, update={"hashed_password": get_password_hash(customer_create.password)}
-    )
+async def create_customer(*, session: AsyncSession, customer_create: CustomerCreate) -> Customer:
+    # Lưu mật khẩu dưới dạng hash (bcrypt chạy trong process pool, không chặn event loop)
+    update = {}
+    if customer_create.password is not None:
+        update["password"] = await password_hasher.hash(customer_create.password)
+    db_obj = Customer.model_validate(customer_create, update=update)
     session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
+    await session.commit()
+    invalidate_counts(Customer)
+    if db_obj.embedding is not None:
+        await _sync_embedding(db_obj.id, db_obj.embedding)
+    await session.refresh(db_obj)
     return db_obj
 
 # Hàm cập nhật thông tin customer
-def update_customer(*, session: Session, db_customer: Customer, customer_in: CustomerUpdate) -> Any:
+async def update_customer(*, session: AsyncSession, db_customer: Customer, customer_in: CustomerUpdate) -> Any:
     customer_data = customer_in.model_dump(exclude_unset=True)
     extra_data = {}
     # Nếu có cập nhật mật khẩu thì hash lại
-    if "password" in customer_data:
-        password = customer_data["password"]
-        hashed_password = get_password_hash(password)
-        extra_data["hashed_password"] = hashed_password
+    if customer_data.get("password") is not None:
+        extra_data["password"] = await password_hasher.hash(customer_data["password"])
     db_customer.sqlmodel_update(customer_data, update=extra_data)
     session.add(db_customer)
-    session.commit()
-    session.refresh(db_customer)
+    await session.commit()
+    invalidate_counts(Customer)
+    _principal_cache.discard(("customer", db_customer.id))
+    if "embedding" in customer_data:
+        await _sync_embedding(db_customer.id, db_customer.embedding)
+    await session.refresh(db_customer)
     return db_customer
 
-# Lấy customer theo email (dùng cho login)
-def get_customer_by_email(*, session: Session, email: str) -> Customer | None:
-    statement = select(Customer).where(Customer.email == email)
-    session_customer = session.exec(statement).first()
+# Lấy customer theo username (dùng cho login): chỉ nạp các cột cần để xác thực, không
+# nạp embedding; dùng index ix_customers_username
+async def get_customer_by_username(*, session: AsyncSession, username: str) -> Customer | None:
+    statement = (
+        select(Customer)
+        .where(Customer.username == username)
+        .options(load_only(Customer.id, Customer.username, Customer.name, Customer.password))
+    )
+    session_customer = (await session.exec(statement)).first()
     return session_customer
 
-# Xác thực customer khi đăng nhập: kiểm tra email và mật khẩu
-def authenticate_customer(*, session: Session, email: str, password: str) -> Customer | None:
-    db_customer = get_customer_by_email(session=session, email=email)
+# Xác thực customer khi đăng nhập: kiểm tra username và mật khẩu
+async def authenticate_customer(*, session: AsyncSession, username: str, password: str) -> Customer | None:
+    db_customer = await get_customer_by_username(session=session, username=username)
     if not db_customer:
         return None
-    if not verify_password(password, db_customer.hashed_password):
+    if not db_customer.password:
+        return None
+    valid, new_hash = await password_hasher.verify(password, db_customer.password)
+    if not valid:
         return None
+    # Hash cũ (số vòng khác hoặc còn lưu dạng thô): lưu lại hash theo cấu hình hiện tại
+    if new_hash is not None:
+        db_customer.password = new_hash
+        session.add(db_customer)
+        await session.commit()
     return db_customer
 
+# Thông tin xác thực của customer theo id (dùng cho mỗi request có token): chỉ SELECT
+# id/username/name, cache LRU TTL ngắn; bị xóa khỏi cache khi customer được sửa/xóa
+async def get_customer_principal(*, session: AsyncSession, id: uuid.UUID) -> CustomerPrincipal | None:
+    principal = _principal_cache.get(("customer", id))
+    if principal is not None:
+        return principal
+    statement = select(Customer.id, Customer.username, Customer.name).where(Customer.id == id)
+    row = (await session.exec(statement)).first()
+    if row is None:
+        return None
+    principal = CustomerPrincipal(id=row.id, username=row.username, name=row.name)
+    _principal_cache.set(("customer", id), principal)
+    return principal
+
 # Lấy customer theo id
-def get_customer(*, session: Session, id: uuid.UUID) -> Customer | None:
-    """Lấy một customer theo id"""
-    return session.get(Customer, id)
+async def get_customer(*, session: AsyncSession, id: uuid.UUID, fields: Optional[Sequence[str]] = None) -> Customer | None:
+    """Lấy một customer theo id (chỉ nạp các cột của `fields` nếu có)"""
+    return await session.get(Customer, id, options=load_only_fields(Customer, fields))
 
-# Lấy danh sách customers và tổng số, có phân trang
-def get_customers(*, session: Session, skip: int = 0, limit: int = 100) -> Tuple[List[Customer], int]:
+# Lấy nhiều customer theo id bằng một truy vấn IN (...): bỏ id trùng, giữ thứ tự id gửi lên, bỏ id không tồn tại
+async def get_customers_by_ids(*, session: AsyncSession, ids: Sequence[uuid.UUID], fields: Optional[Sequence[str]] = None) -> List[Customer]:
+    return await get_by_ids(session, Customer, ids, fields)
+
+# Lấy danh sách customers và tổng số, có phân trang (skip/limit hoặc cursor)
+async def get_customers(*, session: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, count_mode: CountMode = CountMode.exact, fields: Optional[Sequence[str]] = None) -> Tuple[List[Customer], Optional[int], Optional[str]]:
     """Lấy danh sách các customers với phân trang"""
-    count_statement = select(func.count()).select_from(Customer)
-    count = session.exec(count_statement).one()
-    statement = select(Customer).offset(skip).limit(limit)
-    customers = session.exec(statement).all()
-    return customers, count
+    count = await count_rows(session, Customer, mode=count_mode)
+    # Chỉ SELECT các cột được yêu cầu (tránh nạp cột lớn như embedding khi không cần)
+    statement = select(Customer).options(*load_only_fields(Customer, fields, keys=PAGE_KEYS))
+    statement = paginate(statement, PAGE_KEYS, skip=skip, limit=limit, cursor=cursor)
+    customers = (await session.exec(statement)).all()
+    return customers, count, next_cursor(customers, PAGE_KEYS, limit)
+
+# Nạp toàn bộ embedding (bytes đóng gói, không giải mã thành list) thành chỉ mục NumPy
+async def load_embedding_index(*, session: AsyncSession) -> EmbeddingIndex:
+    statement = select(Customer.id, type_coerce(Customer.embedding, LargeBinary)).where(Customer.embedding.is_not(None))
+    rows = (await session.exec(statement)).all()
+    return EmbeddingIndex.from_packed(rows)
+
+# Tìm k customers có embedding gần nhất cho cả lô `embeddings` (cosine, tìm chính xác bằng một
+# phép nhân ma trận trên chỉ mục mmap); `exclude[i]` là id bỏ khỏi kết quả của truy vấn i.
+# Trả [(customer, điểm)] giảm dần cho từng truy vấn. Sai số chiều -> ValueError
+async def search_similar_customers(
+    *,
+    session: AsyncSession,
+    embeddings: Sequence[Sequence[float]],
+    k: int = 10,
+    exclude: Optional[Sequence[Optional[uuid.UUID]]] = None,
+) -> List[List[Tuple[Customer, float]]]:
+    index = await customer_embeddings.get(lambda: load_embedding_index(session=session))
+    if index.dim == 0:
+        return [[] for _ in embeddings]
+    if any(len(embedding) != index.dim for embedding in embeddings):
+        raise ValueError(f"embedding must have {index.dim} dimensions")
+    queries = normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), index.dim))
+    # Phép nhân ma trận chạy ngoài event loop (NumPy nhả GIL)
+    matches = await asyncio.to_thread(index.search, queries, k, exclude or [None] * len(embeddings))
+    # Một truy vấn IN (...) cho mọi customer xuất hiện trong kết quả
+    ids = [id for query in matches for id, _ in query]
+    customers = {c.id: c for c in await get_by_ids(session, Customer, ids, ("name", "username", "picture"))}
+    return [[(customers[id], score) for id, score in query if id in customers] for query in matches]
+
+# Đọc customers theo lô qua server-side cursor để export; khi có bộ lọc ngày/cửa hàng
+# thì chỉ lấy khách có đơn hàng thỏa bộ lọc đó
+async def stream_customers(
+    *,
+    session: AsyncSession,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    store_id: Optional[uuid.UUID] = None,
+    fields: Optional[Sequence[str]] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[Sequence[Customer]]:
+    statement = select(Customer).options(*load_only_fields(Customer, fields)).order_by(*PAGE_KEYS)
+    conditions = order_filters(date_from, date_to, store_id)
+    if conditions:
+        has_orders = select(Order.id).where(Order.customer_id == Customer.id, *conditions).exists()
+        statement = statement.where(has_orders)
+    async for batch in stream_batches(session, statement, batch_size):
+        yield batch
 
 # Xóa customer
-def delete_customer(*, session: Session, customer: Customer) -> None:
+async def delete_customer(*, session: AsyncSession, customer: Customer) -> None:
     """Xóa một customer"""
-    session.delete(customer)
-    session.commit()
+    await session.delete(customer)
+    await session.commit()
+    invalidate_counts(Customer)
+    _principal_cache.discard(("customer", customer.id))
+    await _sync_embedding(customer.id, None)
 
 # Tìm kiếm customers
-def search_customers(
+async def search_customers(
     *, 
-    session: Session, 
+    session: AsyncSession, 
     query: str, 
     skip: int = 0, 
     limit: int = 100,
     location: Optional[str] = None,
     age_min: Optional[int] = None,
-    age_max: Optional[int] = None
-) -> Tuple[List[Customer], int]:
+    age_max: Optional[int] = None,
+    count_mode: CountMode = CountMode.exact
+) -> Tuple[List[Customer], Optional[int]]:
     """
     Tìm kiếm khách hàng theo tên, username, location
     """
     search_conditions = []
-    
-    if query:
-        search_conditions.extend([
-            Customer.name.ilike(f"%{query}%"),
-            Customer.username.ilike(f"%{query}%"),
-            Customer.location.ilike(f"%{query}%")
-        ])
+    rank = None
     
     # Lọc theo location cụ thể
     if location:
@@ -102,13 +223,10 @@ def search_customers(
     
     # Kết hợp điều kiện
     if query:
-        # Nếu có query, sử dụng OR cho các trường tìm kiếm text
-        text_conditions = [
-            Customer.name.ilike(f"%{query}%"),
-            Customer.username.ilike(f"%{query}%"),
-            Customer.location.ilike(f"%{query}%")
-        ]
-        where_clause = or_(*text_conditions)
+        # Nếu có query, sử dụng OR cho các trường tìm kiếm text (pg_trgm nếu có, ngược lại ILIKE)
+        where_clause, rank = await text_search(
+            session, [Customer.name, Customer.username, Customer.location], query
+        )
         
         # Thêm các điều kiện lọc khác với AND
         other_conditions = []
@@ -127,14 +245,14 @@ def search_customers(
             where_clause = and_(*search_conditions)
         else:
             # Nếu không có điều kiện nào, trả về tất cả
-            return get_customers(session=session, skip=skip, limit=limit)
+            customers, count, _ = await get_customers(session=session, skip=skip, limit=limit, count_mode=count_mode)
+            return customers, count
     
     # Đếm tổng số kết quả
-    count_statement = select(func.count()).select_from(Customer).where(where_clause)
-    count = session.exec(count_statement).one()
+    count = await count_rows(session, Customer, where_clause, mode=count_mode)
     
     # Lấy danh sách khách hàng
-    statement = select(Customer).where(where_clause).offset(skip).limit(limit)
-    customers = session.exec(statement).all()
+    statement = order_by_rank(select(Customer).where(where_clause), rank, *PAGE_KEYS).offset(skip).limit(limit)
+    customers = (await session.exec(statement)).all()
     
     return customers, count
\ No newline at end of file
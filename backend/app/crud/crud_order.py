@@ -1,40 +1,175 @@
 import uuid
-from typing import Any, List, Tuple
+from datetime import datetime
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence, Tuple
 
-from sqlmodel import Session, select, func
+from sqlalchemy import insert, update
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models import Order, OrderCreate, OrderUpdate
+from app.crud.bulk import existing_ids, get_by_ids
+from app.crud.counting import CountMode, count_rows, invalidate_counts
+from app.crud.expand import ExpandTree, expand_options
+from app.crud.pagination import next_cursor, paginate
+from app.crud.projection import load_only_fields
+from app.crud.rollup import SalesRollupDelta, order_day
+from app.crud.streaming import stream_batches
+from app.models import (
+    Customer,
+    Order,
+    OrderCreate,
+    OrderDetail,
+    OrderUpdate,
+    OrderWithDetailsCreate,
+    Store,
+    Variant,
+)
+
+# Khóa sắp xếp ổn định dùng cho phân trang (ngày đặt, rồi id để phá hòa)
+PAGE_KEYS = (Order.order_date, Order.id)
 
 # Tạo mới đơn hàng
-def create_order(*, session: Session, order_create: OrderCreate) -> Order:
+async def create_order(*, session: AsyncSession, order_create: OrderCreate) -> Order:
     db_obj = Order.model_validate(order_create)
     session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
+    rollup = SalesRollupDelta()
+    rollup.add_order(db_obj.order_date, db_obj.store_id)
+    await rollup.apply(session)
+    await session.commit()
+    invalidate_counts(Order)
+    await session.refresh(db_obj)
     return db_obj
 
+class OrderReferenceError(ValueError):
+    """Đơn hàng tham chiếu tới customer/store/variant không tồn tại"""
+
+    def __init__(self, model: str, ids: Iterable[uuid.UUID]) -> None:
+        self.model = model
+        self.ids = sorted(str(i) for i in ids)
+        super().__init__(f"{model} not found: {', '.join(self.ids)}")
+
+# Tạo đơn hàng kèm các dòng chi tiết trong một transaction.
+# unit_price lấy từ Variant.price bằng một truy vấn IN (...), total_amount tính trong database
+async def create_order_with_details(*, session: AsyncSession, order_in: OrderWithDetailsCreate) -> Tuple[Order, List[OrderDetail]]:
+    if not await existing_ids(session, Customer, [order_in.customer_id]):
+        raise OrderReferenceError("Customer", [order_in.customer_id])
+    if not await existing_ids(session, Store, [order_in.store_id]):
+        raise OrderReferenceError("Store", [order_in.store_id])
+
+    variant_ids = {line.variant_id for line in order_in.details}
+    price_statement = select(Variant.id, Variant.price).where(Variant.id.in_(variant_ids))
+    prices = {variant_id: price for variant_id, price in (await session.exec(price_statement)).all()}
+    missing = variant_ids - prices.keys()
+    if missing:
+        raise OrderReferenceError("Variant", missing)
+
+    db_order = Order.model_validate(
+        OrderCreate(customer_id=order_in.customer_id, store_id=order_in.store_id, order_date=order_in.order_date)
+    )
+    session.add(db_order)
+    await session.flush()
+
+    rows = [
+        OrderDetail(
+            order_id=db_order.id,
+            variant_id=line.variant_id,
+            quantity=line.quantity,
+            rate=line.rate,
+            unit_price=prices[line.variant_id],
+        ).model_dump()
+        for line in order_in.details
+    ]
+    statement = insert(OrderDetail).returning(OrderDetail, sort_by_parameter_order=True)
+    order_details = list((await session.scalars(statement, rows)).all())
+
+    # Tổng tiền = SUM(quantity * unit_price) trên các dòng vừa ghi
+    total = (
+        select(func.coalesce(func.sum(OrderDetail.quantity * OrderDetail.unit_price), 0.0))
+        .where(OrderDetail.order_id == db_order.id)
+        .scalar_subquery()
+    )
+    await session.execute(update(Order).where(Order.id == db_order.id).values(total_amount=total))
+    rollup = SalesRollupDelta()
+    rollup.add_order(db_order.order_date, db_order.store_id)
+    for line in order_in.details:
+        rollup.add_line(db_order.order_date, db_order.store_id, line.variant_id, line.quantity, prices[line.variant_id])
+    await rollup.apply(session)
+    await session.commit()
+    invalidate_counts(Order)
+    invalidate_counts(OrderDetail)
+    await session.refresh(db_order)
+    return db_order, order_details
+
 # Cập nhật đơn hàng
-def update_order(*, session: Session, db_order: Order, order_in: OrderUpdate) -> Any:
+async def update_order(*, session: AsyncSession, db_order: Order, order_in: OrderUpdate) -> Any:
     order_data = order_in.model_dump(exclude_unset=True)
+    old_date, old_store = db_order.order_date, db_order.store_id
     db_order.sqlmodel_update(order_data)
     session.add(db_order)
-    session.commit()
-    session.refresh(db_order)
+    if order_day(db_order.order_date) != order_day(old_date) or db_order.store_id != old_store:
+        # Đơn đổi ngày/cửa hàng: chuyển đơn và các dòng chi tiết sang khóa tổng hợp mới
+        rollup = SalesRollupDelta()
+        rollup.add_order(old_date, old_store, -1)
+        rollup.add_order(db_order.order_date, db_order.store_id)
+        await rollup.add_order_lines(session, db_order.id, old_date, old_store, -1)
+        await rollup.add_order_lines(session, db_order.id, db_order.order_date, db_order.store_id)
+        await rollup.apply(session)
+    await session.commit()
+    invalidate_counts(Order)
+    await session.refresh(db_order)
     return db_order
 
-# Lấy đơn hàng theo id
-def get_order(*, session: Session, id: uuid.UUID) -> Order | None:
-    return session.get(Order, id)
+# Lấy đơn hàng theo id; quan hệ trong `expand` (vd: order_details.variant.product, store) được load sẵn
+async def get_order(*, session: AsyncSession, id: uuid.UUID, fields: Optional[Sequence[str]] = None, expand: ExpandTree = ()) -> Order | None:
+    return await session.get(Order, id, options=[*expand_options(Order, expand), *load_only_fields(Order, fields)])
+
+# Lấy nhiều đơn hàng theo id bằng một truy vấn IN (...): bỏ id trùng, giữ thứ tự id gửi lên, bỏ id không tồn tại
+async def get_orders_by_ids(*, session: AsyncSession, ids: Sequence[uuid.UUID], fields: Optional[Sequence[str]] = None) -> List[Order]:
+    return await get_by_ids(session, Order, ids, fields)
+
+# Lấy danh sách đơn hàng và tổng số, có phân trang (skip/limit hoặc cursor)
+async def get_orders(*, session: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, count_mode: CountMode = CountMode.exact, fields: Optional[Sequence[str]] = None, expand: ExpandTree = ()) -> Tuple[List[Order], Optional[int], Optional[str]]:
+    count = await count_rows(session, Order, mode=count_mode)
+    statement = select(Order).options(*expand_options(Order, expand), *load_only_fields(Order, fields, keys=PAGE_KEYS))
+    statement = paginate(statement, PAGE_KEYS, skip=skip, limit=limit, cursor=cursor)
+    orders = (await session.exec(statement)).unique().all()
+    return orders, count, next_cursor(orders, PAGE_KEYS, limit)
+
+# Điều kiện lọc đơn hàng theo khoảng ngày [date_from, date_to) và cửa hàng (dùng chung cho export)
+def order_filters(date_from: Optional[datetime] = None, date_to: Optional[datetime] = None, store_id: Optional[uuid.UUID] = None) -> List[Any]:
+    conditions = []
+    if date_from is not None:
+        conditions.append(Order.order_date >= date_from)
+    if date_to is not None:
+        conditions.append(Order.order_date < date_to)
+    if store_id is not None:
+        conditions.append(Order.store_id == store_id)
+    return conditions
 
-# Lấy danh sách đơn hàng và tổng số, có phân trang
-def get_orders(*, session: Session, skip: int = 0, limit: int = 100) -> Tuple[List[Order], int]:
-    count_statement = select(func.count()).select_from(Order)
-    count = session.exec(count_statement).one()
-    statement = select(Order).offset(skip).limit(limit)
-    orders = session.exec(statement).all()
-    return orders, count
+# Đọc đơn hàng theo lô qua server-side cursor để export, có lọc theo ngày và cửa hàng
+async def stream_orders(
+    *,
+    session: AsyncSession,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    store_id: Optional[uuid.UUID] = None,
+    fields: Optional[Sequence[str]] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[Sequence[Order]]:
+    statement = (
+        select(Order)
+        .where(*order_filters(date_from, date_to, store_id))
+        .options(*load_only_fields(Order, fields))
+        .order_by(*PAGE_KEYS)
+    )
+    async for batch in stream_batches(session, statement, batch_size):
+        yield batch
 
 # Xóa đơn hàng
-def delete_order(*, session: Session, order: Order) -> None:
-    session.delete(order)
-    session.commit()
\ No newline at end of file
+async def delete_order(*, session: AsyncSession, order: Order) -> None:
+    rollup = SalesRollupDelta()
+    rollup.add_order(order.order_date, order.store_id, -1)
+    await rollup.add_order_lines(session, order.id, order.order_date, order.store_id, -1)
+    await session.delete(order)
+    await rollup.apply(session)
+    await session.commit()
+    invalidate_counts(Order)
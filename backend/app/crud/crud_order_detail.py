@@ -1,49 +1,127 @@
 import uuid
-from typing import Any, List, Tuple
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
 
-from sqlmodel import Session, select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import insert
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models import OrderDetail, OrderDetailCreate, OrderDetailUpdate
+from app.crud.bulk import check_references, validate_items
+from app.crud.counting import CountMode, count_rows, invalidate_counts
+from app.crud.expand import ExpandTree, expand_options
+from app.crud.pagination import next_cursor, paginate
+from app.crud.crud_order import order_filters
+from app.crud.projection import load_only_fields
+from app.crud.rollup import SalesRollupDelta, line_of, variant_prices
+from app.crud.streaming import stream_batches
+from app.models import BulkItemError, Order, OrderDetail, OrderDetailCreate, OrderDetailUpdate, Variant
+
+# Khóa sắp xếp ổn định dùng cho phân trang
+PAGE_KEYS = (OrderDetail.id,)
+
+# Dòng không gửi unit_price lấy giá hiện tại của variant (như checkout), để doanh thu
+# đã ghi vào bảng tổng hợp không đổi khi giá variant thay đổi về sau
+async def _snapshot_unit_prices(session: AsyncSession, details: Sequence[OrderDetail]) -> None:
+    prices = await variant_prices(session, {d.variant_id for d in details if d.unit_price is None})
+    for detail in details:
+        if detail.unit_price is None:
+            detail.unit_price = prices.get(detail.variant_id)
 
 # Tạo mới chi tiết đơn hàng
-def create_order_detail(*, session: Session, order_detail_create: OrderDetailCreate) -> OrderDetail:
+async def create_order_detail(*, session: AsyncSession, order_detail_create: OrderDetailCreate) -> OrderDetail:
     db_obj = OrderDetail.model_validate(order_detail_create)
+    await _snapshot_unit_prices(session, [db_obj])
     session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
+    rollup = SalesRollupDelta()
+    await rollup.add_lines(session, [line_of(db_obj)])
+    await rollup.apply(session)
+    await session.commit()
+    invalidate_counts(OrderDetail)
+    await session.refresh(db_obj)
     return db_obj
 
+# Tạo nhiều chi tiết đơn hàng trong một transaction (INSERT ... RETURNING theo lô)
+async def bulk_create_order_details(*, session: AsyncSession, items: Sequence[Any]) -> Tuple[List[OrderDetail], List[BulkItemError]]:
+    valid, errors = validate_items(items, OrderDetailCreate)
+    valid = await check_references(session, valid, "order_id", Order, errors)
+    valid = await check_references(session, valid, "variant_id", Variant, errors)
+
+    order_details: List[OrderDetail] = []
+    if valid:
+        details = [OrderDetail.model_validate(item) for _, item in valid]
+        await _snapshot_unit_prices(session, details)
+        rows = [detail.model_dump() for detail in details]
+        statement = insert(OrderDetail).returning(OrderDetail, sort_by_parameter_order=True)
+        order_details = list((await session.scalars(statement, rows)).all())
+        rollup = SalesRollupDelta()
+        await rollup.add_lines(session, map(line_of, order_details))
+        await rollup.apply(session)
+        await session.commit()
+        invalidate_counts(OrderDetail)
+    errors.sort(key=lambda e: e.index)
+    return order_details, errors
+
 # Cập nhật chi tiết đơn hàng
-def update_order_detail(*, session: Session, db_order_detail: OrderDetail, order_detail_in: OrderDetailUpdate) -> Any:
+async def update_order_detail(*, session: AsyncSession, db_order_detail: OrderDetail, order_detail_in: OrderDetailUpdate) -> Any:
     order_detail_data = order_detail_in.model_dump(exclude_unset=True)
+    rollup = SalesRollupDelta()
+    await rollup.add_lines(session, [line_of(db_order_detail)], -1)
+    if "variant_id" in order_detail_data and "unit_price" not in order_detail_data:
+        # Đổi variant mà không gửi đơn giá: chụp lại giá của variant mới, không giữ giá variant cũ
+        order_detail_data["unit_price"] = None
     db_order_detail.sqlmodel_update(order_detail_data)
+    await _snapshot_unit_prices(session, [db_order_detail])
     session.add(db_order_detail)
-    session.commit()
-    session.refresh(db_order_detail)
+    await rollup.add_lines(session, [line_of(db_order_detail)])
+    await rollup.apply(session)
+    await session.commit()
+    invalidate_counts(OrderDetail)
+    await session.refresh(db_order_detail)
     return db_order_detail
 
-# Lấy chi tiết đơn hàng theo id, eagerly load variant
-def get_order_detail(*, session: Session, id: uuid.UUID) -> OrderDetail | None:
-    statement = select(OrderDetail).options(selectinload(OrderDetail.variant)).where(OrderDetail.id == id)
-    result = session.exec(statement)
-    return result.one_or_none()
+# Lấy chi tiết đơn hàng theo id; quan hệ trong `expand` (vd: variant.product) được load sẵn
+async def get_order_detail(*, session: AsyncSession, id: uuid.UUID, fields: Optional[Sequence[str]] = None, expand: ExpandTree = ()) -> OrderDetail | None:
+    statement = select(OrderDetail).options(*expand_options(OrderDetail, expand), *load_only_fields(OrderDetail, fields)).where(OrderDetail.id == id)
+    result = await session.exec(statement)
+    return result.unique().one_or_none()
 
-# Lấy danh sách chi tiết đơn hàng và tổng số, có phân trang, eagerly load variant
-def get_order_details(*, session: Session, skip: int = 0, limit: int = 100, order_id: uuid.UUID = None) -> Tuple[List[OrderDetail], int]:
+# Lấy danh sách chi tiết đơn hàng và tổng số, có phân trang (skip/limit hoặc cursor);
+# quan hệ trong `expand` được load cho cả trang bằng JOIN/IN (...), không lazy load từng dòng
+async def get_order_details(*, session: AsyncSession, skip: int = 0, limit: int = 100, order_id: uuid.UUID = None, cursor: Optional[str] = None, count_mode: CountMode = CountMode.exact, fields: Optional[Sequence[str]] = None, expand: ExpandTree = ()) -> Tuple[List[OrderDetail], Optional[int], Optional[str]]:
     if order_id:
-        count_statement = select(func.count()).select_from(OrderDetail).where(OrderDetail.order_id == order_id)
-        count = session.exec(count_statement).one()
-        statement = select(OrderDetail).where(OrderDetail.order_id == order_id).options(selectinload(OrderDetail.variant)).offset(skip).limit(limit)
+        count = await count_rows(session, OrderDetail, OrderDetail.order_id == order_id, mode=count_mode)
+        statement = select(OrderDetail).where(OrderDetail.order_id == order_id)
     else:
-        count_statement = select(func.count()).select_from(OrderDetail)
-        count = session.exec(count_statement).one()
-        statement = select(OrderDetail).options(selectinload(OrderDetail.variant)).offset(skip).limit(limit)
+        count = await count_rows(session, OrderDetail, mode=count_mode)
+        statement = select(OrderDetail)
+
+    statement = statement.options(*expand_options(OrderDetail, expand), *load_only_fields(OrderDetail, fields, keys=PAGE_KEYS))
+    statement = paginate(statement, PAGE_KEYS, skip=skip, limit=limit, cursor=cursor)
+    order_details = (await session.exec(statement)).unique().all()
+    return order_details, count, next_cursor(order_details, PAGE_KEYS, limit)
 
-    order_details = session.exec(statement).all()
-    return order_details, count
+# Đọc chi tiết đơn hàng theo lô qua server-side cursor để export, lọc theo ngày đặt và cửa hàng của đơn
+async def stream_order_details(
+    *,
+    session: AsyncSession,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    store_id: Optional[uuid.UUID] = None,
+    fields: Optional[Sequence[str]] = None,
+    batch_size: int = 1000,
+) -> AsyncIterator[Sequence[OrderDetail]]:
+    statement = select(OrderDetail).options(*load_only_fields(OrderDetail, fields)).order_by(*PAGE_KEYS)
+    conditions = order_filters(date_from, date_to, store_id)
+    if conditions:
+        statement = statement.join(Order, Order.id == OrderDetail.order_id).where(*conditions)
+    async for batch in stream_batches(session, statement, batch_size):
+        yield batch
 
 # Xóa chi tiết đơn hàng
-def delete_order_detail(*, session: Session, order_detail: OrderDetail) -> None:
-    session.delete(order_detail)
-    session.commit()
+async def delete_order_detail(*, session: AsyncSession, order_detail: OrderDetail) -> None:
+    rollup = SalesRollupDelta()
+    await rollup.add_lines(session, [line_of(order_detail)], -1)
+    await session.delete(order_detail)
+    await rollup.apply(session)
+    await session.commit()
+    invalidate_counts(OrderDetail)
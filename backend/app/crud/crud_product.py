@@ -1,75 +1,142 @@
 import uuid
-from typing import Any, List, Tuple, Optional
+from typing import Any, List, Sequence, Tuple, Optional
 
-from sqlmodel import Session, select, func, or_, and_
+from sqlalchemy import update
+from pydantic import TypeAdapter
+from sqlmodel import select, func, or_, and_
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models import Product, ProductCreate, ProductUpdate
+from app.core.cache import catalog_cache
+from app.crud.bulk import check_references, existing_ids, get_by_ids, validate_items
+from app.crud.counting import CountMode, count_rows, invalidate_counts
+from app.crud.pagination import next_cursor, paginate
+from app.crud.projection import load_only_fields
+from app.crud.search import order_by_rank, text_search
+from app.models import BulkItemError, Category, Product, ProductBulkUpdateItem, ProductCreate, ProductPublic, ProductUpdate, Variant
+
+# Kiểu giá trị lưu trong cache catalog (để serialize khi backend là Redis)
+_PAGE_ADAPTER = TypeAdapter(Tuple[List[ProductPublic], Optional[int], Optional[str]])
+_ITEM_ADAPTER = TypeAdapter(Optional[ProductPublic])
+
+# Khóa sắp xếp ổn định dùng cho phân trang
+PAGE_KEYS = (Product.id,)
 
 # Tạo mới sản phẩm
-def create_product(*, session: Session, product_create: ProductCreate) -> Product:
+async def create_product(*, session: AsyncSession, product_create: ProductCreate) -> Product:
     db_obj = Product.model_validate(product_create)
     session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
+    await session.commit()
+    invalidate_counts(Product)
+    await catalog_cache.invalidate(Product.__tablename__)
+    await session.refresh(db_obj)
     return db_obj
 
 # Cập nhật sản phẩm
-def update_product(*, session: Session, db_product: Product, product_in: ProductUpdate) -> Any:
+async def update_product(*, session: AsyncSession, db_product: Product, product_in: ProductUpdate) -> Any:
     product_data = product_in.model_dump(exclude_unset=True)
     db_product.sqlmodel_update(product_data)
     session.add(db_product)
-    session.commit()
-    session.refresh(db_product)
+    await session.commit()
+    invalidate_counts(Product)
+    await catalog_cache.invalidate(Product.__tablename__)
+    await session.refresh(db_product)
     return db_product
 
-# Lấy sản phẩm theo id
-def get_product(*, session: Session, id: uuid.UUID) -> Product | None:
-    return session.get(Product, id)
+# Cập nhật nhiều sản phẩm trong một transaction (UPDATE theo khóa chính, executemany)
+async def bulk_update_products(*, session: AsyncSession, items: Sequence[Any]) -> Tuple[List[Product], List[BulkItemError]]:
+    valid, errors = validate_items(items, ProductBulkUpdateItem)
+    found = await existing_ids(session, Product, (item.id for _, item in valid))
+    for index, item in valid:
+        if item.id not in found:
+            errors.append(BulkItemError(index=index, detail=f"Product {item.id} not found"))
+    valid = [(index, item) for index, item in valid if item.id in found]
+    valid = await check_references(session, valid, "categories_id", Category, errors)
+
+    rows = [item.model_dump(exclude_unset=True) for _, item in valid]
+    products: List[Product] = []
+    if valid:
+        changes = [row for row in rows if len(row) > 1]
+        if changes:
+            await session.execute(update(Product), changes)
+            await session.commit()
+            invalidate_counts(Product)
+            await catalog_cache.invalidate(Product.__tablename__)
+        ids = [row["id"] for row in rows]
+        by_id = {p.id: p for p in (await session.exec(select(Product).where(Product.id.in_(ids)))).all()}
+        products = [by_id[i] for i in dict.fromkeys(ids) if i in by_id]
+    errors.sort(key=lambda e: e.index)
+    return products, errors
+
+# Lấy sản phẩm theo id (bản ghi ORM, dùng cho sửa/xóa)
+async def get_product(*, session: AsyncSession, id: uuid.UUID) -> Product | None:
+    return await session.get(Product, id)
+
+# Lấy sản phẩm theo id qua cache catalog (bản chụp ProductPublic, chỉ để đọc)
+async def get_product_public(*, session: AsyncSession, id: uuid.UUID) -> ProductPublic | None:
+    async def load() -> ProductPublic | None:
+        product = await session.get(Product, id)
+        return ProductPublic.model_validate(product) if product else None
 
-# Lấy danh sách sản phẩm và tổng số, có phân trang
-def get_products(*, session: Session, skip: int = 0, limit: int = 100) -> Tuple[List[Product], int]:
-    count_statement = select(func.count()).select_from(Product)
-    count = session.exec(count_statement).one()
-    statement = select(Product).offset(skip).limit(limit)
-    products = session.exec(statement).all()
-    return products, count
+    return await catalog_cache.get_or_load(Product.__tablename__, ("id", id), load, _ITEM_ADAPTER)
+
+# Lấy nhiều sản phẩm theo id qua cache catalog (dùng chung khóa với get_product_public):
+# chỉ các id chưa có trong cache mới được đọc bằng một truy vấn IN (...); bỏ id trùng,
+# giữ thứ tự id gửi lên, bỏ id không tồn tại
+async def get_products_by_ids(*, session: AsyncSession, ids: Sequence[uuid.UUID]) -> List[ProductPublic]:
+    async def load(keys: List[Any]) -> dict:
+        rows = await get_by_ids(session, Product, [id for _, id in keys])
+        return {("id", row.id): ProductPublic.model_validate(row) for row in rows}
+
+    keys = [("id", id) for id in dict.fromkeys(ids)]
+    items = await catalog_cache.get_many_or_load(Product.__tablename__, keys, load, _ITEM_ADAPTER)
+    return [item for item in items if item is not None]
+
+# Lấy danh sách sản phẩm và tổng số qua cache catalog, có phân trang (skip/limit hoặc cursor)
+async def get_products(*, session: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, count_mode: CountMode = CountMode.exact) -> Tuple[List[ProductPublic], Optional[int], Optional[str]]:
+    async def load() -> Tuple[List[ProductPublic], Optional[int], Optional[str]]:
+        count = await count_rows(session, Product, mode=count_mode)
+        statement = paginate(select(Product), PAGE_KEYS, skip=skip, limit=limit, cursor=cursor)
+        products = (await session.exec(statement)).all()
+        data = [ProductPublic.model_validate(prod) for prod in products]
+        return data, count, next_cursor(products, PAGE_KEYS, limit)
+
+    return await catalog_cache.get_or_load(Product.__tablename__, ("list", skip, limit, cursor, count_mode), load, _PAGE_ADAPTER)
 
 # Xóa sản phẩm
-def delete_product(*, session: Session, product: Product) -> None:
-    session.delete(product)
-    session.commit()
+async def delete_product(*, session: AsyncSession, product: Product) -> None:
+    await session.delete(product)
+    await session.commit()
+    invalidate_counts(Product)
+    # ORM đặt variant.product_id = NULL cho các variant con nên cache variant cũng phải bỏ
+    await catalog_cache.invalidate(Product.__tablename__, Variant.__tablename__)
 
 # Tìm kiếm sản phẩm theo tên và mô tả
-def search_products(
+async def search_products(
     *, 
-    session: Session, 
+    session: AsyncSession, 
     query: str, 
     skip: int = 0, 
     limit: int = 100,
-    category_id: Optional[uuid.UUID] = None
-) -> Tuple[List[Product], int]:
+    category_id: Optional[uuid.UUID] = None,
+    count_mode: CountMode = CountMode.exact,
+    fields: Optional[Sequence[str]] = None
+) -> Tuple[List[Product], Optional[int]]:
     """
     Tìm kiếm sản phẩm theo tên và mô tả
     """
-    # Tạo điều kiện tìm kiếm
-    search_conditions = [
-        Product.name.ilike(f"%{query}%"),
-        Product.descriptions.ilike(f"%{query}%")
-    ]
-    
-    # Kết hợp các điều kiện tìm kiếm
-    where_clause = or_(*search_conditions)
+    # Tạo điều kiện tìm kiếm theo tên và mô tả (pg_trgm nếu có, ngược lại ILIKE)
+    where_clause, rank = await text_search(session, [Product.name, Product.descriptions], query)
     
     # Thêm điều kiện lọc theo category nếu có
     if category_id:
         where_clause = and_(where_clause, Product.categories_id == category_id)
     
     # Đếm tổng số kết quả
-    count_statement = select(func.count()).select_from(Product).where(where_clause)
-    count = session.exec(count_statement).one()
+    count = await count_rows(session, Product, where_clause, mode=count_mode)
     
     # Lấy danh sách sản phẩm
-    statement = select(Product).where(where_clause).offset(skip).limit(limit)
-    products = session.exec(statement).all()
+    statement = select(Product).where(where_clause).options(*load_only_fields(Product, fields))
+    statement = order_by_rank(statement, rank, *PAGE_KEYS).offset(skip).limit(limit)
+    products = (await session.exec(statement)).all()
     
     return products, count
\ No newline at end of file
@@ -1,43 +1,73 @@
 import uuid
-from typing import Any, List, Tuple
+from typing import Any, List, Optional, Sequence, Tuple
 
-from sqlmodel import Session, select, func
+from pydantic import TypeAdapter
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models import Store, StoreCreate, StoreUpdate
+from app.core.cache import catalog_cache
+from app.crud.bulk import get_by_ids
+from app.crud.counting import CountMode, count_rows, invalidate_counts
+from app.crud.pagination import next_cursor, paginate
+from app.crud.projection import load_only_fields
+from app.models import Store, StoreCreate, StorePublic, StoreUpdate
+
+# Kiểu giá trị lưu trong cache catalog (để serialize khi backend là Redis)
+_ITEM_ADAPTER = TypeAdapter(Optional[StorePublic])
+
+# Khóa sắp xếp ổn định dùng cho phân trang
+PAGE_KEYS = (Store.id,)
 
 # Tạo mới cửa hàng
-def create_store(*, session: Session, store_create: StoreCreate) -> Store:
+async def create_store(*, session: AsyncSession, store_create: StoreCreate) -> Store:
     db_obj = Store.model_validate(store_create)
     session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
+    await session.commit()
+    invalidate_counts(Store)
+    await catalog_cache.invalidate(Store.__tablename__)
+    await session.refresh(db_obj)
     return db_obj
 
 # Cập nhật cửa hàng
-def update_store(*, session: Session, db_store: Store, store_in: StoreUpdate) -> Any:
+async def update_store(*, session: AsyncSession, db_store: Store, store_in: StoreUpdate) -> Any:
     store_data = store_in.model_dump(exclude_unset=True)
     db_store.sqlmodel_update(store_data)
     session.add(db_store)
-    session.commit()
-    session.refresh(db_store)
+    await session.commit()
+    invalidate_counts(Store)
+    await catalog_cache.invalidate(Store.__tablename__)
+    await session.refresh(db_store)
     return db_store
 
 # Lấy store theo id
-def get_store(*, session: Session, id: uuid.UUID) -> Store | None:
-    """Lấy một store theo id"""
-    return session.get(Store, id)
+async def get_store(*, session: AsyncSession, id: uuid.UUID, fields: Optional[Sequence[str]] = None) -> Store | None:
+    """Lấy một store theo id (chỉ nạp các cột của `fields` nếu có)"""
+    return await session.get(Store, id, options=load_only_fields(Store, fields))
+
+# Lấy nhiều store theo id qua cache catalog: chỉ các id chưa có trong cache mới được đọc
+# bằng một truy vấn IN (...); bỏ id trùng, giữ thứ tự id gửi lên, bỏ id không tồn tại
+async def get_stores_by_ids(*, session: AsyncSession, ids: Sequence[uuid.UUID]) -> List[StorePublic]:
+    async def load(keys: List[Any]) -> dict:
+        rows = await get_by_ids(session, Store, [id for _, id in keys])
+        return {("id", row.id): StorePublic.model_validate(row) for row in rows}
+
+    keys = [("id", id) for id in dict.fromkeys(ids)]
+    items = await catalog_cache.get_many_or_load(Store.__tablename__, keys, load, _ITEM_ADAPTER)
+    return [item for item in items if item is not None]
 
-# Lấy danh sách store và tổng số, có phân trang
-def get_stores(*, session: Session, skip: int = 0, limit: int = 100) -> Tuple[List[Store], int]:
+# Lấy danh sách store và tổng số, có phân trang (skip/limit hoặc cursor)
+async def get_stores(*, session: AsyncSession, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, count_mode: CountMode = CountMode.exact, fields: Optional[Sequence[str]] = None) -> Tuple[List[Store], Optional[int], Optional[str]]:
     """Lấy danh sách các stores với phân trang"""
-    count_statement = select(func.count()).select_from(Store)
-    count = session.exec(count_statement).one()
-    statement = select(Store).offset(skip).limit(limit)
-    stores = session.exec(statement).all()
-    return stores, count
+    count = await count_rows(session, Store, mode=count_mode)
+    statement = select(Store).options(*load_only_fields(Store, fields, keys=PAGE_KEYS))
+    statement = paginate(statement, PAGE_KEYS, skip=skip, limit=limit, cursor=cursor)
+    stores = (await session.exec(statement)).all()
+    return stores, count, next_cursor(stores, PAGE_KEYS, limit)
 
 # Xóa store
-def delete_store(*, session: Session, store: Store) -> None:
+async def delete_store(*, session: AsyncSession, store: Store) -> None:
     """Xóa một store"""
-    session.delete(store)
-    session.commit()
\ No newline at end of file
+    await session.delete(store)
+    await session.commit()
+    invalidate_counts(Store)
+    await catalog_cache.invalidate(Store.__tablename__)
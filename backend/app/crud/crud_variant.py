@@ -1,83 +1,162 @@
+import logging
 import uuid
-from typing import Any, List, Tuple, Optional
+from typing import Any, List, Sequence, Tuple, Optional
 
-from sqlmodel import Session, select, func, or_, and_, text
+from sqlalchemy import delete, insert
+from pydantic import TypeAdapter
+from sqlmodel import select, func, or_, and_, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.models import Variant, VariantCreate, VariantUpdate
+from app.core.cache import catalog_cache
+from app.crud.bulk import check_references, existing_ids, get_by_ids, validate_items
+from app.crud.counting import CountMode, count_rows, invalidate_counts
+from app.crud.pagination import next_cursor, paginate
+from app.crud.projection import load_only_fields
+from app.crud.search import order_by_rank, text_search
+from app.models import BulkItemError, OrderDetail, Product, Variant, VariantCreate, VariantPublic, VariantUpdate
 
-def get_variants(*, session: Session, skip: int = 0, limit: int | None = 100, product_id: uuid.UUID = None) -> Tuple[List[Variant], int]:
-    """Lấy danh sách các variants với phân trang"""
-    if product_id:
-        count_statement = select(func.count()).select_from(Variant).where(Variant.product_id == product_id)
-        count = session.exec(count_statement).one()
-        statement = select(Variant).where(Variant.product_id == product_id).offset(skip)
-        if limit is not None:
-            statement = statement.limit(limit)
-    else:
-        count_statement = select(func.count()).select_from(Variant)
-        count = session.exec(count_statement).one()
-        statement = select(Variant).offset(skip)
-        if limit is not None:
-            statement = statement.limit(limit)
-
-    variants = session.exec(statement).all()
-    return variants, count
+# Kiểu giá trị lưu trong cache catalog (để serialize khi backend là Redis)
+_PAGE_ADAPTER = TypeAdapter(Tuple[List[VariantPublic], Optional[int], Optional[str]])
+_ITEM_ADAPTER = TypeAdapter(Optional[VariantPublic])
+
+logger = logging.getLogger(__name__)
+
+# Khóa sắp xếp ổn định dùng cho phân trang
+PAGE_KEYS = (Variant.id,)
+
+async def get_variants(*, session: AsyncSession, skip: int = 0, limit: int | None = 100, product_id: uuid.UUID = None, cursor: Optional[str] = None, count_mode: CountMode = CountMode.exact) -> Tuple[List[VariantPublic], Optional[int], Optional[str]]:
+    """Lấy danh sách các variants qua cache catalog, phân trang (skip/limit hoặc cursor)"""
+    async def load() -> Tuple[List[VariantPublic], Optional[int], Optional[str]]:
+        if product_id:
+            count = await count_rows(session, Variant, Variant.product_id == product_id, mode=count_mode)
+            statement = select(Variant).where(Variant.product_id == product_id)
+        else:
+            count = await count_rows(session, Variant, mode=count_mode)
+            statement = select(Variant)
 
-def get_variant(*, session: Session, id: uuid.UUID) -> Variant:
-    """Lấy một variant theo id"""
-    return session.get(Variant, id)
+        statement = paginate(statement, PAGE_KEYS, skip=skip, limit=limit, cursor=cursor)
+        variants = (await session.exec(statement)).all()
+        data = [VariantPublic.model_validate(var) for var in variants]
+        return data, count, next_cursor(variants, PAGE_KEYS, limit)
 
-def create_variant(*, session: Session, variant_create: VariantCreate) -> Variant:
+    key = ("list", skip, limit, product_id, cursor, count_mode)
+    return await catalog_cache.get_or_load(Variant.__tablename__, key, load, _PAGE_ADAPTER)
+
+async def get_variant(*, session: AsyncSession, id: uuid.UUID) -> Variant:
+    """Lấy một variant theo id (bản ghi ORM, dùng cho sửa/xóa)"""
+    return await session.get(Variant, id)
+
+async def get_variant_public(*, session: AsyncSession, id: uuid.UUID) -> VariantPublic | None:
+    """Lấy một variant theo id qua cache catalog (bản chụp VariantPublic, chỉ để đọc)"""
+    async def load() -> VariantPublic | None:
+        variant = await session.get(Variant, id)
+        return VariantPublic.model_validate(variant) if variant else None
+
+    return await catalog_cache.get_or_load(Variant.__tablename__, ("id", id), load, _ITEM_ADAPTER)
+
+async def create_variant(*, session: AsyncSession, variant_create: VariantCreate) -> Variant:
     """Tạo mới một variant"""
     db_obj = Variant.model_validate(variant_create)
     session.add(db_obj)
-    session.commit()
-    session.refresh(db_obj)
+    await session.commit()
+    invalidate_counts(Variant)
+    await catalog_cache.invalidate(Variant.__tablename__)
+    await session.refresh(db_obj)
     return db_obj
 
-def update_variant(*, session: Session, db_variant: Variant, variant_in: VariantUpdate) -> Variant:
+async def update_variant(*, session: AsyncSession, db_variant: Variant, variant_in: VariantUpdate) -> Variant:
     """Cập nhật thông tin một variant"""
     update_data = variant_in.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(db_variant, field, value)
     session.add(db_variant)
-    session.commit()
-    session.refresh(db_variant)
+    await session.commit()
+    invalidate_counts(Variant)
+    await catalog_cache.invalidate(Variant.__tablename__)
+    await session.refresh(db_variant)
     return db_variant
 
-def delete_variant(*, session: Session, variant: Variant) -> None:
+async def delete_variant(*, session: AsyncSession, variant: Variant) -> None:
     """Xóa một variant"""
-    session.delete(variant)
-    session.commit()
+    await session.delete(variant)
+    await session.commit()
+    invalidate_counts(Variant)
+    await catalog_cache.invalidate(Variant.__tablename__)
+
+# Tạo nhiều variant trong một transaction (INSERT ... RETURNING theo lô)
+async def bulk_create_variants(*, session: AsyncSession, items: Sequence[Any]) -> Tuple[List[Variant], List[BulkItemError]]:
+    valid, errors = validate_items(items, VariantCreate)
+    for index, item in [entry for entry in valid if entry[1].product_id is None]:
+        errors.append(BulkItemError(index=index, detail="product_id: Field required"))
+    valid = [entry for entry in valid if entry[1].product_id is not None]
+    valid = await check_references(session, valid, "product_id", Product, errors)
+
+    variants: List[Variant] = []
+    if valid:
+        rows = [Variant.model_validate(item).model_dump() for _, item in valid]
+        statement = insert(Variant).returning(Variant, sort_by_parameter_order=True)
+        variants = list((await session.scalars(statement, rows)).all())
+        await session.commit()
+        invalidate_counts(Variant)
+        await catalog_cache.invalidate(Variant.__tablename__)
+    errors.sort(key=lambda e: e.index)
+    return variants, errors
+
+# Xóa nhiều variant trong một câu DELETE; bỏ qua id không tồn tại hoặc đang được order_detail tham chiếu
+async def bulk_delete_variants(*, session: AsyncSession, ids: List[uuid.UUID]) -> Tuple[int, List[BulkItemError]]:
+    found = await existing_ids(session, Variant, ids)
+    referenced: set[uuid.UUID] = set()
+    if found:
+        statement = select(OrderDetail.variant_id).where(OrderDetail.variant_id.in_(found)).distinct()
+        referenced = set((await session.exec(statement)).all())
+
+    errors: List[BulkItemError] = []
+    for index, variant_id in enumerate(ids):
+        if variant_id not in found:
+            errors.append(BulkItemError(index=index, detail=f"Variant {variant_id} not found"))
+        elif variant_id in referenced:
+            errors.append(BulkItemError(index=index, detail=f"Variant {variant_id} is referenced by order details"))
+
+    deletable = found - referenced
+    if deletable:
+        await session.execute(delete(Variant).where(Variant.id.in_(deletable)))
+        await session.commit()
+        invalidate_counts(Variant)
+        await catalog_cache.invalidate(Variant.__tablename__)
+    return len(deletable), errors
 
 # Lấy variant theo id
-def get_variant_by_id(*, session: Session, id: uuid.UUID) -> Variant | None:
-    return session.get(Variant, id)
+async def get_variant_by_id(*, session: AsyncSession, id: uuid.UUID) -> Variant | None:
+    return await session.get(Variant, id)
 
 # Lấy danh sách variant, có phân trang
-def get_list_variants(*, session: Session, skip: int = 0, limit: int = 100) -> list[Variant]:
+async def get_list_variants(*, session: AsyncSession, skip: int = 0, limit: int = 100) -> list[Variant]:
     statement = select(Variant).offset(skip).limit(limit)
-    return session.exec(statement).all()
+    return (await session.exec(statement)).all()
 
 # Tìm kiếm variants
-def search_variants(
+async def search_variants(
     *, 
-    session: Session, 
+    session: AsyncSession, 
     query: str, 
     skip: int = 0, 
     limit: int = 100,
     product_id: Optional[uuid.UUID] = None,
     min_price: Optional[float] = None,
-    max_price: Optional[float] = None
-) -> Tuple[List[Variant], int]:
+    max_price: Optional[float] = None,
+    count_mode: CountMode = CountMode.exact,
+    fields: Optional[Sequence[str]] = None
+) -> Tuple[List[Variant], Optional[int]]:
     """
     Tìm kiếm variant theo beverage_option và các tiêu chí khác
     """
     search_conditions = []
+    rank = None
     
-    # Tìm kiếm theo beverage_option
+    # Tìm kiếm theo beverage_option (pg_trgm nếu có, ngược lại ILIKE)
     if query:
-        search_conditions.append(Variant.beverage_option.ilike(f"%{query}%"))
+        text_condition, rank = await text_search(session, [Variant.beverage_option], query)
+        search_conditions.append(text_condition)
     
     # Lọc theo product_id
     if product_id:
@@ -93,32 +172,24 @@ def search_variants(
     where_clause = and_(*search_conditions) if search_conditions else text("1=1")
     
     # Đếm tổng số kết quả
-    count_statement = select(func.count()).select_from(Variant).where(where_clause)
-    count = session.exec(count_statement).one()
+    count = await count_rows(session, Variant, where_clause, mode=count_mode)
     
     # Lấy danh sách variants
-    statement = select(Variant).where(where_clause).offset(skip).limit(limit)
-    variants = session.exec(statement).all()
+    statement = select(Variant).where(where_clause).options(*load_only_fields(Variant, fields))
+    statement = order_by_rank(statement, rank, *PAGE_KEYS).offset(skip).limit(limit)
+    variants = (await session.exec(statement)).all()
     
     return variants, count
 
-# Lấy danh sách variants theo danh sách id
-def get_variants_by_ids(*, session: Session, ids: List[uuid.UUID]) -> List[Variant]:
-    if not ids:
-        print("⚠️ No IDs provided to get_variants_by_ids")
-        return []
-    
-    print(f"🔍 CRUD: Searching for {len(ids)} variant IDs:")
-    for i, variant_id in enumerate(ids):
-        print(f"  {i+1}. {variant_id} (type: {type(variant_id)})")
-    
-    statement = select(Variant).where(Variant.id.in_(ids))
-    print(f"📝 SQL Query: {statement}")
-    
-    results = session.exec(statement).all()
-    print(f"📋 CRUD: Found {len(results)} variants in database")
-    
-    for i, variant in enumerate(results):
-        print(f"  {i+1}. ID: {variant.id}, Name: {variant.beverage_option}")
-    
-    return results
+# Lấy nhiều variant theo id qua cache catalog (dùng chung khóa với get_variant_public):
+# chỉ các id chưa có trong cache mới được đọc bằng một truy vấn IN (...); bỏ id trùng,
+# giữ thứ tự id gửi lên, bỏ id không tồn tại
+async def get_variants_by_ids(*, session: AsyncSession, ids: Sequence[uuid.UUID]) -> List[VariantPublic]:
+    async def load(keys: List[Any]) -> dict:
+        rows = await get_by_ids(session, Variant, [id for _, id in keys])
+        logger.debug("variant batch cache miss", extra={"missing": len(keys), "loaded": len(rows)})
+        return {("id", row.id): VariantPublic.model_validate(row) for row in rows}
+
+    keys = [("id", id) for id in dict.fromkeys(ids)]
+    items = await catalog_cache.get_many_or_load(Variant.__tablename__, keys, load, _ITEM_ADAPTER)
+    return [item for item in items if item is not None]
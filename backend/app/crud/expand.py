@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import joinedload, selectinload
+from sqlmodel import SQLModel
+
+from app.models import (
+    Category,
+    CategoryPublic,
+    Customer,
+    CustomerPublic,
+    Order,
+    OrderDetail,
+    OrderDetailPublic,
+    OrderPublic,
+    Product,
+    ProductPublic,
+    Store,
+    StorePublic,
+    Variant,
+    VariantPublic,
+)
+
+# Schema *Public dùng khi trả về bản ghi liên quan được expand
+PUBLIC_SCHEMAS: Dict[type[SQLModel], type[BaseModel]] = {
+    Category: CategoryPublic,
+    Product: ProductPublic,
+    Variant: VariantPublic,
+    Customer: CustomerPublic,
+    Store: StorePublic,
+    Order: OrderPublic,
+    OrderDetail: OrderDetailPublic,
+}
+
+# Độ sâu tối đa của một đường expand (vd: order_details.variant.product là 3)
+MAX_EXPAND_DEPTH = 3
+
+# Cây expand: các nút (tên quan hệ, model đích, nút con), sắp theo tên để dùng làm khóa cache
+ExpandTree = Tuple[Tuple[str, type[SQLModel], "ExpandTree"], ...]
+
+
+class InvalidExpandError(ValueError):
+    """Tham số `expand` chứa quan hệ không tồn tại hoặc quá sâu"""
+
+
+def _relationships(model: type[SQLModel]) -> Dict[str, Any]:
+    return {rel.key: rel for rel in sa_inspect(model).relationships}
+
+
+def parse_expand(expand: Optional[str], model: type[SQLModel]) -> ExpandTree:
+    """
+    Tách `expand=order_details.variant.product,store` thành cây quan hệ của `model`.
+    Rỗng nghĩa là không expand; quan hệ lạ hoặc sâu quá MAX_EXPAND_DEPTH sinh InvalidExpandError.
+    """
+    if not expand:
+        return ()
+    nested: Dict[str, Any] = {}
+    for path in (item.strip() for item in expand.split(",")):
+        if not path:
+            continue
+        names = path.split(".")
+        if len(names) > MAX_EXPAND_DEPTH:
+            raise InvalidExpandError(f"Expand path too deep (max {MAX_EXPAND_DEPTH}): {path}")
+        current, level = model, nested
+        for name in names:
+            relationships = _relationships(current)
+            if name not in relationships:
+                allowed = ", ".join(sorted(relationships)) or "none"
+                raise InvalidExpandError(f"Unknown relationship '{name}' on {current.__name__}. Allowed: {allowed}")
+            current = relationships[name].mapper.class_
+            level = level.setdefault(name, {})
+    return _tree(model, nested)
+
+
+def _tree(model: type[SQLModel], nested: Dict[str, Any]) -> ExpandTree:
+    relationships = _relationships(model)
+    return tuple(
+        (name, relationships[name].mapper.class_, _tree(relationships[name].mapper.class_, nested[name]))
+        for name in sorted(nested)
+    )
+
+
+def expand_options(model: type[SQLModel], tree: ExpandTree, parent: Any = None) -> List[Any]:
+    """
+    Loader options cho cây expand: quan hệ nhiều-một dùng joinedload (cùng câu SELECT),
+    quan hệ một-nhiều dùng selectinload (một truy vấn IN (...) cho cả trang)
+    """
+    options: List[Any] = []
+    relationships = _relationships(model)
+    for name, target, children in tree:
+        attribute = getattr(model, name)
+        strategy = "selectinload" if relationships[name].uselist else "joinedload"
+        if parent is None:
+            loader = (selectinload if strategy == "selectinload" else joinedload)(attribute)
+        else:
+            loader = getattr(parent, strategy)(attribute)
+        options.extend(expand_options(target, children, loader) if children else [loader])
+    return options
+
@@ -0,0 +1,322 @@
+# File: backend/app/crud/importer.py
+# Nhập dữ liệu lớn (catalog, lịch sử đơn hàng) từ CSV/NDJSON dạng stream: đọc theo
+# lô, validate bằng các schema *Create, nạp vào bảng staging bằng COPY rồi upsert
+import codecs
+import csv
+import enum
+import time
+import uuid
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.cache import catalog_cache
+from app.core.timestamps import utc_naive
+from app.crud.bulk import check_references, existing_ids, validate_items
+from app.crud.counting import invalidate_counts
+from app.crud.rollup import affected_days, rebuild_sales_rollups, variant_prices
+from app.models import (
+    BulkItemError,
+    Category,
+    CategoryCreate,
+    Customer,
+    ImportReport,
+    ImportRowError,
+    Order,
+    OrderCreate,
+    OrderDetail,
+    OrderDetailCreate,
+    Product,
+    ProductCreate,
+    Store,
+    StoreCreate,
+    Variant,
+    VariantCreate,
+)
+
+
+class ImportFormat(str, enum.Enum):
+    """Định dạng file nhập"""
+
+    csv = "csv"  # Dòng đầu là header (tên trường của schema *Create, thêm cột id tùy chọn)
+    ndjson = "ndjson"  # Mỗi dòng một object JSON
+
+
+class ImportTable(str, enum.Enum):
+    """Các bảng nhận import (giá trị là tên bảng)"""
+
+    categories = Category.__tablename__
+    product = Product.__tablename__
+    variant = Variant.__tablename__
+    store = Store.__tablename__
+    orders = Order.__tablename__
+    order_detail = OrderDetail.__tablename__
+
+
+class ImportTarget:
+    """
+    Bảng đích của import: model bảng, schema validate, các khóa ngoại cần kiểm tra
+    và các trường schema cho phép rỗng nhưng bảng bắt buộc (vd: variant.product_id)
+    """
+
+    def __init__(
+        self,
+        model: type[SQLModel],
+        schema: type[SQLModel],
+        references: Sequence[Tuple[str, type[SQLModel]]] = (),
+        required: Sequence[str] = (),
+    ) -> None:
+        self.model = model
+        self.schema = schema
+        self.references = tuple(references)
+        self.required = tuple(required)
+        # Tên thuộc tính -> tên cột trong DB (vd: beverage_option -> "Beverage_Option")
+        self.columns = {attr.key: attr.columns[0].name for attr in sa_inspect(model).column_attrs}
+
+
+IMPORT_TARGETS: Dict[ImportTable, ImportTarget] = {
+    ImportTable.categories: ImportTarget(Category, CategoryCreate),
+    ImportTable.product: ImportTarget(Product, ProductCreate, [("categories_id", Category)]),
+    ImportTable.variant: ImportTarget(Variant, VariantCreate, [("product_id", Product)], required=["product_id"]),
+    ImportTable.store: ImportTarget(Store, StoreCreate),
+    ImportTable.orders: ImportTarget(Order, OrderCreate, [("customer_id", Customer), ("store_id", Store)]),
+    ImportTable.order_detail: ImportTarget(OrderDetail, OrderDetailCreate, [("order_id", Order), ("variant_id", Variant)]),
+}
+
+
+# Giải mã stream bytes thành từng dòng (giữ "\n"), không cần đọc hết file vào bộ nhớ
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def iter_records(
+    chunks: AsyncIterable[bytes],
+    format: ImportFormat,
+) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Đọc file thành các bộ (số dòng, bản ghi, lỗi): bản ghi là dict tên trường -> giá trị,
+    hoặc None kèm thông báo lỗi nếu dòng không parse được
+    """
+    number = 0
+    if format == ImportFormat.ndjson:
+        async for line in iter_lines(chunks):
+            number += 1
+            if not line.strip():
+                continue
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                yield number, None, f"invalid JSON: {e}"
+                continue
+            if isinstance(record, dict):
+                yield number, record, None
+            else:
+                yield number, None, "expected a JSON object"
+        return
+
+    header: Optional[List[str]] = None
+    buffer: List[str] = []
+    quotes = start = 0
+    async for line in iter_lines(chunks):
+        number += 1
+        if not buffer:
+            start = number
+        buffer.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # Ô trong dấu nháy chứa xuống dòng: đọc tiếp dòng sau
+        values = next(csv.reader(buffer), [])
+        buffer, quotes = [], 0
+        if not any(value.strip() for value in values):
+            continue
+        if header is None:
+            header = [value.strip() for value in values]
+        elif len(values) != len(header):
+            yield start, None, f"expected {len(header)} columns, got {len(values)}"
+        else:
+            # Ô rỗng coi như không có giá trị: trường dùng mặc định của schema
+            yield start, {name: value for name, value in zip(header, values) if value != ""}, None
+    if buffer:
+        yield start, None, "unterminated quoted field"
+
+
+class _Report:
+    """Bộ đếm trong lúc import; lỗi chỉ giữ tối đa `max_errors` dòng đầu tiên"""
+
+    def __init__(self, max_errors: int) -> None:
+        self.max_errors = max_errors
+        self.received = self.inserted = self.updated = self.rejected = 0
+        self.errors: List[ImportRowError] = []
+
+    def reject(self, line: int, detail: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(ImportRowError(line=line, detail=detail))
+
+
+# Id tùy chọn trong file: có thì upsert theo id (chạy lại file không nhân đôi dữ liệu), không thì sinh mới
+def _record_id(record: dict) -> uuid.UUID:
+    value = record.pop("id", None)
+    if value is None:
+        return uuid.uuid4()
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+# Nạp lô vào bảng staging tạm bằng COPY rồi gộp vào bảng chính bằng INSERT ... ON CONFLICT
+async def _copy_merge(connection: AsyncConnection, table: Any, rows: List[dict]) -> None:
+    quote = connection.dialect.identifier_preparer.quote
+    names = [column.name for column in table.columns]
+    columns = ", ".join(quote(name) for name in names)
+    staging = quote(f"import_{table.name}")
+    # Bảng tạm sống theo kết nối, tự xóa dữ liệu khi transaction kết thúc
+    await connection.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {quote(table.name)} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    )
+    raw = await connection.get_raw_connection()
+    async with raw.driver_connection.cursor() as cursor:
+        async with cursor.copy(f"COPY {staging} ({columns}) FROM STDIN") as copy:
+            for row in rows:
+                await copy.write_row([row[name] for name in names])
+    updates = ", ".join(f"{quote(name)} = EXCLUDED.{quote(name)}" for name in names if name != "id")
+    await connection.exec_driver_sql(
+        f"INSERT INTO {quote(table.name)} ({columns}) SELECT {columns} FROM {staging} "
+        f"ON CONFLICT (id) DO UPDATE SET {updates}"
+    )
+
+
+# Dialect không có COPY (vd: SQLite khi chạy thử): INSERT ... ON CONFLICT dạng executemany
+async def _insert_merge(connection: AsyncConnection, table: Any, rows: List[dict]) -> None:
+    statement = sqlite_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[table.c.id],
+        set_={column.name: statement.excluded[column.name] for column in table.columns if column.name != "id"},
+    )
+    await connection.execute(statement, rows)
+
+
+async def _load_batch(session: AsyncSession, target: ImportTarget, batch: List[Tuple[int, dict]], report: _Report) -> None:
+    lines: List[int] = []
+    records: List[dict] = []
+    ids: List[uuid.UUID] = []
+    for line, record in batch:
+        try:
+            ids.append(_record_id(record))
+        except ValueError:
+            report.reject(line, "id: Input should be a valid UUID")
+            continue
+        lines.append(line)
+        records.append(record)
+
+    valid, errors = validate_items(records, target.schema)
+    for field in target.required:
+        for index, _ in [entry for entry in valid if getattr(entry[1], field) is None]:
+            errors.append(BulkItemError(index=index, detail=f"{field}: Field required"))
+        valid = [entry for entry in valid if getattr(entry[1], field) is not None]
+    for field, model in target.references:
+        valid = await check_references(session, valid, field, model, errors)
+    for error in sorted(errors, key=lambda e: e.index):
+        report.reject(lines[error.index], error.detail)
+    if not valid:
+        return
+
+    # Cùng id xuất hiện nhiều lần trong lô: giữ dòng sau cùng (ON CONFLICT không cập nhật một dòng hai lần)
+    rows: Dict[uuid.UUID, dict] = {}
+    for index, item in valid:
+        values = item.model_dump()
+        values["id"] = ids[index]
+        rows[ids[index]] = {target.columns[key]: value for key, value in values.items() if key in target.columns}
+    if target.model is Order:
+        # COPY ghi thẳng giá trị, không qua kiểu cột: tự quy order_date về giờ UTC không múi giờ
+        for row in rows.values():
+            row["order_date"] = utc_naive(row.get("order_date"))
+    if target.model is OrderDetail:
+        # Như create/update: dòng thiếu đơn giá lấy giá hiện tại của variant
+        prices = await variant_prices(session, {row["variant_id"] for row in rows.values() if row.get("unit_price") is None})
+        for row in rows.values():
+            if row.get("unit_price") is None:
+                row["unit_price"] = prices.get(row["variant_id"])
+    existing = await existing_ids(session, target.model, rows)
+    days = await affected_days(session, target.model, rows)
+
+    table = target.model.__table__
+    connection = await session.connection()
+    try:
+        if connection.dialect.name == "postgresql":
+            await _copy_merge(connection, table, list(rows.values()))
+        else:
+            await _insert_merge(connection, table, list(rows.values()))
+        # Ghi đè hàng loạt không cộng dồn được: tính lại bảng tổng hợp của các ngày bị ảnh hưởng
+        await rebuild_sales_rollups(session=session, days=days)
+        await session.commit()
+    except IntegrityError as e:
+        # Bản ghi cha bị xóa giữa lúc kiểm tra và lúc ghi: loại cả lô, các lô khác vẫn được nhập
+        await session.rollback()
+        detail = str(e.orig).splitlines()[0]
+        for index, _ in valid:
+            report.reject(lines[index], detail)
+        return
+    report.inserted += len(rows) - len(existing)
+    report.updated += len(existing)
+
+
+async def import_records(
+    *,
+    session: AsyncSession,
+    table: ImportTable,
+    chunks: AsyncIterable[bytes],
+    format: ImportFormat,
+    batch_size: int,
+    max_errors: int,
+) -> ImportReport:
+    """
+    Nhập file CSV/NDJSON vào `table` theo từng lô `batch_size` dòng, mỗi lô một
+    transaction. Dòng lỗi (parse, validate, khóa ngoại) bị loại và ghi vào báo cáo,
+    không làm hỏng các dòng khác.
+    """
+    target = IMPORT_TARGETS[table]
+    report = _Report(max_errors)
+    started = time.perf_counter()
+    batch: List[Tuple[int, dict]] = []
+    try:
+        async for line, record, error in iter_records(chunks, format):
+            report.received += 1
+            if record is None:
+                report.reject(line, error or "invalid row")
+                continue
+            batch.append((line, record))
+            if len(batch) >= batch_size:
+                await _load_batch(session, target, batch, report)
+                batch = []
+        if batch:
+            await _load_batch(session, target, batch, report)
+    finally:
+        if report.inserted or report.updated:
+            invalidate_counts(target.model)
+            await catalog_cache.invalidate(target.model.__tablename__)
+    seconds = time.perf_counter() - started
+    return ImportReport(
+        table=table.value,
+        format=format.value,
+        received=report.received,
+        inserted=report.inserted,
+        updated=report.updated,
+        rejected=report.rejected,
+        errors=sorted(report.errors, key=lambda e: e.line),
+        seconds=round(seconds, 3),
+        rows_per_second=round(report.received / seconds, 1) if seconds > 0 else 0.0,
+    )
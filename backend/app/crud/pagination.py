@@ -0,0 +1,105 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+from sqlalchemy import DateTime, Uuid, and_, or_, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+
+class InvalidCursorError(ValueError):
+    """Cursor phân trang không hợp lệ (bị sửa hoặc không khớp với endpoint)"""
+
+
+# Chuyển giá trị khóa sang dạng JSON được
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# Chuyển giá trị trong cursor về đúng kiểu Python của cột
+def _load_value(key: InstrumentedAttribute, value: Any) -> Any:
+    if value is None:
+        return None
+    column_type = key.type
+    if isinstance(column_type, Uuid):
+        return uuid.UUID(value)
+    if isinstance(column_type, DateTime) or isinstance(getattr(column_type, "impl", None), DateTime):
+        return datetime.fromisoformat(value)
+    return column_type.python_type(value)
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Mã hóa bộ giá trị khóa của bản ghi cuối trang thành token mờ (opaque)"""
+    raw = json.dumps([_dump_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: Sequence[InstrumentedAttribute]) -> List[Any]:
+    """Giải mã token cursor thành bộ giá trị khóa tương ứng với `keys`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise InvalidCursorError("Cursor does not match this endpoint")
+        return [_load_value(key, value) for key, value in zip(keys, values)]
+    except InvalidCursorError:
+        raise
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+
+def _is_nullable(key: InstrumentedAttribute) -> bool:
+    return bool(key.property.columns[0].nullable)
+
+
+def _after(keys: Sequence[InstrumentedAttribute], values: Sequence[Any]) -> Any:
+    """
+    Điều kiện "đứng sau bản ghi cursor" theo thứ tự (keys ASC NULLS LAST).
+    Chỉ khóa đầu tiên được phép NULL; khóa cuối cùng phải là khóa duy nhất (id).
+    """
+    first, rest = keys[0], keys[1:]
+    if not rest:
+        return first > values[0]
+    if values[0] is None:
+        # Đang ở phần đuôi NULL: chỉ so sánh các khóa còn lại
+        tail = rest[0] > values[1] if len(rest) == 1 else tuple_(*rest) > tuple_(*values[1:])
+        return and_(first.is_(None), tail)
+    condition = tuple_(*keys) > tuple_(*values)
+    if _is_nullable(first):
+        condition = or_(condition, first.is_(None))
+    return condition
+
+
+def paginate(
+    statement: Any,
+    keys: Sequence[InstrumentedAttribute],
+    *,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Any:
+    """
+    Sắp xếp câu truy vấn theo khóa ổn định và áp dụng phân trang.
+    Có cursor thì dùng keyset (WHERE khóa > cursor), ngược lại dùng offset(skip).
+    """
+    statement = statement.order_by(*(key.asc().nulls_last() for key in keys))
+    if cursor:
+        statement = statement.where(_after(keys, decode_cursor(cursor, keys)))
+    elif skip:
+        statement = statement.offset(skip)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def next_cursor(rows: Sequence[Any], keys: Sequence[InstrumentedAttribute], limit: Optional[int]) -> Optional[str]:
+    """Token cho trang kế tiếp, None nếu đã là trang cuối"""
+    if limit is None or len(rows) < limit or not rows:
+        return None
+    last = rows[-1]
+    return encode_cursor([getattr(last, key.key) for key in keys])
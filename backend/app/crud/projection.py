@@ -0,0 +1,45 @@
+from typing import Any, List, Mapping, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from sqlalchemy.orm import InstrumentedAttribute, load_only
+from sqlmodel import SQLModel
+
+
+class InvalidFieldsError(ValueError):
+    """Tham số `fields` chứa trường không có trong schema *Public"""
+
+
+def parse_fields(fields: Optional[str], schema: type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """
+    Tách tham số `fields=a,b,c` thành tuple tên trường (giữ thứ tự, bỏ trùng).
+    None/rỗng nghĩa là trả mọi trường; trường lạ sinh InvalidFieldsError.
+    """
+    if fields is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not names:
+        return None
+    allowed = {*schema.model_fields, *schema.model_computed_fields}
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise InvalidFieldsError(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(sorted(allowed))}")
+    return names
+
+
+def load_only_fields(
+    model: type[SQLModel],
+    fields: Optional[Sequence[str]],
+    *,
+    keys: Sequence[InstrumentedAttribute] = (),
+    sources: Optional[Mapping[str, Sequence[InstrumentedAttribute]]] = None,
+) -> List[Any]:
+    """
+    Options (load_only) chỉ SELECT các cột cần cho `fields`; rỗng nếu lấy mọi cột.
+    `keys` là các cột luôn cần (khóa phân trang), `sources` ánh xạ computed field
+    sang các cột nguồn của nó.
+    """
+    if not fields:
+        return []
+    sources = sources or {}
+    columns = [column for name in fields for column in sources.get(name, (getattr(model, name),))]
+    return [load_only(*dict.fromkeys([*columns, *keys]))]
@@ -0,0 +1,227 @@
+# File: backend/app/crud/rollup.py
+# Bảng tổng hợp bán hàng theo ngày (sales_daily: ngày x cửa hàng x variant,
+# sales_store_daily: ngày x cửa hàng) cho các truy vấn analytics.
+# Các thao tác ghi đơn hàng/chi tiết cộng dồn thay đổi vào bảng tổng hợp trong cùng
+# transaction; rebuild_sales_rollups tính lại từ dữ liệu gốc khi backfill.
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Any, Collection, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, delete, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import SQLModel, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.timestamps import utc_naive
+from app.models import Order, OrderDetail, SalesDaily, SalesStoreDaily, Variant
+
+# Doanh thu một dòng chi tiết: chỉ dùng đơn giá đã chụp lúc ghi (mọi đường ghi điền
+# unit_price từ giá variant, migration 0007 điền cho dữ liệu cũ), không dùng giá hiện tại
+# của variant để delta cộng/trừ và rebuild_sales_rollups luôn cho cùng kết quả
+LINE_REVENUE = OrderDetail.quantity * func.coalesce(OrderDetail.unit_price, 0.0)
+
+# Ngày đặt hàng (cắt bỏ giờ) để nhóm theo ngày
+ORDER_DAY = func.date(Order.order_date, type_=Date)
+
+# (order_id, variant_id, quantity, unit_price) của một dòng chi tiết
+Line = Tuple[uuid.UUID, uuid.UUID, int, Optional[float]]
+
+
+# Ngày của thời điểm đặt hàng, khớp với date(order_date) trong SQL: cột lưu giờ UTC
+# không múi giờ (UTCNaiveDateTime), giờ có múi giờ được quy đổi giống lúc ghi
+def order_day(order_date: Optional[datetime]) -> Optional[date]:
+    if order_date is None:
+        return None
+    return utc_naive(order_date).date()
+
+
+def line_of(detail: Any) -> Line:
+    return detail.order_id, detail.variant_id, detail.quantity, detail.unit_price
+
+
+# Giá hiện tại của các variant bằng một truy vấn IN (...)
+async def variant_prices(session: AsyncSession, ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, Optional[float]]:
+    wanted = set(ids)
+    if not wanted:
+        return {}
+    statement = select(Variant.id, Variant.price).where(Variant.id.in_(wanted))
+    return {variant_id: price for variant_id, price in (await session.exec(statement)).all()}
+
+
+class SalesRollupDelta:
+    """
+    Gom thay đổi của một thao tác ghi (sign=+1 khi thêm, -1 khi bỏ) theo khóa tổng hợp,
+    rồi ghi bằng upsert cộng dồn trong transaction hiện tại (`apply`, trước commit).
+    Đơn không có order_date không được tính, giống rebuild_sales_rollups.
+    """
+
+    def __init__(self) -> None:
+        self.sales: Dict[Tuple[date, uuid.UUID, uuid.UUID], List[Any]] = defaultdict(lambda: [0, 0.0, 0])
+        self.orders: Dict[Tuple[date, uuid.UUID], int] = defaultdict(int)
+
+    def add_order(self, order_date: Optional[datetime], store_id: uuid.UUID, sign: int = 1) -> None:
+        day = order_day(order_date)
+        if day is not None:
+            self.orders[(day, store_id)] += sign
+
+    def add_line(
+        self,
+        order_date: Optional[datetime],
+        store_id: uuid.UUID,
+        variant_id: uuid.UUID,
+        quantity: int,
+        price: Optional[float],
+        sign: int = 1,
+    ) -> None:
+        day = order_day(order_date)
+        if day is None:
+            return
+        totals = self.sales[(day, store_id, variant_id)]
+        totals[0] += sign * quantity
+        totals[1] += sign * quantity * (price or 0.0)
+        totals[2] += sign
+
+    async def add_lines(self, session: AsyncSession, lines: Iterable[Line], sign: int = 1) -> None:
+        """Thêm các dòng chi tiết, đọc ngày/cửa hàng của đơn từ database"""
+        lines = list(lines)
+        if not lines:
+            return
+        statement = select(Order.id, Order.order_date, Order.store_id).where(Order.id.in_({line[0] for line in lines}))
+        orders = {order_id: (order_date, store_id) for order_id, order_date, store_id in (await session.exec(statement)).all()}
+        for order_id, variant_id, quantity, unit_price in lines:
+            if order_id not in orders:
+                continue
+            order_date, store_id = orders[order_id]
+            self.add_line(order_date, store_id, variant_id, quantity, unit_price, sign)
+
+    async def add_order_lines(
+        self,
+        session: AsyncSession,
+        order_id: uuid.UUID,
+        order_date: Optional[datetime],
+        store_id: uuid.UUID,
+        sign: int = 1,
+    ) -> None:
+        """Thêm mọi dòng chi tiết hiện có của một đơn dưới ngày/cửa hàng cho trước (khi đơn đổi ngày/cửa hàng)"""
+        statement = select(OrderDetail.variant_id, OrderDetail.quantity, OrderDetail.unit_price).where(
+            OrderDetail.order_id == order_id
+        )
+        for variant_id, quantity, price in (await session.exec(statement)).all():
+            self.add_line(order_date, store_id, variant_id, quantity, price, sign)
+
+    async def apply(self, session: AsyncSession) -> None:
+        connection = await session.connection()
+        # Sắp khóa theo thứ tự cố định để các transaction đồng thời không deadlock
+        sales = [
+            {"day": day, "store_id": store_id, "variant_id": variant_id, "quantity": q, "revenue": r, "lines": n}
+            for (day, store_id, variant_id), (q, r, n) in sorted(self.sales.items())
+            if q or r or n
+        ]
+        orders = [
+            {"day": day, "store_id": store_id, "orders": n}
+            for (day, store_id), n in sorted(self.orders.items())
+            if n
+        ]
+        if sales:
+            await _upsert_add(session, connection.dialect.name, SalesDaily, sales, ("quantity", "revenue", "lines"))
+        if orders:
+            await _upsert_add(session, connection.dialect.name, SalesStoreDaily, orders, ("orders",))
+        # Bỏ các dòng tổng hợp đã về 0 sau khi xóa/chuyển dữ liệu
+        removed_days = {row["day"] for row in sales if row["lines"] < 0}
+        if removed_days:
+            await session.exec(delete(SalesDaily).where(SalesDaily.day.in_(removed_days), SalesDaily.lines <= 0))
+        removed_days = {row["day"] for row in orders if row["orders"] < 0}
+        if removed_days:
+            await session.exec(delete(SalesStoreDaily).where(SalesStoreDaily.day.in_(removed_days), SalesStoreDaily.orders <= 0))
+        self.sales.clear()
+        self.orders.clear()
+
+
+# INSERT ... ON CONFLICT (khóa chính) DO UPDATE SET cột = cột + giá trị mới
+async def _upsert_add(
+    session: AsyncSession,
+    dialect: str,
+    model: type[SQLModel],
+    rows: List[dict],
+    columns: Tuple[str, ...],
+) -> None:
+    table = model.__table__
+    statement = (pg_insert if dialect == "postgresql" else sqlite_insert)(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={name: table.c[name] + statement.excluded[name] for name in columns},
+    )
+    await session.exec(statement, params=rows)
+
+
+async def rebuild_sales_rollups(
+    *,
+    session: AsyncSession,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    days: Optional[Collection[date]] = None,
+) -> None:
+    """
+    Tính lại bảng tổng hợp từ orders x order_detail cho khoảng ngày [date_from, date_to)
+    hoặc tập ngày `days` (mặc định: toàn bộ). Không commit: chạy trong transaction của người gọi.
+    """
+    rollup_daily: List[Any] = []
+    rollup_store: List[Any] = []
+    source: List[Any] = [Order.order_date.is_not(None)]
+    if days is not None:
+        if not days:
+            return
+        rollup_daily.append(SalesDaily.day.in_(days))
+        rollup_store.append(SalesStoreDaily.day.in_(days))
+        source.append(ORDER_DAY.in_(days))
+    if date_from is not None:
+        rollup_daily.append(SalesDaily.day >= date_from)
+        rollup_store.append(SalesStoreDaily.day >= date_from)
+        source.append(Order.order_date >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        rollup_daily.append(SalesDaily.day < date_to)
+        rollup_store.append(SalesStoreDaily.day < date_to)
+        source.append(Order.order_date < datetime.combine(date_to, time.min))
+
+    await session.exec(delete(SalesDaily).where(*rollup_daily))
+    await session.exec(delete(SalesStoreDaily).where(*rollup_store))
+
+    sales = (
+        select(
+            ORDER_DAY,
+            Order.store_id,
+            OrderDetail.variant_id,
+            func.sum(OrderDetail.quantity),
+            func.coalesce(func.sum(LINE_REVENUE), 0.0),
+            func.count(),
+        )
+        .select_from(OrderDetail)
+        .join(Order, Order.id == OrderDetail.order_id)
+        .where(*source)
+        .group_by(ORDER_DAY, Order.store_id, OrderDetail.variant_id)
+    )
+    await session.exec(
+        insert(SalesDaily).from_select(["day", "store_id", "variant_id", "quantity", "revenue", "lines"], sales)
+    )
+    orders = select(ORDER_DAY, Order.store_id, func.count()).where(*source).group_by(ORDER_DAY, Order.store_id)
+    await session.exec(insert(SalesStoreDaily).from_select(["day", "store_id", "orders"], orders))
+
+
+async def affected_days(session: AsyncSession, model: type[SQLModel], rows: Dict[uuid.UUID, dict]) -> set[date]:
+    """
+    Các ngày tổng hợp bị ảnh hưởng khi ghi đè/thêm `rows` (id -> giá trị cột) vào
+    orders hoặc order_detail: gồm ngày của dữ liệu cũ lẫn dữ liệu mới
+    """
+    if model is Order:
+        statement = select(Order.order_date).where(Order.id.in_(rows))
+        dates = [*(await session.exec(statement)).all(), *(row.get("order_date") for row in rows.values())]
+        return {day for day in map(order_day, dates) if day is not None}
+    if model is OrderDetail:
+        order_ids = {row["order_id"] for row in rows.values()}
+        statement = select(OrderDetail.order_id).where(OrderDetail.id.in_(rows))
+        order_ids.update((await session.exec(statement)).all())
+        statement = select(Order.order_date).where(Order.id.in_(order_ids))
+        return {day for day in map(order_day, (await session.exec(statement)).all()) if day is not None}
+    return set()
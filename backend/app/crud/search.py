@@ -0,0 +1,54 @@
+from typing import Any, Optional, Sequence, Tuple
+
+from sqlalchemy import func, or_, text
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Kết quả kiểm tra extension pg_trgm, cache theo process (None = chưa kiểm tra)
+_trigram_available: Optional[bool] = None
+
+
+async def trigram_available(session: AsyncSession) -> bool:
+    """PostgreSQL có cài extension pg_trgm hay không (kiểm tra một lần mỗi process)"""
+    global _trigram_available
+    if _trigram_available is None:
+        connection = await session.connection()
+        if connection.dialect.name != "postgresql":
+            _trigram_available = False
+        else:
+            result = await connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))
+            _trigram_available = result.scalar() is not None
+    return _trigram_available
+
+
+# Escape ký tự đại diện của LIKE trong từ khóa người dùng nhập
+def _like_pattern(query: str) -> str:
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+async def text_search(
+    session: AsyncSession,
+    columns: Sequence[InstrumentedAttribute],
+    query: str,
+) -> Tuple[Any, Optional[Any]]:
+    """
+    Điều kiện tìm kiếm chuỗi con (ILIKE) trên nhiều cột và biểu thức xếp hạng.
+
+    Khi có pg_trgm, ILIKE '%q%' dùng được GIN index gin_trgm_ops (không còn seq scan)
+    và kết quả được xếp hạng theo word_similarity. Không có extension thì chỉ dùng
+    ILIKE, hạng trả về None.
+    """
+    pattern = _like_pattern(query)
+    where_clause = or_(*(column.ilike(pattern, escape="\\") for column in columns))
+    if not await trigram_available(session):
+        return where_clause, None
+    rank = func.greatest(*(func.coalesce(func.word_similarity(query, column), 0) for column in columns))
+    return where_clause, rank
+
+
+def order_by_rank(statement: Any, rank: Optional[Any], *tiebreakers: Any) -> Any:
+    """Sắp xếp theo độ liên quan (nếu có) rồi theo khóa ổn định"""
+    if rank is not None:
+        statement = statement.order_by(rank.desc())
+    return statement.order_by(*tiebreakers)
@@ -0,0 +1,18 @@
+from typing import Any, AsyncIterator, Sequence
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+async def stream_batches(session: AsyncSession, statement: Any, batch_size: int) -> AsyncIterator[Sequence[Any]]:
+    """
+    Đọc kết quả theo lô `batch_size` dòng qua server-side cursor (stream_results + yield_per),
+    không nạp cả bảng vào bộ nhớ. Các bản ghi của lô trước được gỡ khỏi session
+    trước khi đọc lô kế tiếp.
+    """
+    result = await session.stream_scalars(statement.execution_options(yield_per=batch_size))
+    try:
+        async for batch in result.partitions():
+            yield batch
+            session.expunge_all()
+    finally:
+        await result.close()
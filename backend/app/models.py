@@ -1,8 +1,21 @@
 import uuid
-from typing import List, Optional
-from datetime import datetime
+from typing import Any, List, Optional
+from datetime import date, datetime
 from sqlmodel import Field, Relationship, SQLModel
-from sqlalchemy import Column, String, Text
+from sqlalchemy import Column, Index, String, Text
+from pydantic import field_validator
+
+from app.core.timestamps import UTCNaiveDateTime, utc_now
+from app.core.vectors import Float32Vector, parse_vector
+
+# GIN index pg_trgm (gin_trgm_ops) cho tìm kiếm chuỗi con ILIKE '%q%'
+def trigram_index(table: str, column: str) -> Index:
+    return Index(
+        f"ix_{table}_{column.lower()}_trgm",
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    )
 
 # --- Category ---
 class CategoryBase(SQLModel):
@@ -21,6 +34,10 @@ class CategoryUpdate(CategoryBase):
 
 class Category(CategoryBase, table=True):
     __tablename__ = "categories"
+    __table_args__ = (
+        trigram_index("categories", "name_cat"),
+        trigram_index("categories", "description"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     products: List["Product"] = Relationship(back_populates="category")
 
@@ -36,7 +53,8 @@ class CategoryPublic(CategoryBase):
 
 class CategoriesPublic(SQLModel):
     data: List[CategoryPublic]
-    count: int
+    count: Optional[int] = None
+    next_cursor: Optional[str] = None  # Token cho trang kế tiếp (phân trang keyset)
 
 # --- Product ---
 class ProductBase(SQLModel):
@@ -52,8 +70,12 @@ class ProductUpdate(ProductBase):
 
 class Product(ProductBase, table=True):
     __tablename__ = "product"
+    __table_args__ = (
+        trigram_index("product", "name"),
+        trigram_index("product", "descriptions"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    categories_id: uuid.UUID = Field(foreign_key="categories.id")
+    categories_id: uuid.UUID = Field(foreign_key="categories.id", index=True)
     variants: List["Variant"] = Relationship(back_populates="product")
     category: Category = Relationship(back_populates="products")
 
@@ -63,7 +85,8 @@ class ProductPublic(ProductBase):
 
 class ProductsPublic(SQLModel):
     data: List[ProductPublic]
-    count: int
+    count: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 # --- Variant ---
 class VariantBase(SQLModel):
@@ -86,8 +109,11 @@ class VariantUpdate(VariantBase):
 
 class Variant(VariantBase, table=True):
     __tablename__ = "variant"
+    __table_args__ = (trigram_index("variant", "Beverage_Option"),)
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    product_id: uuid.UUID = Field(foreign_key="product.id")
+    product_id: uuid.UUID = Field(foreign_key="product.id", index=True)
+    # Lọc theo khoảng giá (search_variants)
+    price: Optional[float] = Field(default=None, index=True)
     product: Product = Relationship(back_populates="variants")
     order_details: List["OrderDetail"] = Relationship(back_populates="variant")
 
@@ -97,7 +123,8 @@ class VariantPublic(VariantBase):
 
 class VariantsPublic(SQLModel):
     data: List[VariantPublic]
-    count: int
+    count: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 # --- Customer ---
 class CustomerBase(SQLModel):
@@ -106,19 +133,34 @@ class CustomerBase(SQLModel):
     age: Optional[int] = None
     location: Optional[str] = Field(default=None, max_length=255)
     picture: Optional[str] = Field(default=None, max_length=255)
-    embedding: Optional[str] = Field(sa_column=Column('embedding', Text), default=None)
+    # Vector float32 đóng gói trong cột bytea; API nhận/trả mảng số (chấp nhận cả chuỗi dạng cũ)
+    embedding: Optional[List[float]] = Field(sa_column=Column('embedding', Float32Vector), default=None)
     username: Optional[str] = Field(default=None, max_length=255)
-    password: Optional[str] = Field(default=None, min_length=8, max_length=40)
 
+    @field_validator("embedding", mode="before")
+    @classmethod
+    def parse_embedding(cls, value: Any) -> Optional[List[float]]:
+        return parse_vector(value)
+
+# Mật khẩu chỉ có ở dữ liệu gửi lên và trong bảng (dạng hash), không trả về qua API
 class CustomerCreate(CustomerBase):
-    pass
+    password: Optional[str] = Field(default=None, min_length=8, max_length=40)
 
 class CustomerUpdate(CustomerBase):
-    pass
+    password: Optional[str] = Field(default=None, min_length=8, max_length=40)
 
 class Customer(CustomerBase, table=True):
     __tablename__ = "customers"
+    __table_args__ = (
+        trigram_index("customers", "name"),
+        trigram_index("customers", "username"),
+        trigram_index("customers", "location"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    # Đăng nhập tìm theo username (ix_customers_username)
+    username: Optional[str] = Field(default=None, max_length=255, index=True)
+    # Cột lưu hash bcrypt (60 ký tự), dài hơn giới hạn của mật khẩu client gửi lên
+    password: Optional[str] = Field(default=None, max_length=255)
     orders: List["Order"] = Relationship(back_populates="customer")
 
 class CustomerPublic(CustomerBase):
@@ -126,7 +168,45 @@ class CustomerPublic(CustomerBase):
 
 class CustomersPublic(SQLModel):
     data: List[CustomerPublic]
-    count: int
+    count: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+# Thông tin xác thực tối thiểu của customer đăng nhập (không có embedding, mật khẩu...)
+class CustomerPrincipal(SQLModel):
+    id: uuid.UUID
+    username: Optional[str] = None
+    name: Optional[str] = None
+
+# Một truy vấn tìm khách hàng tương tự: theo vector embedding hoặc theo embedding của một khách hàng
+class SimilarCustomersQuery(SQLModel):
+    embedding: Optional[List[float]] = None
+    customer_id: Optional[uuid.UUID] = None
+
+    @field_validator("embedding", mode="before")
+    @classmethod
+    def parse_embedding(cls, value: Any) -> Optional[List[float]]:
+        return parse_vector(value)
+
+class SimilarCustomersRequest(SimilarCustomersQuery):
+    k: int = Field(default=10, ge=1)
+
+# Nhiều truy vấn trong một request, trả lời bằng một phép nhân ma trận
+class SimilarCustomersBatchRequest(SQLModel):
+    queries: List[SimilarCustomersQuery]
+    k: int = Field(default=10, ge=1)
+
+class SimilarCustomer(SQLModel):
+    id: uuid.UUID
+    name: Optional[str] = None
+    username: Optional[str] = None
+    picture: Optional[str] = None
+    score: float  # Độ tương đồng cosine (1 là giống nhất)
+
+class SimilarCustomersPublic(SQLModel):
+    data: List[SimilarCustomer]
+
+class SimilarCustomersBatchPublic(SQLModel):
+    data: List[SimilarCustomersPublic]  # Theo thứ tự các truy vấn gửi lên
 
 # --- Store ---
 class StoreBase(SQLModel):
@@ -151,11 +231,13 @@ class StorePublic(StoreBase):
 
 class StoresPublic(SQLModel):
     data: List[StorePublic]
-    count: int
+    count: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 # --- Order ---
 class OrderBase(SQLModel):
-    order_date: Optional[datetime] = Field(default_factory=datetime.utcnow)
+    # Lưu giờ UTC không múi giờ (UTCNaiveDateTime): ngày tổng hợp trong SQL và Python luôn khớp
+    order_date: Optional[datetime] = Field(default_factory=utc_now, sa_type=UTCNaiveDateTime)
     total_amount: Optional[float] = Field(default=None)
 
 class OrderCreate(OrderBase):
@@ -168,9 +250,11 @@ class OrderUpdate(OrderBase):
 
 class Order(OrderBase, table=True):
     __tablename__ = "orders"
+    # Lọc theo khoảng ngày và phân trang keyset theo (order_date, id)
+    __table_args__ = (Index("ix_orders_order_date_id", "order_date", "id"),)
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    customer_id: uuid.UUID = Field(foreign_key="customers.id")
-    store_id: uuid.UUID = Field(foreign_key="store.id")
+    customer_id: uuid.UUID = Field(foreign_key="customers.id", index=True)
+    store_id: uuid.UUID = Field(foreign_key="store.id", index=True)
     customer: Customer = Relationship(back_populates="orders")
     store: Store = Relationship(back_populates="orders")  
     order_details: List["OrderDetail"] = Relationship(back_populates="order")
@@ -182,7 +266,12 @@ class OrderPublic(OrderBase):
 
 class OrdersPublic(SQLModel):
     data: List[OrderPublic]
-    count: int
+    count: Optional[int] = None
+    next_cursor: Optional[str] = None
+    # Phân trang theo số trang; page và totalPages là None khi đọc theo cursor hoặc không đếm
+    page: Optional[int] = None
+    pageSize: int
+    totalPages: Optional[int] = None
 
 # --- Order Detail ---
 class OrderDetailBase(SQLModel):
@@ -201,8 +290,8 @@ class OrderDetailUpdate(OrderDetailBase):
 class OrderDetail(OrderDetailBase, table=True):
     __tablename__ = "order_detail"
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    order_id: uuid.UUID = Field(foreign_key="orders.id")
-    variant_id: uuid.UUID = Field(foreign_key="variant.id")
+    order_id: uuid.UUID = Field(foreign_key="orders.id", index=True)
+    variant_id: uuid.UUID = Field(foreign_key="variant.id", index=True)
     order: Order = Relationship(back_populates="order_details")
     variant: Variant = Relationship(back_populates="order_details")
 
@@ -218,7 +307,153 @@ class OrderDetailWithVariantPublic(OrderDetailPublic):
 
 class OrderDetailsPublic(SQLModel):
     data: List[OrderDetailPublic]
-    count: int
+    count: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+# --- Checkout (đơn hàng kèm chi tiết, tạo trong một transaction) ---
+class OrderLineCreate(SQLModel):
+    variant_id: uuid.UUID
+    quantity: int = Field(default=1, ge=1)
+    rate: Optional[float] = Field(default=None)
+
+class OrderWithDetailsCreate(SQLModel):
+    customer_id: uuid.UUID
+    store_id: uuid.UUID
+    order_date: Optional[datetime] = Field(default_factory=utc_now)
+    details: List[OrderLineCreate] = Field(min_length=1)
+
+class OrderWithDetailsPublic(OrderPublic):
+    order_details: List[OrderDetailPublic]
+
+# --- Bulk operations ---
+class BulkItemError(SQLModel):
+    index: int  # Vị trí phần tử trong danh sách gửi lên
+    detail: str
+
+class BulkDeleteRequest(SQLModel):
+    ids: List[uuid.UUID]
+
+class BatchRequest(SQLModel):
+    ids: List[uuid.UUID]  # Id trùng được bỏ, kết quả giữ thứ tự gửi lên
+
+class BulkDeleteResult(SQLModel):
+    deleted: int
+    errors: List[BulkItemError] = []
+
+class ProductBulkUpdateItem(SQLModel):
+    id: uuid.UUID
+    name: Optional[str] = Field(default=None, max_length=255)
+    descriptions: Optional[str] = None
+    link_image: Optional[str] = None
+    categories_id: Optional[uuid.UUID] = None
+
+class ProductsBulkResult(SQLModel):
+    data: List[ProductPublic]
+    errors: List[BulkItemError] = []
+
+class VariantsBulkResult(SQLModel):
+    data: List[VariantPublic]
+    errors: List[BulkItemError] = []
+
+class OrderDetailsBulkResult(SQLModel):
+    data: List[OrderDetailPublic]
+    errors: List[BulkItemError] = []
+
+# --- Sales rollups ---
+# Bảng tổng hợp dẫn xuất từ orders x order_detail, cập nhật cùng transaction với các
+# thao tác ghi (app/crud/rollup.py); không khai báo khóa ngoại để xóa variant/store
+# không bị chặn bởi dữ liệu tổng hợp
+class SalesDaily(SQLModel, table=True):
+    __tablename__ = "sales_daily"
+    day: date = Field(primary_key=True)
+    store_id: uuid.UUID = Field(primary_key=True)
+    variant_id: uuid.UUID = Field(primary_key=True)
+    quantity: int = 0
+    revenue: float = 0.0  # SUM(quantity * unit_price)
+    lines: int = 0  # Số dòng order_detail
+
+class SalesStoreDaily(SQLModel, table=True):
+    __tablename__ = "sales_store_daily"
+    day: date = Field(primary_key=True)
+    store_id: uuid.UUID = Field(primary_key=True)
+    orders: int = 0
+
+# --- Analytics ---
+class SalesSummary(SQLModel):
+    products: int
+    categories: int
+    customers: int
+    stores: int
+    orders: int
+    revenue: float
+    avg_order_value: float
+
+class StoreDayRevenue(SQLModel):
+    store_id: uuid.UUID
+    name_store: Optional[str] = None
+    day: date
+    orders: int
+    quantity: int
+    revenue: float  # SUM(quantity * đơn giá) của các dòng chi tiết
+
+class StoreDayRevenuesPublic(SQLModel):
+    data: List[StoreDayRevenue]
+
+class TopVariant(SQLModel):
+    variant_id: uuid.UUID
+    beverage_option: Optional[str] = None
+    product_id: uuid.UUID
+    product_name: str
+    quantity: int
+    revenue: float
+
+class TopVariantsPublic(SQLModel):
+    data: List[TopVariant]
+
+class ProductNutritionStats(SQLModel):
+    product_id: uuid.UUID
+    product_name: str
+    variants: int
+    # Trung bình/cực trị bỏ qua giá trị NULL
+    avg_price: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    avg_calories: Optional[float] = None
+    max_calories: Optional[float] = None
+    max_caffeine_mg: Optional[float] = None
+    avg_protein_g: Optional[float] = None
+    avg_dietary_fibre_g: Optional[float] = None
+    avg_sugars_g: Optional[float] = None
+
+class ProductNutritionStatsPublic(SQLModel):
+    data: List[ProductNutritionStats]
+
+class CustomerOrderCount(SQLModel):
+    customer_id: uuid.UUID
+    name: Optional[str] = None
+    username: Optional[str] = None
+    orders: int
+    total_spent: float
+    last_order_date: Optional[datetime] = None
+
+class CustomerOrderCountsPublic(SQLModel):
+    data: List[CustomerOrderCount]
+
+# --- Import ---
+class ImportRowError(SQLModel):
+    line: int  # Số dòng trong file (CSV tính cả dòng header)
+    detail: str
+
+class ImportReport(SQLModel):
+    table: str
+    format: str
+    received: int  # Số bản ghi đọc được từ file
+    inserted: int
+    updated: int  # Bản ghi đã tồn tại (trùng id) được ghi đè
+    rejected: int
+    errors: List[ImportRowError] = []  # Chỉ giữ tối đa IMPORT_MAX_ERRORS lỗi đầu tiên
+    seconds: float
+    rows_per_second: float
 
 class Token(SQLModel):
     access_token: str
@@ -1,10 +1,37 @@
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
 from app.api.main import api_router
+from app.core.cache import catalog_cache
+from app.core.lazyload import install_lazy_load_detector, track_lazy_loads
+from app.core.log import configure_logging, start_request
+from app.core.request_metrics import MetricsMiddleware, request_metrics
+from app.core.security import PasswordHasherBusyError, password_hasher
+from app.crud.expand import InvalidExpandError
+from app.crud.pagination import InvalidCursorError
+from app.crud.projection import InvalidFieldsError
+
+configure_logging()
+access_logger = logging.getLogger("app.access")
+
+# Khởi động/dừng tác vụ nền của cache (lắng nghe invalidate từ các worker khác)
+# và process pool hash mật khẩu
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await catalog_cache.backend.start()
+    password_hasher.start()
+    yield
+    password_hasher.shutdown()
+    await catalog_cache.backend.close()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
+    lifespan=lifespan,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url="/docs",  # Swagger UI endpoint
     redoc_url="/redoc",  # ReDoc endpoint
@@ -18,9 +45,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Đo độ trễ, kích thước response và SQL của từng request (xem /metrics)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Cursor phân trang không hợp lệ -> 400 thay vì lỗi 500
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+# Tham số fields chứa trường không hợp lệ -> 400
+@app.exception_handler(InvalidFieldsError)
+async def invalid_fields_handler(request: Request, exc: InvalidFieldsError) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+# Tham số expand chứa quan hệ không tồn tại hoặc quá sâu -> 400
+@app.exception_handler(InvalidExpandError)
+async def invalid_expand_handler(request: Request, exc: InvalidExpandError) -> JSONResponse:
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+# Process pool hash mật khẩu đã đủ yêu cầu đang chờ -> 429, client thử lại sau
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError) -> JSONResponse:
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# Chế độ debug: báo các lazy load (nguy cơ N+1) của từng request qua log và header X-Lazy-Loads
+if settings.DEBUG_LAZY_LOADS:
+    install_lazy_load_detector()
+    lazy_load_logger = logging.getLogger("app.lazyload")
+
+    @app.middleware("http")
+    async def lazy_load_middleware(request: Request, call_next):
+        with track_lazy_loads() as loads:
+            response = await call_next(request)
+        if loads:
+            lazy_load_logger.warning(
+                "%d lazy load(s) in %s %s: %s", len(loads), request.method, request.url.path, ", ".join(loads)
+            )
+        response.headers["X-Lazy-Loads"] = str(len(loads))
+        return response
+
+# Gán request id cho mọi log của request (nhận từ header nếu client/proxy đã gửi) và ghi
+# một dòng access log có cấu trúc; đăng ký sau cùng để bọc ngoài các middleware khác
+@app.middleware("http")
+async def request_context_middleware(request: Request, call_next):
+    request_id = start_request(request.headers.get(settings.LOG_REQUEST_ID_HEADER))
+    start = time.perf_counter()
+    response = await call_next(request)
+    response.headers[settings.LOG_REQUEST_ID_HEADER] = request_id
+    access_logger.info(
+        "%s %s %d",
+        request.method,
+        request.url.path,
+        response.status_code,
+        extra={"status": response.status_code, "duration_ms": round((time.perf_counter() - start) * 1000, 2)},
+    )
+    return response
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Metrics theo định dạng text của Prometheus (ngoài API_V1_STR, theo quy ước của Prometheus)
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics() -> PlainTextResponse:
+        return PlainTextResponse(request_metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,92 @@
+# File: backend/scripts/bench_password_hashing.py
+# Tải đăng nhập đồng thời: một loạt `--logins` lần verify bcrypt, tối đa `--concurrency`
+# lần cùng lúc, so sánh:
+#   - inline: verify ngay trên event loop (cách cũ) -> mọi request khác của worker bị chặn
+#   - pool:   PasswordHasher (ProcessPoolExecutor giới hạn, từ chối khi quá max_pending)
+# Ngoài thông lượng và độ trễ, đo độ trễ lớn nhất của event loop (một tác vụ nhịp 10 ms):
+# đó là thời gian mọi request khác trên worker phải chờ.
+# Chạy trong thư mục backend:  python -m scripts.bench_password_hashing --logins 64 --concurrency 32
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from app.core.config import settings
+from app.core.security import PasswordHasher, PasswordHasherBusyError, pwd_context
+
+
+async def heartbeat(stop: asyncio.Event, stalls: List[float], interval: float = 0.01) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def run(verify: Callable[[], Awaitable[bool]], logins: int, concurrency: int) -> None:
+    latencies: List[float] = []
+    rejected = 0
+    limit = asyncio.Semaphore(concurrency)
+
+    async def login() -> None:
+        nonlocal rejected
+        async with limit:
+            start = time.perf_counter()
+            try:
+                assert await verify()
+            except PasswordHasherBusyError:
+                rejected += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    stop, stalls = asyncio.Event(), []
+    beat = asyncio.create_task(heartbeat(stop, stalls))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+    print(
+        f"  {len(latencies) / elapsed:7.1f} logins/s  p50 {statistics.median(latencies or [0]) * 1000:8.1f} ms"
+        f"  p95 {p95 * 1000:8.1f} ms  rejected(429) {rejected:4d}  max loop stall {max(stalls, default=0) * 1000:8.1f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=settings.PASSWORD_BCRYPT_ROUNDS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--max-pending", type=int, default=None, help="Mặc định: không giới hạn (= logins)")
+    args = parser.parse_args()
+
+    context = pwd_context.copy(bcrypt__rounds=args.rounds)
+    # Process con (spawn) đọc lại settings từ biến môi trường: cùng số vòng để verify không hash lại
+    os.environ["PASSWORD_BCRYPT_ROUNDS"] = str(args.rounds)
+    password = "correct horse battery staple"
+    stored = context.hash(password)
+    print(f"logins={args.logins} concurrency={args.concurrency} rounds={args.rounds} workers={args.workers}")
+
+    print("inline (event loop):")
+    await run(lambda: asyncio.sleep(0, context.verify(password, stored)), args.logins, args.concurrency)
+
+    max_pending: Optional[int] = args.max_pending
+    hasher = PasswordHasher(args.workers, max_pending if max_pending is not None else args.logins)
+    hasher.start()
+    await hasher.verify(password, stored)  # warm-up: chờ các process spawn xong
+    print(f"pool ({args.workers} processes, max_pending={hasher.max_pending}):")
+
+    async def pooled() -> bool:
+        valid, _ = await hasher.verify(password, stored)
+        return valid
+
+    await run(pooled, args.logins, args.concurrency)
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+# File: backend/scripts/bench_serialization.py
+# Đo chi phí serialize mỗi dòng cho response danh sách variant:
+#   - legacy: model_validate từng dòng + response_model validate lại + dump JSON
+#   - fast:   page_response (đọc thuộc tính ORM, encode orjson một lần)
+# Chạy trong thư mục backend:  python -m scripts.bench_serialization --rows 10000
+import argparse
+import statistics
+import time
+import uuid
+from typing import Any, Callable
+
+from pydantic import TypeAdapter
+
+from app.api.responses import page_response
+from app.models import Variant, VariantPublic, VariantsPublic
+
+
+def make_rows(n: int) -> list[Variant]:
+    product_id = uuid.uuid4()
+    return [
+        Variant(
+            id=uuid.uuid4(),
+            product_id=product_id,
+            beverage_option=f"Option {i}",
+            calories=120.0 + i % 50,
+            dietary_fibre_g=1.5,
+            sugars_g=20.0,
+            protein_g=4.0,
+            vitamin_a="10%",
+            vitamin_c="0%",
+            caffeine_mg=75.0,
+            price=3.25 + (i % 7) * 0.5,
+            sales_rank=i,
+        )
+        for i in range(n)
+    ]
+
+
+def legacy(rows: list[Variant]) -> bytes:
+    # Giống đường cũ: router model_validate từng dòng, FastAPI validate theo
+    # response_model rồi mới encode JSON
+    adapter = TypeAdapter(VariantsPublic)
+    page = VariantsPublic(data=[VariantPublic.model_validate(v) for v in rows], count=len(rows))
+    return adapter.dump_json(adapter.validate_python(page))
+
+
+def fast(rows: list[Variant]) -> bytes:
+    return page_response(VariantsPublic, rows, count=len(rows)).body
+
+
+def measure(fn: Callable[[Any], bytes], rows: list[Variant], repeat: int) -> tuple[float, int]:
+    fn(rows)  # warm-up (tạo schema/serializer)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(rows)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), len(body)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    results = {name: measure(fn, rows, args.repeat) for name, fn in (("legacy", legacy), ("fast", fast))}
+    for name, (seconds, size) in results.items():
+        per_row = seconds / args.rows * 1e6
+        print(f"{name:>6}: {seconds * 1000:8.1f} ms total  {per_row:6.2f} us/row  {size / 1024:8.1f} KiB")
+    print(f"speedup: {results['legacy'][0] / results['fast'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# File: backend/scripts/bench_similarity.py
+# Đo độ trễ và recall của tìm khách hàng tương tự trên dữ liệu giả lập (vector theo cụm):
+#   - text:   cách cũ, cột Text -> parse chuỗi thành vector ở mỗi truy vấn rồi tính cosine
+#   - packed: bytea float32 -> np.frombuffer (không parse) rồi tính cosine
+#   - index:  EmbeddingIndex nằm sẵn trong bộ nhớ (ma trận đã chuẩn hóa), chỉ còn matmul + top-k
+#   - mmap:   file chỉ mục dùng chung giữa các worker, cả lô truy vấn trong một phép nhân ma trận
+# Recall@k so với kết quả chính xác tính bằng float64 (đo sai số do lưu float32).
+# Chạy trong thư mục backend:  python -m scripts.bench_similarity --rows 100000 --dim 128
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from app.core.embedding_index import EmbeddingFile
+from app.core.vectors import EmbeddingIndex, normalize, pack_vector, parse_vector
+
+
+def make_vectors(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return centers[rng.integers(clusters, size=rows)] + 0.3 * rng.normal(size=(rows, dim))
+
+
+def exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+def top_k_rows(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    normalized = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def percentile(timings: list[float], p: float) -> float:
+    return sorted(timings)[min(len(timings) - 1, int(len(timings) * p))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--text-queries", type=int, default=3, help="Số truy vấn cho cách cũ (rất chậm)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.rows, args.dim, args.clusters, args.seed)
+    queries = make_vectors(args.queries, args.dim, args.clusters, args.seed + 1)
+    ids = [uuid.UUID(int=i) for i in range(args.rows)]
+    texts = [",".join(f"{x:.7g}" for x in row) for row in vectors]
+    packed = [pack_vector(row) for row in vectors]
+
+    start = time.perf_counter()
+    index = EmbeddingIndex.from_packed(list(zip(ids, packed)))
+    build = time.perf_counter() - start
+    print(
+        f"rows={args.rows} dim={args.dim} k={args.k}  text={sum(map(len, texts)) / 2**20:.1f} MiB"
+        f"  packed={sum(map(len, packed)) / 2**20:.1f} MiB  index build {build * 1000:.1f} ms"
+    )
+
+    def text_search(query: np.ndarray) -> list[int]:
+        matrix = np.array([parse_vector(text) for text in texts], dtype=np.float32)
+        return top_k_rows(matrix, query, args.k).tolist()
+
+    def packed_search(query: np.ndarray) -> list[int]:
+        matrix = np.frombuffer(b"".join(packed), dtype=np.float32).reshape(args.rows, -1)
+        return top_k_rows(matrix, query, args.k).tolist()
+
+    def index_search(query: np.ndarray) -> list[int]:
+        return [id.int for id, _ in index.search(query, args.k)]
+
+    for name, search, count in (
+        ("text", text_search, args.text_queries),
+        ("packed", packed_search, args.queries),
+        ("index", index_search, args.queries),
+    ):
+        timings, hits = [], 0
+        for query in queries[:count]:
+            begin = time.perf_counter()
+            found = search(query)
+            timings.append(time.perf_counter() - begin)
+            hits += len(set(found) & set(exact_top_k(vectors, query, args.k).tolist()))
+        recall = hits / (args.k * len(timings))
+        print(
+            f"{name:>6}: p50 {statistics.median(timings) * 1000:9.2f} ms  p95 {percentile(timings, 0.95) * 1000:9.2f} ms"
+            f"  recall@{args.k} {recall:.4f}  ({len(timings)} queries)"
+        )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "embeddings.idx")
+        EmbeddingFile.create(path, index)
+        mapped = EmbeddingFile(path)
+        batch = normalize(queries.astype(np.float32))
+        mapped.search(batch[:1], args.k, [None])  # warm-up (nạp trang của file vào page cache)
+        start = time.perf_counter()
+        results = mapped.search(batch, args.k, [None] * len(batch))
+        elapsed = time.perf_counter() - start
+        hits = sum(
+            len({id.int for id, _ in found} & set(exact_top_k(vectors, query, args.k).tolist()))
+            for found, query in zip(results, queries)
+        )
+        print(
+            f"{'mmap':>6}: {elapsed * 1000:9.2f} ms for a batch of {len(batch)}"
+            f" ({elapsed / len(batch) * 1000:.2f} ms/query)  recall@{args.k} {hits / (args.k * len(batch)):.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# File: backend/scripts/check_indexes.py
+# Kiểm tra index cho các điều kiện lọc trong app/crud (chạy trước khi merge, lỗi -> exit 1):
+#   - Đọc AST mọi file app/crud/*.py, tìm điều kiện lọc trên cột của model: so sánh
+#     (Model.cột == / < / >= ...), .in_/.between/.is_(...), .ilike/.like(...) và các cột
+#     truyền cho text_search(...)
+#   - Điều kiện bằng/khoảng cần cột là cột đầu của khóa chính hoặc của một index B-tree
+#     (điều kiện join giữa hai cột: chỉ cần một trong hai cột có index);
+#     ILIKE '%q%' cần index GIN gin_trgm_ops trên cột đó
+#   - Mọi index khai báo trong app/models.py phải được tạo bởi một migration trong alembic/versions
+# Điều kiện cố ý không cần index được liệt kê trong ALLOWED kèm lý do.
+# Chạy trong thư mục backend:  python -m scripts.check_indexes
+import ast
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import Table
+from sqlmodel import SQLModel
+
+import app.models  # noqa: F401  (đăng ký các bảng vào SQLModel.metadata)
+
+BACKEND = Path(__file__).resolve().parent.parent
+CRUD_DIR = BACKEND / "app" / "crud"
+MIGRATIONS_DIR = BACKEND / "alembic" / "versions"
+
+# Toán tử/hàm lọc dùng được index B-tree và các hàm cần index trigram
+BTREE_METHODS = {"in_", "not_in", "between", "is_", "is_not"}
+TRIGRAM_METHODS = {"ilike", "like", "not_ilike", "not_like", "contains", "icontains"}
+TRIGRAM_FUNCTIONS = {"text_search"}
+
+# (bảng, cột) -> lý do không cần index
+ALLOWED: Dict[Tuple[str, str], str] = {
+    ("customers", "age"): "khoảng tuổi chỉ lọc thêm trên kết quả tìm kiếm, độ chọn lọc thấp",
+    ("customers", "embedding"): "dựng chỉ mục embedding đọc toàn bảng có chủ ý",
+    ("sales_daily", "lines"): "luôn đi cùng điều kiện day (cột đầu khóa chính)",
+    ("sales_store_daily", "orders"): "luôn đi cùng điều kiện day (cột đầu khóa chính)",
+}
+
+
+@dataclass(frozen=True)
+class Filter:
+    path: Path
+    line: int
+    table: str
+    column: str
+    trigram: bool
+    # Điều kiện join: cột ở vế còn lại (đủ nếu một trong hai cột có index)
+    other: Optional[Tuple[str, str]] = None
+
+    def __str__(self) -> str:
+        kind = "ILIKE (cần index gin_trgm_ops)" if self.trigram else "so sánh (cần index B-tree)"
+        return f"{self.path.relative_to(BACKEND)}:{self.line}: {self.table}.{self.column} — {kind}"
+
+
+def model_tables() -> Dict[str, Table]:
+    """Tên class model (như được import trong app/crud) -> bảng"""
+    return {
+        mapper.class_.__name__: mapper.local_table
+        for mapper in SQLModel._sa_registry.mappers
+        if isinstance(mapper.local_table, Table)
+    }
+
+
+def column_name(table: Table, attribute: str) -> Optional[str]:
+    """Tên cột trong DB của thuộc tính model (vd: beverage_option -> Beverage_Option)"""
+    if attribute in table.c:
+        return table.c[attribute].name
+    for column in table.c:
+        if column.key == attribute or column.name.lower() == attribute.lower():
+            return column.name
+    return None
+
+
+class FilterVisitor(ast.NodeVisitor):
+    def __init__(self, path: Path, tables: Dict[str, Table]) -> None:
+        self.path = path
+        self.tables = tables
+        self.filters: List[Filter] = []
+
+    def _column(self, node: ast.AST) -> Optional[Tuple[str, str]]:
+        # Model.cột với Model là class bảng (biến thường như `model.day` không xác định được bảng)
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            table = self.tables.get(node.value.id)
+            if table is not None:
+                name = column_name(table, node.attr)
+                if name is not None:
+                    return table.name, name
+        return None
+
+    def _add(self, node: ast.AST, target: ast.AST, trigram: bool) -> None:
+        column = self._column(target)
+        if column is not None:
+            self.filters.append(Filter(self.path, node.lineno, *column, trigram))
+
+    def visit_Compare(self, node: ast.Compare) -> None:
+        if all(isinstance(op, (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)) for op in node.ops):
+            operands = [node.left, *node.comparators]
+            if len(operands) == 2 and all(isinstance(operand, ast.Attribute) for operand in operands):
+                # So sánh hai cột (điều kiện join); vế là cột của subquery (sales.c.x) thì bỏ qua
+                left, right = (self._column(operand) for operand in operands)
+                if left is not None and right is not None:
+                    self.filters.append(Filter(self.path, node.lineno, *left, False, right))
+            else:
+                for operand in operands:
+                    self._add(node, operand, trigram=False)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        function = node.func
+        if isinstance(function, ast.Attribute) and function.attr in BTREE_METHODS | TRIGRAM_METHODS:
+            self._add(node, function.value, trigram=function.attr in TRIGRAM_METHODS)
+        name = function.id if isinstance(function, ast.Name) else getattr(function, "attr", None)
+        if name in TRIGRAM_FUNCTIONS:
+            for argument in node.args:
+                if isinstance(argument, (ast.List, ast.Tuple)):
+                    for element in argument.elts:
+                        self._add(node, element, trigram=True)
+        self.generic_visit(node)
+
+
+def crud_filters(tables: Dict[str, Table]) -> Iterator[Filter]:
+    for path in sorted(CRUD_DIR.glob("*.py")):
+        visitor = FilterVisitor(path, tables)
+        visitor.visit(ast.parse(path.read_text(encoding="utf-8"), filename=str(path)))
+        yield from visitor.filters
+
+
+def indexed_columns(tables: Dict[str, Table]) -> Tuple[Set[Tuple[str, str]], Set[Tuple[str, str]]]:
+    """(cột dùng được B-tree: cột đầu của khóa chính/index, cột có index trigram)"""
+    btree, trigram = set(), set()
+    for table in tables.values():
+        primary_key = list(table.primary_key.columns)
+        if primary_key:
+            btree.add((table.name, primary_key[0].name))
+        for index in table.indexes:
+            columns = list(index.columns)
+            if not columns:
+                continue
+            options = index.dialect_options["postgresql"]
+            if options.get("using") == "gin":
+                if "gin_trgm_ops" in (options.get("ops") or {}).values():
+                    trigram.update((table.name, column.name) for column in columns)
+            else:
+                btree.add((table.name, columns[0].name))
+    return btree, trigram
+
+
+def unmigrated_indexes(tables: Dict[str, Table]) -> List[str]:
+    """Index của model chưa có migration nào nhắc tới tên"""
+    sources = "\n".join(path.read_text(encoding="utf-8") for path in MIGRATIONS_DIR.glob("*.py"))
+    return sorted(
+        f"{table.name}.{index.name}"
+        for table in tables.values()
+        for index in table.indexes
+        if f'"{index.name}"' not in sources and f"'{index.name}'" not in sources
+    )
+
+
+def main() -> int:
+    tables = model_tables()
+    btree, trigram = indexed_columns(tables)
+    problems = []
+    seen = set()
+    for found in crud_filters(tables):
+        key = (found.table, found.column)
+        if found.other is not None and found.other in btree:
+            continue
+        if key in ALLOWED or (found.trigram and key in trigram) or (not found.trigram and key in btree):
+            continue
+        if (found.path, found.line, key) not in seen:
+            seen.add((found.path, found.line, key))
+            problems.append(f"unindexed filter: {found}")
+    problems.extend(f"index without migration: {name}" for name in unmigrated_indexes(tables))
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f"{len(problems)} problem(s). Thêm index (models + migration) hoặc ghi lý do vào ALLOWED.")
+        return 1
+    print("All CRUD filters use indexed columns.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# File: backend/scripts/import_data.py
+# Nhập file CSV/NDJSON lớn vào một bảng (catalog hoặc lịch sử đơn hàng) qua COPY + upsert.
+# Chạy trong thư mục backend:
+#   python -m scripts.import_data variant data/variants.csv
+#   python -m scripts.import_data orders data/orders.ndjson --batch-size 10000
+# Nên nhập theo thứ tự khóa ngoại: categories, product, variant, store, orders, order_detail
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from typing import AsyncIterator
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.crud.importer import ImportFormat, ImportTable, import_records
+
+CHUNK_SIZE = 1 << 16
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := file.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def run(table: ImportTable, path: Path, format: ImportFormat, batch_size: int, max_errors: int) -> int:
+    async with async_session_maker() as session:
+        report = await import_records(
+            session=session,
+            table=table,
+            chunks=read_chunks(path),
+            format=format,
+            batch_size=batch_size,
+            max_errors=max_errors,
+        )
+    print(
+        f"{report.table}: {report.received} rows read, {report.inserted} inserted, "
+        f"{report.updated} updated, {report.rejected} rejected "
+        f"in {report.seconds:.2f}s ({report.rows_per_second:.0f} rows/s)"
+    )
+    for error in report.errors:
+        print(f"  line {error.line}: {error.detail}", file=sys.stderr)
+    if report.rejected > len(report.errors):
+        print(f"  ... {report.rejected - len(report.errors)} more rejected rows", file=sys.stderr)
+    return 1 if report.rejected else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import CSV/NDJSON into a table")
+    parser.add_argument("table", type=ImportTable, choices=list(ImportTable), metavar="table",
+                        help=", ".join(t.value for t in ImportTable))
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", type=ImportFormat, choices=list(ImportFormat), default=None,
+                        help="csv hoặc ndjson (mặc định đoán theo phần mở rộng file)")
+    parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE)
+    parser.add_argument("--max-errors", type=int, default=settings.IMPORT_MAX_ERRORS)
+    args = parser.parse_args()
+
+    format = args.format
+    if format is None:
+        format = ImportFormat.ndjson if args.path.suffix in (".ndjson", ".jsonl") else ImportFormat.csv
+    sys.exit(asyncio.run(run(args.table, args.path, format, args.batch_size, args.max_errors)))
+
+
+if __name__ == "__main__":
+    main()
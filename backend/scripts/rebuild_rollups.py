@@ -0,0 +1,52 @@
+# File: backend/scripts/rebuild_rollups.py
+# Tính lại bảng tổng hợp bán hàng (sales_daily, sales_store_daily) từ orders x order_detail,
+# dùng khi backfill hoặc sau khi sửa dữ liệu trực tiếp trong database.
+# Chạy trong thư mục backend:
+#   python -m scripts.rebuild_rollups                          # toàn bộ lịch sử
+#   python -m scripts.rebuild_rollups --date-from 2024-01-01 --date-to 2024-02-01
+# Mỗi cửa sổ --window-days ngày là một transaction để không giữ khóa quá lâu.
+import argparse
+import asyncio
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlmodel import select, func
+
+from app.core.database import async_session_maker
+from app.crud.rollup import order_day, rebuild_sales_rollups
+from app.models import Order
+
+
+async def run(date_from: Optional[date], date_to: Optional[date], window_days: int) -> None:
+    async with async_session_maker() as session:
+        if date_from is None or date_to is None:
+            first, last = (await session.exec(select(func.min(Order.order_date), func.max(Order.order_date)))).one()
+            if first is None:
+                print("No orders, nothing to rebuild")
+                return
+            date_from = date_from or order_day(first)
+            date_to = date_to or order_day(last) + timedelta(days=1)
+
+        started = time.perf_counter()
+        start = date_from
+        while start < date_to:
+            end = min(start + timedelta(days=window_days), date_to)
+            await rebuild_sales_rollups(session=session, date_from=start, date_to=end)
+            await session.commit()
+            print(f"rebuilt {start} .. {end - timedelta(days=1)}")
+            start = end
+        print(f"done in {time.perf_counter() - started:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebuild daily sales rollups")
+    parser.add_argument("--date-from", type=date.fromisoformat, default=None, help="Ngày bắt đầu (bao gồm)")
+    parser.add_argument("--date-to", type=date.fromisoformat, default=None, help="Ngày kết thúc (không bao gồm)")
+    parser.add_argument("--window-days", type=int, default=31)
+    args = parser.parse_args()
+    asyncio.run(run(args.date_from, args.date_to, args.window_days))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Backend cache catalog với Redis giả lập trong process (fakeredis): đọc/ghi, bump,
+# invalidate qua pub/sub giữa hai worker, bỏ qua cache khi Redis lỗi và epoch khi
+# Redis mất dữ liệu. Chạy trong thư mục backend:  python -m pytest -q
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+import fakeredis
+import pytest
+from pydantic import TypeAdapter
+
+from app.core.cache import CatalogCache
+from app.core.cache_backends import MISSING, RedisCacheBackend
+
+ADAPTER = TypeAdapter(Optional[dict])
+
+
+def make_backend(server: fakeredis.FakeServer, **kwargs) -> RedisCacheBackend:
+    return RedisCacheBackend(client=fakeredis.aioredis.FakeRedis(server=server), prefix="test", ttl=60.0, **kwargs)
+
+
+async def wait_until(condition: Callable[[], Awaitable[bool]], timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not await condition():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met before timeout")
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def server() -> fakeredis.FakeServer:
+    return fakeredis.FakeServer()
+
+
+def test_get_set_round_trip(server):
+    async def scenario():
+        backend = make_backend(server)
+        generation = await backend.generation("product")
+        assert generation == 0
+        assert await backend.get("product", generation, ("id", 1), ADAPTER) is MISSING
+        await backend.set("product", generation, ("id", 1), {"name": "Latte"}, ADAPTER)
+        assert await backend.get("product", generation, ("id", 1), ADAPTER) == {"name": "Latte"}
+        await backend.set_many("product", generation, {("id", 2): None, ("id", 3): {"name": "Mocha"}}, ADAPTER)
+        values = await backend.get_many("product", generation, [("id", 3), ("id", 2), ("id", 4)], ADAPTER)
+        assert values == [{"name": "Mocha"}, None, MISSING]
+        await backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_bump_hides_old_entries(server):
+    async def scenario():
+        cache = CatalogCache(make_backend(server))
+        loads: List[str] = []
+
+        async def loader(value: str) -> dict:
+            loads.append(value)
+            return {"name": value}
+
+        assert await cache.get_or_load("product", 1, lambda: loader("old"), ADAPTER) == {"name": "old"}
+        assert await cache.get_or_load("product", 1, lambda: loader("unused"), ADAPTER) == {"name": "old"}
+        before = await cache.version("product")
+        await cache.invalidate("product")
+        assert await cache.backend.generation("product") == 1
+        assert await cache.get_or_load("product", 1, lambda: loader("new"), ADAPTER) == {"name": "new"}
+        assert loads == ["old", "new"]
+        assert (await cache.version("product"))[0] != before[0]
+        await cache.backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_pubsub_invalidation_between_workers(server):
+    async def scenario():
+        writer, reader = make_backend(server, epoch_check=60.0), make_backend(server, epoch_check=60.0)
+        await writer.start()
+        await reader.start()
+        await wait_until(lambda: asyncio.sleep(0, writer._listening and reader._listening))
+        assert await reader.generation("variant") == 0
+        await writer.bump("variant")
+        await writer.bump("variant")
+
+        async def reader_sees_bump() -> bool:
+            return await reader.generation("variant") == 2
+
+        # Generation đến qua kênh pub/sub (reader đang lắng nghe, không đọc lại Redis)
+        await wait_until(reader_sees_bump)
+        assert reader.stats()["listening"]
+        await writer.close()
+        await reader.close()
+
+    asyncio.run(scenario())
+
+
+def test_redis_down_bypasses_cache(server):
+    async def scenario():
+        cache = CatalogCache(make_backend(server))
+        server.connected = False
+        loads = 0
+
+        async def loader() -> dict:
+            nonlocal loads
+            loads += 1
+            return {"name": "Latte"}
+
+        assert await cache.backend.generation("product") is None
+        assert await cache.get_or_load("product", 1, loader, ADAPTER) == {"name": "Latte"}
+        assert await cache.get_or_load("product", 1, loader, ADAPTER) == {"name": "Latte"}
+        assert loads == 2
+        # Ghi đã commit: lỗi invalidate chỉ được ghi log, không ném ra cho request
+        await cache.invalidate("product")
+        assert await cache.version("product") is None
+        assert cache.backend.errors > 0
+        server.connected = True
+        assert await cache.backend.generation("product") == 0
+        await cache.backend.close()
+
+    asyncio.run(scenario())
+
+
+def test_epoch_changes_when_redis_loses_generations(server):
+    async def scenario():
+        writer, reader = make_backend(server, epoch_check=0.0), make_backend(server, epoch_check=0.0)
+        await reader.start()
+        await wait_until(lambda: asyncio.sleep(0, reader._listening))
+        for _ in range(3):
+            await writer.bump("store")
+        await wait_until(lambda: asyncio.sleep(0, reader._generations.get("store") == 3))
+        old_epoch = reader.epoch
+        assert old_epoch and old_epoch == writer.epoch
+
+        # Redis khởi động lại không persistence: generation đếm lại từ 0 với epoch mới
+        await writer._client.flushall()
+        assert await reader.generation("store") == 0
+        assert reader.epoch != old_epoch
+        await writer.bump("store")
+
+        async def reader_sees_bump() -> bool:
+            return await reader.generation("store") == 1
+
+        # Trước đây reader bỏ qua generation 1 < 3 và giữ dữ liệu cũ
+        await wait_until(reader_sees_bump)
+        assert writer.epoch == reader.epoch != old_epoch
+        await writer.close()
+        await reader.close()
+
+    asyncio.run(scenario())
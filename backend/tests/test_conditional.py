@@ -0,0 +1,62 @@
+# GET có điều kiện: chỉ bật khi generation dùng chung giữa các process (backend redis),
+# ghi từ process khác phải đổi ETag. Chạy trong thư mục backend:  python -m pytest -q
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.conditional import conditional_get
+from app.core.cache import catalog_cache
+from app.core.cache_backends import MemoryCacheBackend, RedisCacheBackend
+from app.core.config import settings
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+
+    @app.get("/items", dependencies=[conditional_get("product")])
+    async def read_items() -> list:
+        return []
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    def use(backend):
+        monkeypatch.setattr(catalog_cache, "backend", backend)
+        monkeypatch.setattr(catalog_cache, "_versions", {})
+        return backend
+
+    return use
+
+
+def test_memory_backend_disables_conditional_get(backend, monkeypatch):
+    backend(MemoryCacheBackend(60.0, 100))
+    client = make_client()
+    response = client.get("/items")
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
+    assert client.get("/items", headers={"If-None-Match": "*"}).status_code == 200
+    # Bật tường minh cho triển khai một worker, không có nguồn ghi khác
+    monkeypatch.setattr(settings, "CONDITIONAL_GET", "on")
+    etag = client.get("/items").headers["ETag"]
+    assert client.get("/items", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_write_from_another_process_changes_etag(backend):
+    server = fakeredis.FakeServer()
+    backend(RedisCacheBackend(client=fakeredis.aioredis.FakeRedis(server=server), prefix="test"))
+    client = make_client()
+    etag = client.get("/items").headers["ETag"]
+    assert client.get("/items", headers={"If-None-Match": etag}).status_code == 304
+
+    # Script hoặc worker khác ghi bảng (backend riêng, cùng Redis)
+    other = RedisCacheBackend(client=fakeredis.aioredis.FakeRedis(server=server), prefix="test")
+    asyncio.run(other.bump("product"))
+
+    response = client.get("/items", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
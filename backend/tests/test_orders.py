@@ -0,0 +1,62 @@
+# Danh sách đơn hàng phân trang theo số trang: tham số được kiểm tra biên (422 thay vì 500)
+# và page/pageSize/totalPages có trong response. Chạy trong thư mục backend:  python -m pytest -q
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.dependency import get_async_db
+from app.api.router import r_orders
+from app.models import Customer, Order, Store
+
+
+@pytest.fixture
+def client():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def setup() -> None:
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        async with session_maker() as session:
+            store, customer = Store(name_store="Center"), Customer(name="An")
+            session.add_all([store, customer])
+            await session.flush()
+            start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+            session.add_all(
+                Order(customer_id=customer.id, store_id=store.id, order_date=start + timedelta(hours=hour))
+                for hour in range(5)
+            )
+            await session.commit()
+
+    async def override_db():
+        async with session_maker() as session:
+            yield session
+
+    asyncio.run(setup())
+    app = FastAPI()
+    app.include_router(r_orders.router)
+    app.dependency_overrides[get_async_db] = override_db
+    yield TestClient(app)
+    asyncio.run(engine.dispose())
+
+
+def test_read_orders_returns_page_fields(client):
+    body = client.get("/orders/", params={"page": 2, "pageSize": 2}).json()
+    assert (body["count"], body["page"], body["pageSize"], body["totalPages"]) == (5, 2, 2, 3)
+    assert len(body["data"]) == 2
+
+    body = client.get("/orders/", params={"pageSize": 2, "count_mode": "none"}).json()
+    assert (body["count"], body["page"], body["totalPages"]) == (None, 1, None)
+    body = client.get("/orders/", params={"pageSize": 2, "cursor": body["next_cursor"]}).json()
+    assert (body["page"], len(body["data"])) == (None, 2)
+
+
+@pytest.mark.parametrize("params", [{"pageSize": 0}, {"pageSize": 1001}, {"page": 0}, {"page": -1}])
+def test_read_orders_rejects_out_of_range_paging(client, params):
+    assert client.get("/orders/", params=params).status_code == 422
@@ -0,0 +1,48 @@
+# Serialize nhanh bản ghi ORM từ AsyncSession: thuộc tính chưa nạp (load_only, quan hệ
+# chưa expand) bị bỏ qua thay vì lazy-load (MissingGreenlet). Chạy trong thư mục backend:  python -m pytest -q
+import asyncio
+from datetime import datetime, timezone
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import load_only
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.responses import serializer_for
+from app.models import Customer, Order, OrderPublic, OrderWithDetailsPublic, Store
+
+
+async def with_order(scenario) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_maker() as session:
+        store, customer = Store(name_store="Center"), Customer(name="An")
+        session.add_all([store, customer])
+        await session.flush()
+        session.add(Order(customer_id=customer.id, store_id=store.id, order_date=datetime(2026, 1, 5, 10, tzinfo=timezone.utc)))
+        await session.commit()
+    # Session mới: bản ghi được nạp lại từ truy vấn của scenario
+    async with session_maker() as session:
+        await scenario(session)
+    await engine.dispose()
+
+
+def test_deferred_columns_are_skipped():
+    async def scenario(session):
+        order = (await session.exec(select(Order).options(load_only(Order.id, Order.order_date)))).one()
+        [item] = serializer_for(OrderPublic).dump([order])
+        assert item == {"id": order.id, "order_date": datetime(2026, 1, 5, 10)}
+
+    asyncio.run(with_order(scenario))
+
+
+def test_relationship_not_expanded_is_skipped():
+    async def scenario(session):
+        order = (await session.exec(select(Order))).one()
+        [item] = serializer_for(OrderWithDetailsPublic).dump([order])
+        assert "order_details" not in item
+        assert item["store_id"] == order.store_id
+
+    asyncio.run(with_order(scenario))
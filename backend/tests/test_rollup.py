@@ -0,0 +1,161 @@
+# Bảng tổng hợp bán hàng: cập nhật cộng dồn phải cho cùng kết quả với
+# rebuild_sales_rollups (SQLite trong bộ nhớ). Chạy trong thư mục backend:  python -m pytest -q
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.crud import crud_order, crud_order_detail
+from app.crud.rollup import rebuild_sales_rollups
+from app.models import (
+    Category,
+    Customer,
+    Order,
+    OrderCreate,
+    OrderDetail,
+    OrderDetailCreate,
+    OrderDetailUpdate,
+    Product,
+    SalesDaily,
+    Store,
+    Variant,
+)
+
+
+async def rollup_rows(session: AsyncSession) -> list:
+    rows = (await session.exec(select(SalesDaily))).all()
+    return sorted((row.day, row.variant_id, row.quantity, round(row.revenue, 6), row.lines) for row in rows)
+
+
+async def with_session(scenario) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        category = Category(name_cat="Coffee", description=None)
+        session.add(category)
+        await session.flush()
+        product = Product(name="Latte", categories_id=category.id)
+        session.add(product)
+        await session.flush()
+        variant = Variant(product_id=product.id, price=2.0)
+        store, customer = Store(name_store="Center"), Customer(name="An")
+        session.add_all([variant, store, customer])
+        await session.commit()
+        await scenario(session, variant, store, customer)
+    await engine.dispose()
+
+
+def test_variant_price_change_does_not_shift_rollup_revenue():
+    async def scenario(session, variant, store, customer):
+        order = await crud_order.create_order(
+            session=session,
+            order_create=OrderCreate(customer_id=customer.id, store_id=store.id, order_date=datetime(2026, 1, 5, 10, tzinfo=timezone.utc)),
+        )
+        detail = await crud_order_detail.create_order_detail(
+            session=session,
+            order_detail_create=OrderDetailCreate(order_id=order.id, variant_id=variant.id, quantity=3),
+        )
+        # Đơn giá được chụp lúc ghi
+        assert detail.unit_price == 2.0
+        assert [row[3] for row in await rollup_rows(session)] == [6.0]
+
+        variant.price = 5.0
+        session.add(variant)
+        await session.commit()
+        await crud_order_detail.update_order_detail(
+            session=session, db_order_detail=detail, order_detail_in=OrderDetailUpdate(quantity=1)
+        )
+        incremental = await rollup_rows(session)
+        assert [row[3] for row in incremental] == [2.0]
+        await rebuild_sales_rollups(session=session)
+        assert await rollup_rows(session) == incremental
+
+        await crud_order_detail.delete_order_detail(session=session, order_detail=detail)
+        assert await rollup_rows(session) == []
+        assert (await session.exec(select(OrderDetail))).all() == []
+
+    asyncio.run(with_session(scenario))
+
+
+def test_line_without_unit_price_matches_rebuild_after_price_change():
+    async def scenario(session, variant, store, customer):
+        order = await crud_order.create_order(
+            session=session,
+            order_create=OrderCreate(customer_id=customer.id, store_id=store.id, order_date=datetime(2026, 1, 5, 10, tzinfo=timezone.utc)),
+        )
+        # Dòng cũ ghi trước khi có đơn giá chụp (unit_price NULL), tổng hợp bằng rebuild
+        detail = OrderDetail(order_id=order.id, variant_id=variant.id, quantity=3)
+        session.add(detail)
+        await session.commit()
+        await rebuild_sales_rollups(session=session)
+        await session.commit()
+
+        variant.price = 5.0
+        session.add(variant)
+        await session.commit()
+        # Delta trừ dòng cũ phải dùng cùng giá trị đã cộng, không dùng giá variant hiện tại
+        await crud_order_detail.update_order_detail(
+            session=session, db_order_detail=detail, order_detail_in=OrderDetailUpdate(quantity=2, unit_price=1.5)
+        )
+        incremental = await rollup_rows(session)
+        assert [row[3] for row in incremental] == [3.0]
+        await rebuild_sales_rollups(session=session)
+        assert await rollup_rows(session) == incremental
+
+    asyncio.run(with_session(scenario))
+
+
+def test_moving_line_to_another_variant_uses_new_variant_price():
+    async def scenario(session, variant, store, customer):
+        other = Variant(product_id=variant.product_id, price=7.0)
+        session.add(other)
+        await session.commit()
+        order = await crud_order.create_order(
+            session=session,
+            order_create=OrderCreate(customer_id=customer.id, store_id=store.id, order_date=datetime(2026, 1, 5, 10, tzinfo=timezone.utc)),
+        )
+        detail = await crud_order_detail.create_order_detail(
+            session=session,
+            order_detail_create=OrderDetailCreate(order_id=order.id, variant_id=variant.id, quantity=2),
+        )
+        detail = await crud_order_detail.update_order_detail(
+            session=session, db_order_detail=detail, order_detail_in=OrderDetailUpdate(variant_id=other.id)
+        )
+        assert detail.unit_price == 7.0
+        incremental = await rollup_rows(session)
+        revenue = {row[1]: row[3] for row in incremental}
+        assert revenue == {other.id: 14.0}
+        await rebuild_sales_rollups(session=session)
+        assert {row[1]: row[3] for row in await rollup_rows(session)} == {other.id: 14.0}
+
+    asyncio.run(with_session(scenario))
+
+
+def test_order_date_with_offset_is_stored_as_utc_day():
+    async def scenario(session, variant, store, customer):
+        # 06:30 ngày 6 giờ +07:00 là 23:30 ngày 5 giờ UTC
+        local = datetime(2026, 1, 6, 6, 30, tzinfo=timezone(timedelta(hours=7)))
+        order = await crud_order.create_order(
+            session=session,
+            order_create=OrderCreate(customer_id=customer.id, store_id=store.id, order_date=local),
+        )
+        await crud_order_detail.create_order_detail(
+            session=session,
+            order_detail_create=OrderDetailCreate(order_id=order.id, variant_id=variant.id, quantity=1),
+        )
+        stored = (await session.exec(select(Order.order_date))).one()
+        assert stored == datetime(2026, 1, 5, 23, 30)
+        incremental = await rollup_rows(session)
+        assert [row[0] for row in incremental] == [date(2026, 1, 5)]
+        await rebuild_sales_rollups(session=session)
+        assert await rollup_rows(session) == incremental
+
+        # Lọc bằng mốc có múi giờ cũng được quy về UTC
+        since = datetime(2026, 1, 6, 6, 0, tzinfo=timezone(timedelta(hours=7)))
+        found = (await session.exec(select(Order.id).where(*crud_order.order_filters(date_from=since)))).all()
+        assert found == [order.id]
+
+    asyncio.run(with_session(scenario))
@@ -18,6 +18,8 @@ import type {
   Order,
   OrderCreate,
   OrderUpdate,
+  OrderCheckout,
+  OrderWithDetails,
   Variant,
   VariantCreate,
   VariantUpdate,
@@ -29,6 +31,12 @@ import type {
   PaginatedResponse,
   OrdersParams,
   StoresParams,
+  SalesSummary,
+  StoreDayRevenue,
+  TopVariant,
+  ProductNutritionStats,
+  CustomerOrderCount,
+  AnalyticsParams,
 } from './types'
 
 // Products Service
@@ -39,6 +47,10 @@ export const productsService = {
   getById: (id: string) =>
     apiClient.get<Product>(`/products/${id}`),
 
+  // Lấy nhiều bản ghi theo id trong một request (giữ thứ tự ids, bỏ id không tồn tại)
+  batch: (data: { ids: string[] }) =>
+    apiClient.post<Product[]>('/products/batch', data),
+
   create: (data: ProductCreate) =>
     apiClient.post<Product>('/products', data),
 
@@ -57,6 +69,10 @@ export const categoriesService = {
   getById: (id: string) =>
     apiClient.get<Category>(`/categories/${id}`),
 
+  // Lấy nhiều bản ghi theo id trong một request (giữ thứ tự ids, bỏ id không tồn tại)
+  batch: (data: { ids: string[] }) =>
+    apiClient.post<Category[]>('/categories/batch', data),
+
   create: (data: CategoryCreate) =>
     apiClient.post<Category>('/categories', data),
 
@@ -75,6 +91,10 @@ export const storesService = {
   getById: (id: string) =>
     apiClient.get<Store>(`/stores/${id}`),
 
+  // Lấy nhiều bản ghi theo id trong một request (giữ thứ tự ids, bỏ id không tồn tại)
+  batch: (data: { ids: string[] }) =>
+    apiClient.post<Store[]>('/stores/batch', data),
+
   create: (data: StoreCreate) =>
     apiClient.post<Store>('/stores', data),
 
@@ -93,6 +113,10 @@ export const customersService = {
   getById: (id: string) =>
     apiClient.get<Customer>(`/customers/${id}`),
 
+  // Lấy nhiều bản ghi theo id trong một request (giữ thứ tự ids, bỏ id không tồn tại)
+  batch: (data: { ids: string[] }) =>
+    apiClient.post<Customer[]>('/customers/batch', data),
+
   create: (data: CustomerCreate) =>
     apiClient.post<Customer>('/customers', data),
 
@@ -111,9 +135,16 @@ export const ordersService = {
   getById: (id: string) =>
     apiClient.get<Order>(`/orders/${id}`),
 
+  // Lấy nhiều bản ghi theo id trong một request (giữ thứ tự ids, bỏ id không tồn tại)
+  batch: (data: { ids: string[] }) =>
+    apiClient.post<Order[]>('/orders/batch', data),
+
   create: (data: OrderCreate) =>
     apiClient.post<Order>('/orders', data),
 
+  checkout: (data: OrderCheckout) =>
+    apiClient.post<OrderWithDetails>('/orders/checkout', data),
+
   update: (id: string, data: OrderUpdate) =>
     apiClient.put<Order>(`/orders/${id}`, data),
 
@@ -135,17 +166,9 @@ export const variantsService = {
   search: (params: { q?: string; skip?: number; limit?: number; product_id?: string; min_price?: number; max_price?: number }) =>
     apiClient.get<PaginatedResponse<Variant>>('/variants/search', params),
 
-  batch: async (data: { ids: string[] }) => {
-    console.log('🔧 Service: Calling batch API with data:', data)
-    try {
-      const response = await apiClient.post<Variant[]>('/variants/batch', data)
-      console.log('✅ Service: Batch API response:', response.data)
-      return response
-    } catch (error) {
-      console.error('❌ Service: Batch API error:', error)
-      throw error
-    }
-  },
+  // Lấy nhiều bản ghi theo id trong một request (giữ thứ tự ids, bỏ id không tồn tại)
+  batch: (data: { ids: string[] }) =>
+    apiClient.post<Variant[]>('/variants/batch', data),
 
   create: (data: VariantCreate) =>
     apiClient.post<Variant>('/variants', data),
@@ -162,8 +185,8 @@ export const orderDetailsService = {
   getAll: (params?: OrderDetailsParams) =>
     apiClient.get<PaginatedResponse<OrderDetail>>('/order_details', params),
 
-  getByOrder: (orderId: string) =>
-    apiClient.get<PaginatedResponse<OrderDetail>>('/order_details', { order_id: orderId }),
+  getByOrder: (orderId: string, params?: OrderDetailsParams) =>
+    apiClient.get<PaginatedResponse<OrderDetail>>('/order_details', { ...params, order_id: orderId }),
 
   getById: (id: string) =>
     apiClient.get<OrderDetail>(`/order_details/${id}`),
@@ -178,6 +201,24 @@ export const orderDetailsService = {
     apiClient.delete(`/order_details/${id}`),
 }
 
+// Analytics Service
+export const analyticsService = {
+  getSummary: () =>
+    apiClient.get<SalesSummary>('/analytics/summary'),
+
+  getRevenue: (params?: AnalyticsParams) =>
+    apiClient.get<{ data: StoreDayRevenue[] }>('/analytics/revenue', params),
+
+  getTopVariants: (params?: AnalyticsParams) =>
+    apiClient.get<{ data: TopVariant[] }>('/analytics/top-variants', params),
+
+  getProductNutrition: (productId: string) =>
+    apiClient.get<{ data: ProductNutritionStats[] }>('/analytics/product-nutrition', { product_id: productId }),
+
+  getCustomerOrders: (params?: AnalyticsParams & { min_orders?: number }) =>
+    apiClient.get<{ data: CustomerOrderCount[] }>('/analytics/customer-orders', params),
+}
+
 // Export all services
 export const services = {
   products: productsService,
@@ -187,6 +228,7 @@ export const services = {
   orders: ordersService,
   variants: variantsService,
   orderDetails: orderDetailsService,
+  analytics: analyticsService,
 }
 
 export default services
@@ -15,6 +15,7 @@ export interface ApiResponse<T> {
 export interface PaginatedResponse<T> {
   data: T[]
   count: number
+  next_cursor?: string | null
   page: number
   pageSize: number
   totalPages: number
@@ -73,7 +74,6 @@ export interface StoreUpdate extends Partial<StoreCreate> { }
 export interface Customer extends BaseModel {
   name?: string
   username: string
-  password?: string
   sex?: string
   age?: number
   location?: string
@@ -111,6 +111,23 @@ export interface OrderCreate {
 
 export interface OrderUpdate extends Partial<OrderCreate> { }
 
+export interface OrderLineCreate {
+  variant_id: string
+  quantity?: number
+  rate?: number
+}
+
+export interface OrderCheckout {
+  customer_id: string
+  store_id: string
+  order_date?: string
+  details: OrderLineCreate[]
+}
+
+export interface OrderWithDetails extends Order {
+  order_details: OrderDetail[]
+}
+
 // Variant types
 export interface Variant extends BaseModel {
   product_id: string
@@ -150,6 +167,8 @@ export interface OrderDetail extends BaseModel {
   rate?: number
   unit_price?: number
   price?: number
+  // Chỉ có khi gọi với expand=variant hoặc expand=variant.product
+  variant?: Variant & { product?: Product }
 }
 
 export interface OrderDetailCreate {
@@ -167,6 +186,8 @@ export interface PaginationParams {
   pageSize?: number
   skip?: number
   limit?: number
+  cursor?: string
+  fields?: string // Danh sách trường cần trả, phân cách bởi dấu phẩy
 }
 
 export interface ProductsParams extends PaginationParams {
@@ -187,18 +208,80 @@ export interface CustomersParams extends PaginationParams {
 
 export interface OrderDetailsParams extends PaginationParams {
   order_id?: string
+  expand?: string // Quan hệ trả kèm, vd: variant.product
 }
 
 export interface OrdersParams extends PaginationParams {
   customer_id?: string
   store_id?: string
   search?: string
+  expand?: string // Quan hệ trả kèm, vd: order_details.variant.product,store
 }
 
 export interface StoresParams extends PaginationParams {
   search?: string
 }
 
+// Analytics (tính sẵn trên server bằng GROUP BY)
+export interface SalesSummary {
+  products: number
+  categories: number
+  customers: number
+  stores: number
+  orders: number
+  revenue: number
+  avg_order_value: number
+}
+
+export interface StoreDayRevenue {
+  store_id: string
+  name_store?: string
+  day: string
+  orders: number
+  quantity: number
+  revenue: number
+}
+
+export interface TopVariant {
+  variant_id: string
+  beverage_option?: string
+  product_id: string
+  product_name: string
+  quantity: number
+  revenue: number
+}
+
+export interface ProductNutritionStats {
+  product_id: string
+  product_name: string
+  variants: number
+  avg_price?: number
+  min_price?: number
+  max_price?: number
+  avg_calories?: number
+  max_calories?: number
+  max_caffeine_mg?: number
+  avg_protein_g?: number
+  avg_dietary_fibre_g?: number
+  avg_sugars_g?: number
+}
+
+export interface CustomerOrderCount {
+  customer_id: string
+  name?: string
+  username?: string
+  orders: number
+  total_spent: number
+  last_order_date?: string
+}
+
+export interface AnalyticsParams {
+  date_from?: string
+  date_to?: string
+  store_id?: string
+  limit?: number
+}
+
 // Error types
 export interface ApiError {
   message: string
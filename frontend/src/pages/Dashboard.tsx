@@ -12,13 +12,7 @@ import {
 } from '@ant-design/icons'
 import { LoadingSpinner, ErrorAlert } from '../components'
 import { useApi } from '../hooks'
-import {
-  productsService,
-  categoriesService,
-  ordersService,
-  customersService,
-  storesService
-} from '../client/services'
+import { analyticsService } from '../client/services'
 import { formatCurrency } from '../utils'
 
 const { Title } = Typography
@@ -26,54 +20,26 @@ const { Title } = Typography
 const Dashboard: React.FC = () => {
   const navigate = useNavigate()
 
-  // Fetch all data using new hooks
-  const { data: productsResponse, loading: productsLoading, error: productsError } = useApi(
-    () => productsService.getAll({ page: 1, pageSize: 1000 }),
-    { deps: [] }
-  )
-  const { data: categoriesResponse, loading: categoriesLoading, error: categoriesError } = useApi(
-    () => categoriesService.getAll(),
-    { deps: [] }
-  )
-  const { data: ordersResponse, loading: ordersLoading, error: ordersError } = useApi(
-    () => ordersService.getAll(),
-    { deps: [] }
-  )
-  const { data: customersResponse, loading: customersLoading, error: customersError } = useApi(
-    () => customersService.getAll(),
-    { deps: [] }
-  )
-  const { data: storesResponse, loading: storesLoading, error: storesError } = useApi(
-    () => storesService.getAll(),
+  // Số liệu tổng hợp tính trên server (không tải toàn bộ danh sách về trình duyệt)
+  const { data: summary, loading, error } = useApi(
+    () => analyticsService.getSummary(),
     { deps: [] }
   )
 
-  // Extract data from responses
-  const products = productsResponse?.data || []
-  const productsTotal = productsResponse?.count || products.length
-  const categories = categoriesResponse?.data || []
-  const orders = ordersResponse?.data || []
-  const customers = customersResponse?.data || []
-  const stores = storesResponse?.data || []
-
   // Show loading state
-  if (productsLoading || categoriesLoading || ordersLoading || customersLoading || storesLoading) {
+  if (loading || (!summary && !error)) {
     return <LoadingSpinner />
   }
 
   // Show error state
-  if (productsError || categoriesError || ordersError || customersError || storesError) {
+  if (error || !summary) {
     return (<ErrorAlert
       message="Error loading dashboard data"
-      description={productsError || categoriesError || ordersError || customersError || storesError || 'Unknown error'}
+      description={error || 'Unknown error'}
     />
     )
   }
 
-  // Calculate statistics
-  const totalRevenue = orders.reduce((sum, order) => sum + (order.total_amount || 0), 0)
-  const avgOrderValue = orders.length > 0 ? totalRevenue / orders.length : 0
-
   interface StatData {
     title: string
     value: string | number
@@ -87,48 +53,48 @@ const Dashboard: React.FC = () => {
   const statsData: StatData[] = [
     {
       title: 'Total Products',
-      value: productsTotal || products.length,
+      value: summary.products,
       icon: <ShoppingOutlined style={{ color: '#1890ff' }} />,
       color: '#1890ff',
       path: '/products'
     },
     {
       title: 'Categories',
-      value: categories.length,
+      value: summary.categories,
       icon: <AppstoreOutlined style={{ color: '#52c41a' }} />,
       color: '#52c41a',
       path: '/categories'
     },
     {
       title: 'Total Orders',
-      value: orders.length,
+      value: summary.orders,
       icon: <ShoppingCartOutlined style={{ color: '#fa8c16' }} />,
       color: '#fa8c16',
       path: '/orders'
     },
     {
       title: 'Customers',
-      value: customers.length,
+      value: summary.customers,
       icon: <UserOutlined style={{ color: '#eb2f96' }} />,
       color: '#eb2f96',
       path: '/customers'
     },
     {
       title: 'Stores',
-      value: stores.length,
+      value: summary.stores,
       icon: <ShopOutlined style={{ color: '#722ed1' }} />,
       color: '#722ed1',
       path: '/stores'
     },
     {
       title: 'Total Revenue',
-      value: formatCurrency(totalRevenue),
+      value: formatCurrency(summary.revenue),
       icon: <DollarOutlined style={{ color: '#13c2c2' }} />,
       color: '#13c2c2'
     },
     {
       title: 'Avg Order Value',
-      value: formatCurrency(avgOrderValue),
+      value: formatCurrency(summary.avg_order_value),
       icon: <RiseOutlined style={{ color: '#f5222d' }} />,
       color: '#f5222d'
     }
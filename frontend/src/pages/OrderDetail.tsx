@@ -3,8 +3,6 @@ import { useApi, useMutation } from '../hooks'
 import {
   orderDetailsService,
   variantsService,
-  customersService,
-  storesService,
   productsService
 } from '../client/services'
 import { useParams, useNavigate } from 'react-router-dom'
@@ -62,13 +60,13 @@ const OrderDetailPage: React.FC = () => {
   const [editingOrderDetail, setEditingOrderDetail] = useState<OrderDetail | null>(null)
   const [form] = Form.useForm()
 
-  // Fetch order details (items)
+  // Fetch order details (items) together with their variant and product in one request
   const {
     data: orderDetailsResponse,
     loading: orderDetailsLoading,
     error: orderDetailsError,
     execute: refetchOrderDetails
-  } = useApi(() => orderDetailsService.getByOrder(orderId!), { immediate: !!orderId })
+  } = useApi(() => orderDetailsService.getByOrder(orderId!, { expand: 'variant.product' }), { immediate: !!orderId })
 
   const orderDetails = orderDetailsResponse?.data || []
 
@@ -98,87 +96,20 @@ const OrderDetailPage: React.FC = () => {
     }
   })
 
-  // Fetch variants for dropdown using batch API with variant ids from orderDetails
-  const variantIds = orderDetails.map(od => od.variant_id).filter(Boolean)
-
-  // Manage variants with useState and useEffect instead of useApi
-  const [variants, setVariants] = useState<Variant[]>([])
-  const [variantsLoading, setVariantsLoading] = useState(false)
-  const [variantsError, setVariantsError] = useState<string | null>(null)
+  // Variants and products of the order items come embedded in the response (expand=variant.product)
+  const variants: Variant[] = orderDetails.flatMap(od => od.variant ? [od.variant] : [])
+  const products: Product[] = variants.flatMap(v => v.product ? [v.product] : [])
 
   // Manage all variants for dropdown
   const [allVariants, setAllVariants] = useState<Variant[]>([])
   const [allVariantsLoading, setAllVariantsLoading] = useState(false)
   const [allVariantsError, setAllVariantsError] = useState<string | null>(null)
 
-  // Manage products state
-  const [products, setProducts] = useState<Product[]>([])
-  const [productsLoading, setProductsLoading] = useState(false)
-  const [productsError, setProductsError] = useState<string | null>(null)
-
   // Manage all products for dropdown
   const [allProducts, setAllProducts] = useState<Product[]>([])
   const [allProductsLoading, setAllProductsLoading] = useState(false)
   const [allProductsError, setAllProductsError] = useState<string | null>(null)
 
-  React.useEffect(() => {
-    if (variantIds.length > 0) {
-      setVariantsLoading(true)
-      setVariantsError(null)
-
-      variantsService.batch({ ids: variantIds })
-        .then(response => {
-          setVariants(response.data || [])
-        })
-        .catch(error => {
-          setVariantsError(error.message || 'Failed to fetch variants')
-          setVariants([])
-        })
-        .finally(() => {
-          setVariantsLoading(false)
-        })
-    } else {
-      setVariants([])
-      setVariantsLoading(false)
-      setVariantsError(null)
-    }
-  }, [variantIds.join(',')]) // Use string join for dependency
-
-  // Fetch products based on variants
-  React.useEffect(() => {
-    if (variants.length > 0) {
-      const productIds = [...new Set(variants.map(v => v.product_id).filter(Boolean))]
-
-      if (productIds.length > 0) {
-        setProductsLoading(true)
-        setProductsError(null)
-
-        // Fetch all products and filter by IDs (since there's no batch API for products)
-        productsService.getAll()
-          .then(response => {
-            const allProducts = response.data?.data || []
-            const filteredProducts = allProducts.filter(p => productIds.includes(p.id))
-            setProducts(filteredProducts)
-          })
-          .catch(error => {
-            setProductsError(error.message || 'Failed to fetch products')
-            setProducts([])
-          })
-          .finally(() => {
-            setProductsLoading(false)
-          })
-      } else {
-        setProducts([])
-        setProductsLoading(false)
-        setProductsError(null)
-      }
-    } else {
-      setProducts([])
-      setProductsLoading(false)
-      setProductsError(null)
-    }
-  }, [variants.length, variants.map(v => v.product_id).join(',')]) // Dependency on variants
-
   // Fetch all variants for dropdown
   React.useEffect(() => {
     setAllVariantsLoading(true)
@@ -198,46 +129,34 @@ const OrderDetailPage: React.FC = () => {
       })
   }, []) // Run once on component mount
 
-  // Fetch all products for dropdown
+  // Fetch only the products referenced by the dropdown variants
+  const allProductIds = [...new Set(allVariants.map(v => v.product_id).filter(Boolean))]
+
   React.useEffect(() => {
+    if (allProductIds.length === 0) {
+      setAllProducts([])
+      return
+    }
     setAllProductsLoading(true)
     setAllProductsError(null)
 
-    productsService.getAll()
+    productsService.batch({ ids: allProductIds })
       .then(response => {
-        const allProductsData = response.data?.data || []
-        setAllProducts(allProductsData)
+        setAllProducts(response.data || [])
       })
       .catch(error => {
-        setAllProductsError(error.message || 'Failed to fetch all products')
+        setAllProductsError(error.message || 'Failed to fetch products')
         setAllProducts([])
       })
       .finally(() => {
         setAllProductsLoading(false)
       })
-  }, []) // Run once on component mount
-
-  // Fetch customers and stores for order info
-  const { data: customersResponse } = useApi(() => customersService.getAll())
-  const { data: storesResponse } = useApi(() => storesService.getAll())
-
-  const customers = customersResponse?.data || []
-  const stores = storesResponse?.data || []
+  }, [allProductIds.join(',')])
 
   // Helper functions
-  const getCustomerName = (customerId: string) => {
-    const customer = customers.find(c => c.id === customerId)
-    return customer?.name || customer?.username || 'Unknown Customer'
-  }
-
-  const getStoreName = (storeId: string) => {
-    const store = stores.find(s => s.id === storeId)
-    return store?.name || store?.name_store || 'Unknown Store'
-  }
-
   const getVariantInfo = (variantId: string) => {
     if (!variantId) return null
-    return variants.find(v => v.id === variantId) || null
+    return variants.find(v => v.id === variantId) || allVariants.find(v => v.id === variantId) || null
   }
 
   const getProductInfo = (productId: string) => {
@@ -517,7 +436,7 @@ const OrderDetailPage: React.FC = () => {
     }
   ]
 
-  if (orderDetailsLoading || variantsLoading || productsLoading) {
+  if (orderDetailsLoading) {
     return <LoadingSpinner />
   }
 
@@ -624,7 +543,7 @@ const OrderDetailPage: React.FC = () => {
         <DataTable
           data={tableData}
           columns={columns}
-          loading={orderDetailsLoading || variantsLoading || productsLoading}
+          loading={orderDetailsLoading}
           pagination={{
             current: 1,
             pageSize: 10,
@@ -50,7 +50,8 @@ import { useApi, useMutation, usePaginatedApi } from '../hooks'
 import {
   productsService,
   variantsService,
-  categoriesService
+  categoriesService,
+  analyticsService
 } from '../client/services'
 import type {
   Variant,
@@ -98,8 +99,16 @@ const ProductDetail: React.FC = () => {
     refresh: refetchVariants
   } = usePaginatedApi(fetchVariants, 1, 10)
 
-  // Fetch categories for product info
-  const { data: categoriesResponse } = useApi(() => categoriesService.getAll())
+  // Fetch only the product's category (batch by id instead of the whole categories table)
+  const categoryId = product?.categories_id
+  const { data: categoriesResponse } = useApi(
+    () => categoriesService.batch({ ids: categoryId ? [categoryId] : [] }),
+    { immediate: !!categoryId, deps: [categoryId] }
+  )
+
+  // Thống kê giá/dinh dưỡng tính trên server cho mọi variant của sản phẩm (không chỉ trang đang hiển thị)
+  const nutritionApiCall = useCallback(() => analyticsService.getProductNutrition(productId!), [productId])
+  const { data: nutritionResponse, execute: refetchNutrition } = useApi(nutritionApiCall, { immediate: !!productId })
 
   // Mutations
   const createVariantMutation = useMutation(
@@ -107,6 +116,7 @@ const ProductDetail: React.FC = () => {
     {
       onSuccess: () => {
         refetchVariants();
+        refetchNutrition();
         setIsModalVisible(false);
         form.resetFields()
       },
@@ -121,6 +131,7 @@ const ProductDetail: React.FC = () => {
     {
       onSuccess: () => {
         refetchVariants();
+        refetchNutrition();
         setIsModalVisible(false);
         form.resetFields()
       },
@@ -133,14 +144,17 @@ const ProductDetail: React.FC = () => {
   const deleteVariantMutation = useMutation(
     (id: string) => variantsService.delete(id),
     {
-      onSuccess: () => refetchVariants(),
+      onSuccess: () => {
+        refetchVariants();
+        refetchNutrition()
+      },
       onError: (error) => {
         showError('Error deleting variant', error.message)
       }
     }
   )
 
-  const categories = categoriesResponse?.data || []
+  const categories = categoriesResponse || []
 
   // Helper functions
   const getCategoryName = (categoryId: string) => {
@@ -150,18 +164,23 @@ const ProductDetail: React.FC = () => {
 
   const getCategoryColor = (categoryId: string) => {
     const colors = ['blue', 'green', 'orange', 'purple', 'red', 'cyan', 'magenta', 'gold']
-    const index = categories.findIndex(c => c.id === categoryId)
-    return colors[index % colors.length] || 'blue'
+    if (!categoryId) return 'blue'
+    let hash = 0
+    for (let i = 0; i < categoryId.length; i++) {
+      hash = categoryId.charCodeAt(i) + ((hash << 5) - hash)
+    }
+    return colors[Math.abs(hash) % colors.length]
   }
 
   // Calculate statistics
+  const nutrition = nutritionResponse?.data[0]
   const variantStats = {
-    total: variants.length,
-    avgPrice: variants.length > 0 ? variants.reduce((sum, v) => sum + (v.price || 0), 0) / variants.length : 0,
-    maxCalories: variants.length > 0 ? Math.max(...variants.map(v => v.calories || 0)) : 0,
-    maxCaffeine: variants.length > 0 ? Math.max(...variants.map(v => v.caffeine_mg || 0)) : 0,
-    avgProtein: variants.length > 0 ? variants.reduce((sum, v) => sum + (v.protein_g || 0), 0) / variants.length : 0,
-    avgFibre: variants.length > 0 ? variants.reduce((sum, v) => sum + (v.dietary_fibre_g || 0), 0) / variants.length : 0
+    total: nutrition?.variants ?? 0,
+    avgPrice: nutrition?.avg_price ?? 0,
+    maxCalories: nutrition?.max_calories ?? 0,
+    maxCaffeine: nutrition?.max_caffeine_mg ?? 0,
+    avgProtein: nutrition?.avg_protein_g ?? 0,
+    avgFibre: nutrition?.avg_dietary_fibre_g ?? 0
   }
 
   // Handlers